@@ -0,0 +1,125 @@
+"""Measure command latency while a hot backup of the database runs.
+
+A simulated command loop issues request lookups and accepts against the shared
+connection, first on an idle bot, then while BackupManager takes a base backup and
+finally while a naive backup copies the whole database on the event loop.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_backup --requests 200000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from ser_gawain.backup import BackupManager
+from ser_gawain.db import Database
+from ser_gawain.models import Status
+
+
+async def seed(db: Database, num_requests: int) -> None:
+    await db.users.add(1, "crafter")
+    async with db.conn.cursor(transaction=True) as cursor:
+        await cursor.executemany(
+            "INSERT INTO crafting_requests (requestor_id, user_name, item_name, has_materials, amount, trade_skill, level_required, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (str(i % 500), f"user{i % 500}", f"Item {i} " + "x" * 100, i % 2, 1, "Arcana", i % 251, Status.PENDING.name)
+                for i in range(num_requests)
+            ),
+        )
+
+
+async def commands(db: Database, num_requests: int, stop: asyncio.Event) -> list[float]:
+    """Run lookups and accepts back to back until ``stop`` is set, return latencies."""
+    rng = random.Random(0)
+    latencies = []
+    while not stop.is_set():
+        request_id = rng.randint(1, num_requests)
+        start = time.perf_counter()
+        await db.requests.get(request_id)
+        await db.requests.accept(request_id, "1")
+        latencies.append(time.perf_counter() - start)
+        # Leave the loop room to breathe like a real bot between commands
+        await asyncio.sleep(0.001)
+    return latencies
+
+
+# The naive backup is quick on a warm page cache, repeat it to catch commands behind it
+NAIVE_BACKUPS = 10
+
+
+def naive_backup(database: str, target: str) -> None:
+    """A whole-file backup on the event loop, how the bot would back up without help."""
+    source = sqlite3.connect(database)
+    destination = sqlite3.connect(target)
+    source.backup(destination)
+    source.close()
+    destination.close()
+
+
+async def measure(db: Database, num_requests: int, work) -> list[float]:
+    stop = asyncio.Event()
+    runner = asyncio.create_task(commands(db, num_requests, stop))
+    try:
+        await work()
+    finally:
+        stop.set()
+    return await runner
+
+
+def summary(latencies: list[float]) -> str:
+    quantiles = statistics.quantiles(latencies, n=100)
+    return f"{len(latencies):>8} {quantiles[49] * 1000:>9.2f} {quantiles[98] * 1000:>9.2f} {max(latencies) * 1000:>9.2f}"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--idle", type=float, default=2.0, help="Seconds of idle baseline")
+    parser.add_argument("--ship-wal", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        db = await Database.connect(path)
+        try:
+            await db.create_tables()
+            await seed(db, args.requests)
+            size = os.path.getsize(path) + os.path.getsize(f"{path}-wal")
+
+            manager = BackupManager(db, os.path.join(tmp, "backups"), ship_wal=args.ship_wal)
+            await manager.prepare()
+
+            results = {}
+            results["idle"] = await measure(db, args.requests, lambda: asyncio.sleep(args.idle))
+            started = time.perf_counter()
+            results["hot backup"] = await measure(db, args.requests, manager.backup)
+            hot_time = time.perf_counter() - started
+
+            async def blocking():
+                for _ in range(NAIVE_BACKUPS):
+                    naive_backup(path, os.path.join(tmp, "naive.db"))
+                    await asyncio.sleep(0.1)
+
+            started = time.perf_counter()
+            results["naive backup"] = await measure(db, args.requests, blocking)
+            naive_time = time.perf_counter() - started
+            await manager.close()
+        finally:
+            await db.close()
+
+    print(f"database: {size / 1024 / 1024:.1f} MB, {args.requests} requests")
+    print(f"hot backup took {hot_time:.2f} s, naive backup took {naive_time:.2f} s")
+    print(f"{'run':<14} {'commands':>8} {'p50 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9}")
+    for name, latencies in results.items():
+        print(f"{name:<14} {summary(latencies)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""Measure item catalog load times and autocomplete lookup latency.
+
+Generates a synthetic catalog, then times building the index from the JSON data
+against loading the prebuilt pickled index, and the latency of exact lookups and
+autocomplete searches for random prefixes of item names.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_catalog --items 50000
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from ser_gawain.catalog import load_catalog
+from ser_gawain.models import TradeSkill
+
+
+TIERS = ("Iron", "Steel", "Starmetal", "Orichalcum", "Asmodeum", "Runic", "Gilded")
+KINDS = (
+    "Sword", "Hatchet", "Rapier", "Musket", "Bow", "Staff", "Ring", "Amulet",
+    "Helm", "Gloves", "Boots", "Chest", "Table", "Potion", "Stew", "Arrow",
+)
+MATERIALS = ("Ingot", "Timber", "Leather", "Cloth", "Reagent", "Gem", "Oil")
+LOOKUPS = 10000
+
+
+def generate(num_items: int) -> dict:
+    skills = [skill.value for skill in TradeSkill]
+    return {
+        "items": [
+            {
+                "name": f"{TIERS[i % len(TIERS)]} {KINDS[i // len(TIERS) % len(KINDS)]} of Set {i}",
+                "skill": skills[i % len(skills)],
+                "level": i % 251,
+                "materials": {
+                    f"{TIERS[i % len(TIERS)]} {material}": 1 + (i + m) % 12
+                    for m, material in enumerate(MATERIALS[: 2 + i % 3])
+                },
+            }
+            for i in range(num_items)
+        ]
+    }
+
+
+def timed(func, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def latencies(func, queries: list[str]) -> list[float]:
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        func(query)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, "items.json")
+        cache_path = os.path.join(tmp, "gawain.catalog")
+        with open(data_path, "w") as f:
+            json.dump(generate(args.items), f)
+
+        parse, catalog = timed(load_catalog, data_path, None)
+        build, _ = timed(load_catalog, data_path, cache_path)
+        cached, _ = timed(load_catalog, data_path, cache_path)
+        cache_size = os.path.getsize(cache_path)
+
+    rng = random.Random(0)
+    names = [rng.choice(catalog.items).name for _ in range(LOOKUPS)]
+    words = [rng.choice(name.split()) for name in names]
+    prefixes = [word[: rng.randint(1, len(word))] for word in words]
+
+    print(f"items: {len(catalog)}, index cache: {cache_size / 1024 / 1024:.1f} MB")
+    print(f"parse JSON and build index: {parse * 1000:.1f} ms")
+    print(f"build and write cache:      {build * 1000:.1f} ms")
+    print(f"load prebuilt index:        {cached * 1000:.1f} ms")
+    print(f"{'lookup':<16} {'p50 (us)':>9} {'p99 (us)':>9} {'max (us)':>9}")
+    for name, samples in (
+        ("get", latencies(catalog.get, names)),
+        ("search word", latencies(catalog.search, words)),
+        ("search prefix", latencies(catalog.search, prefixes)),
+    ):
+        p50, p99 = (
+            statistics.quantiles(samples, n=100, method="inclusive")[i] for i in (49, 98)
+        )
+        print(f"{name:<16} {p50 * 1e6:>9.1f} {p99 * 1e6:>9.1f} {max(samples) * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark the bulk skill import against one set_skill upsert per row.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_import --rows 10000
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import os
+import tempfile
+import time
+
+from ser_gawain.commands.crafting import TradeSkill, parse_skill_roster
+from ser_gawain.db import Database
+
+
+def make_roster(num_rows: int) -> bytes:
+    skills = list(TradeSkill)
+    stream = io.StringIO()
+    writer = csv.writer(stream)
+    writer.writerow(["user_id", "user_name", "skill", "level"])
+    for i in range(num_rows):
+        user = i // len(skills)
+        writer.writerow(
+            [100000 + user, f"user{user}", skills[i % len(skills)].value, i % 251]
+        )
+    return stream.getvalue().encode()
+
+
+async def connect(path: str) -> Database:
+    db = await Database.connect(path)
+    await db.create_tables()
+    return db
+
+
+async def bench_bulk(path: str, roster: bytes) -> tuple[float, float]:
+    db = await connect(path)
+    try:
+        start = time.perf_counter()
+        rows, errors = parse_skill_roster(roster, "roster.csv")
+        parsed = time.perf_counter()
+        await db.skills.set_many(rows)
+        done = time.perf_counter()
+    finally:
+        await db.close()
+
+    assert not errors
+    return parsed - start, done - parsed
+
+
+async def bench_per_row(path: str, roster: bytes) -> float:
+    """The equivalent of one /crafting set_skill command per roster row."""
+    db = await connect(path)
+    rows, _ = parse_skill_roster(roster, "roster.csv")
+    try:
+        start = time.perf_counter()
+        for user_id, user_name, skill_name, skill_level in rows:
+            await db.skills.set(user_id, user_name, skill_name, skill_level)
+        return time.perf_counter() - start
+    finally:
+        await db.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    args = parser.parse_args()
+
+    roster = make_roster(args.rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        parse_time, upsert_time = await bench_bulk(
+            os.path.join(tmp, "bulk.db"), roster
+        )
+        per_row_time = await bench_per_row(os.path.join(tmp, "per_row.db"), roster)
+
+    print(f"rows:             {args.rows}")
+    print(f"bulk parse:       {parse_time * 1000:.1f} ms")
+    print(f"bulk upsert:      {upsert_time * 1000:.1f} ms")
+    print(f"bulk total:       {(parse_time + upsert_time) * 1000:.1f} ms")
+    print(f"per-row commands: {per_row_time * 1000:.1f} ms")
+    print(f"speedup:          {per_row_time / (parse_time + upsert_time):.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,176 @@
+"""Measure resident memory of the bot's discord.py caches for a large simulated guild.
+
+Each memory profile runs in a fresh process. It builds the client the way the bot
+does, then replays a synthetic gateway session into its connection state: the
+guild with its roles, channels and emojis, every member joining, and message
+traffic in the request channel. Like the gateway, only the events the profile's
+intents subscribe to are delivered. Resident set size is read from /proc before
+and after, so it includes the allocator's overhead and not just Python objects.
+
+Run from the repository root (Linux only):
+
+    python -m benchmarks.bench_memory --members 50000
+"""
+
+import argparse
+import gc
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from ser_gawain.memory import Profile
+from ser_gawain.models import TradeSkill
+
+
+GUILD_ID = 1000
+CHANNEL_ID = 2000
+BOT_ID = 3000
+# Members in the first GUILD_CREATE payload of a large guild, the rest come in chunks
+LARGE_THRESHOLD = 250
+# Member events are replayed this many at a time, so the payloads themselves never
+# add up to much resident memory
+BATCH_SIZE = 1000
+
+
+def rss() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError("VmRSS missing from /proc/self/status")
+
+
+def user(i: int) -> dict:
+    return {
+        "id": str(10**17 + i),
+        "username": f"adventurer{i}",
+        "global_name": f"Adventurer {i}",
+        "discriminator": "0",
+        "avatar": "a" * 32 if i % 3 else None,
+    }
+
+
+def member(i: int) -> dict:
+    return {
+        "user": user(i),
+        "nick": f"Nick {i}" if i % 5 == 0 else None,
+        "roles": [str(100 + i % len(TradeSkill))] if i % 4 == 0 else [],
+        "joined_at": "2024-01-01T00:00:00.000000+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def guild(members: int) -> dict:
+    skills = [skill.value.lower() for skill in TradeSkill]
+    return {
+        "id": str(GUILD_ID),
+        "name": "Company",
+        "owner_id": str(10**17),
+        "member_count": members,
+        "large": members > LARGE_THRESHOLD,
+        "roles": [
+            {"id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0}
+        ]
+        + [
+            {"id": str(100 + i), "name": name, "permissions": "0", "position": i + 1}
+            for i, name in enumerate(skills)
+        ],
+        "emojis": [
+            {"id": str(200 + i), "name": name, "available": True}
+            for i, name in enumerate(skills)
+        ],
+        "channels": [
+            {"id": str(CHANNEL_ID), "type": 0, "name": "crafting", "position": 0}
+        ],
+        "members": [member(i) for i in range(min(members, LARGE_THRESHOLD))],
+        "threads": [],
+        "stickers": [],
+        "features": [],
+    }
+
+
+def message(i: int, members: int) -> dict:
+    author = i % members
+    return {
+        "id": str(10**18 + i),
+        "channel_id": str(CHANNEL_ID),
+        "guild_id": str(GUILD_ID),
+        "author": user(author),
+        "member": {key: value for key, value in member(author).items() if key != "user"},
+        "content": f"Looking for someone to craft item {i % 500}, I have the materials",
+        "timestamp": "2024-01-01T00:00:00.000000+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
+
+
+def simulate(profile_name: str, members: int, messages: int) -> dict:
+    """Runs in its own process so every profile starts from the same baseline."""
+    import discord
+    from ser_gawain.memory import client_options
+
+    options = client_options(Profile(profile_name))
+    client = discord.Client(**options.kwargs())
+    state = client._connection
+    intents = options.intents
+
+    gc.collect()
+    before = rss()
+
+    state._add_guild_from_data(guild(members))
+    if intents.members:
+        # Chunking at startup and joins fill the member cache
+        for start in range(LARGE_THRESHOLD, members, BATCH_SIZE):
+            for i in range(start, min(start + BATCH_SIZE, members)):
+                state.parse_guild_member_add({"guild_id": str(GUILD_ID), **member(i)})
+    if intents.guild_messages:
+        for start in range(0, messages, BATCH_SIZE):
+            for i in range(start, min(start + BATCH_SIZE, messages)):
+                state.parse_message_create(message(i, members))
+
+    gc.collect()
+    cached = state._get_guild(GUILD_ID)
+    return {
+        "profile": profile_name,
+        "rss": rss() - before,
+        "members": len(cached.members),
+        "users": len(state._users),
+        "messages": len(state._messages or ()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=50000)
+    parser.add_argument("--messages", type=int, default=5000)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for profile in Profile:
+        # One worker per profile, created fresh so no profile inherits another's heap
+        with ProcessPoolExecutor(1, mp_context=context) as executor:
+            results.append(
+                executor.submit(
+                    simulate, profile.value, args.members, args.messages
+                ).result()
+            )
+
+    print(f"members: {args.members}, messages: {args.messages}")
+    print(f"{'profile':<12} {'RSS (MB)':>9} {'members':>9} {'users':>9} {'messages':>9}")
+    for result in results:
+        print(
+            f"{result['profile']:<12} {result['rss'] / 1024 / 1024:>9.1f} {result['members']:>9} {result['users']:>9} {result['messages']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Measure memory and throughput of materializing requests as models vs sqlite3.Row.
+
+Both paths fetch the same full rows and render the same list line for each one,
+the "row" path through sqlite3.Row string keys, the "model" path through
+CraftingRequest attributes and its precomputed labels. Timings and memory are taken
+in separate passes so tracemalloc overhead doesn't skew the timings.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_models --requests 100000
+"""
+
+import argparse
+import gc
+import sqlite3
+import time
+import tracemalloc
+
+from ser_gawain.db import LIST_REQUESTS, SCHEMA
+from ser_gawain.models import CraftingRequest, Status, TradeSkill
+
+
+def seed(conn: sqlite3.Connection, num_requests: int) -> None:
+    statuses = tuple(Status)
+    skills = tuple(TradeSkill)
+    conn.executemany(
+        "INSERT INTO crafting_requests (requestor_id, user_name, item_name, has_materials, amount, trade_skill, level_required, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                str(100000 + i % 500),
+                f"user{i % 500}",
+                f"Item {i % 2000}",
+                i % 2,
+                1 + i % 10,
+                skills[i % len(skills)].value,
+                i % 251,
+                statuses[i % len(statuses)].name,
+            )
+            for i in range(num_requests)
+        ),
+    )
+
+
+def render_row(job: sqlite3.Row) -> str:
+    return f"{job['request_id']} {job['item_name']} x{job['amount']} {job['trade_skill']} {job['status']}"
+
+
+def render_model(job: CraftingRequest) -> str:
+    return f"{job.request_id} {job.item_name} x{job.amount} {job.trade_skill_label} {job.status_label}"
+
+
+def fetch(conn: sqlite3.Connection, row_factory) -> list:
+    cursor = conn.cursor()
+    cursor.row_factory = row_factory
+    return cursor.execute(LIST_REQUESTS).fetchall()
+
+
+def measure(conn: sqlite3.Connection, row_factory, render) -> tuple[float, float, int]:
+    gc.collect()
+    start = time.perf_counter()
+    rows = fetch(conn, row_factory)
+    fetched = time.perf_counter()
+    for row in rows:
+        render(row)
+    rendered = time.perf_counter()
+    del rows
+
+    gc.collect()
+    tracemalloc.start()
+    rows = fetch(conn, row_factory)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+
+    return fetched - start, rendered - fetched, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100000)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(SCHEMA)
+    seed(conn, args.requests)
+
+    results = {
+        "sqlite3.Row": measure(conn, sqlite3.Row, render_row),
+        "model": measure(conn, CraftingRequest.from_row, render_model),
+    }
+
+    print(f"requests: {args.requests}")
+    print(f"{'path':<12} {'fetch (ms)':>11} {'render (ms)':>12} {'memory (MB)':>12} {'bytes/row':>10}")
+    for name, (fetch, render, size) in results.items():
+        print(
+            f"{name:<12} {fetch * 1000:>11.1f} {render * 1000:>12.1f} {size / 1024 / 1024:>12.1f} {size / args.requests:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
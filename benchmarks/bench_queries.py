@@ -0,0 +1,486 @@
+"""Time every production SQL statement against a synthetic company and gate regressions.
+
+Builds a deterministic dataset (users, trade skills, requests in every status,
+threads, idempotency keys, notification preferences) at the requested scale, then
+runs each statement in ser_gawain.db, plus the table streams used by exports,
+with its query plan captured. Writes are rolled back after every run so each one
+sees the same data. A statement added to ser_gawain.db without parameters here
+is an error, so the set can't silently fall behind the code.
+
+The JSON report can be stored as a baseline, later runs compared against it
+exit with status 1 if any statement's fastest runs slowed down past the threshold.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_queries --requests 100000 --output baseline.json
+    python -m benchmarks.bench_queries --requests 100000 --baseline baseline.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from ser_gawain import db
+from ser_gawain.models import Status, TradeSkill
+
+
+REPORT_VERSION = 2
+
+# Every timestamp in the dataset and the parameters is relative to this, so two
+# runs with the same seed execute the exact same statements
+NOW = datetime(2024, 6, 1)
+NOW_EPOCH = NOW.timestamp()
+
+STATUS_WEIGHTS = {
+    Status.PENDING: 15,
+    Status.ACCEPTED: 15,
+    Status.COMPLETED: 55,
+    Status.CANCELLED: 15,
+}
+SQL_VERBS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+WARMUP_RUNS = 3
+# Regressions are judged on the mean of this fraction of a statement's fastest runs.
+# The host only ever makes a run slower (scheduling, cache misses, journal writes),
+# so the fastest runs are what the code costs and the rest is mostly noise
+FASTEST_FRACTION = 0.1
+
+
+def user_id(i: int) -> str:
+    return str(100000000000000000 + i)
+
+
+def timestamp(moment: datetime) -> str:
+    return moment.isoformat(sep=" ", timespec="seconds")
+
+
+def generate(conn: sqlite3.Connection, users: int, requests: int, seed: int) -> None:
+    rng = random.Random(seed)
+    skills = tuple(TradeSkill)
+    statuses = tuple(STATUS_WEIGHTS)
+    weights = tuple(STATUS_WEIGHTS.values())
+
+    conn.executescript(db.SCHEMA)
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO users (user_id, user_name, requests_completed) VALUES (?, ?, 0)",
+        ((user_id(i), f"user{i}") for i in range(users)),
+    )
+    conn.executemany(
+        "INSERT INTO trade_skills (user_id, user_name, skill_name, skill_level) VALUES (?, ?, ?, ?)",
+        (
+            (user_id(i), f"user{i}", skill.value, rng.randint(0, 250))
+            for i in range(users)
+            for skill in rng.sample(skills, rng.randint(0, 3))
+        ),
+    )
+
+    rows = []
+    for _ in range(requests):
+        status = rng.choices(statuses, weights)[0]
+        created = NOW - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        accepted_by = (
+            user_id(rng.randrange(users))
+            if status in (Status.ACCEPTED, Status.COMPLETED)
+            else None
+        )
+        completed_on = (
+            timestamp(created + timedelta(hours=rng.randint(1, 96)))
+            if status is Status.COMPLETED
+            else None
+        )
+        requestor = rng.randrange(users)
+        skill = rng.choice(skills + (None,))
+        rows.append(
+            (
+                user_id(requestor),
+                f"user{requestor}",
+                f"Item {int(rng.paretovariate(1.2)) % 2000}",
+                rng.random() < 0.5,
+                rng.randint(1, 20),
+                skill.value if skill else None,
+                rng.randint(0, 250) if skill else None,
+                status.name,
+                accepted_by,
+                timestamp(created),
+                completed_on,
+            )
+        )
+    # Requests are numbered in creation order, like in production
+    rows.sort(key=lambda row: row[9])
+    conn.executemany(
+        "INSERT INTO crafting_requests (requestor_id, user_name, item_name, has_materials, amount, trade_skill, level_required, status, accepted_by, created_at, completed_on) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+
+    conn.executemany(
+        "INSERT INTO request_threads (request_id, thread_id, archived) VALUES (?, ?, ?)",
+        (
+            (request_id, str(900000000000000000 + request_id), row[7] in ("COMPLETED", "CANCELLED"))
+            for request_id, row in enumerate(rows, start=1)
+            if rng.random() < 0.5
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO request_keys (idempotency_key, request_id, created_at) VALUES (?, ?, ?)",
+        (
+            (f"key{request_id}", request_id, NOW_EPOCH - rng.uniform(0, 60))
+            for request_id in range(max(requests - 1000, 1), requests + 1)
+        ),
+    )
+    conn.execute(
+        "INSERT INTO leases (name, holder, expires_at) VALUES ('jobs', 'leader', ?)",
+        (NOW_EPOCH + 30,),
+    )
+    conn.executemany(
+        "INSERT INTO notification_preferences (user_id, mode) VALUES (?, ?)",
+        (
+            (user_id(i), rng.choice(("INSTANT", "DIGEST", "OFF")))
+            for i in range(users)
+            if rng.random() < 0.2
+        ),
+    )
+    conn.execute("COMMIT")
+    conn.execute("ANALYZE")
+
+
+class Scale:
+    """Draws parameters that hit existing rows of the generated dataset."""
+
+    def __init__(self, rng: random.Random, users: int, requests: int):
+        self.rng = rng
+        self.users = users
+        self.requests = requests
+
+    def request(self) -> int:
+        return self.rng.randint(1, self.requests)
+
+    def user(self) -> str:
+        return user_id(self.rng.randrange(self.users))
+
+    def key(self) -> str:
+        return f"key{self.rng.randint(max(self.requests - 1000, 1), self.requests)}"
+
+    def batch(self) -> str:
+        return json.dumps([self.request() for _ in range(50)])
+
+
+# Parameters for each statement in ser_gawain.db, by constant name
+PARAMS: dict[str, Callable[[Scale], tuple]] = {
+    "GET_REQUEST": lambda s: (s.request(),),
+    "LIST_REQUESTS": lambda s: (),
+    "LIST_REQUESTS_BY_STATUS": lambda s: (s.rng.choice(tuple(Status)).name,),
+    "CREATE_REQUEST": lambda s: (s.user(), "bench", "Iron Sword", True, 1, "Arcana", 10),
+    "CLAIM_REQUEST_KEY": lambda s: (f"new{s.rng.getrandbits(64)}", NOW_EPOCH, NOW_EPOCH - 30),
+    "SET_REQUEST_KEY": lambda s: (s.request(), s.key()),
+    "GET_REQUEST_KEY": lambda s: (s.key(),),
+    "PRUNE_REQUEST_KEYS": lambda s: (NOW_EPOCH - 30,),
+    "ACCEPT_REQUEST": lambda s: (s.user(), s.request()),
+    "CANCEL_REQUEST": lambda s: (s.request(),),
+    "COMPLETE_REQUEST": lambda s: (timestamp(NOW), s.request(), s.user()),
+    "DELETE_REQUEST": lambda s: (s.request(),),
+    "COUNT_ACCEPTED_BY_CRAFTER": lambda s: (),
+    "ADD_USER": lambda s: (f"new{s.rng.getrandbits(64)}", "bench"),
+    "ENSURE_USER": lambda s: (s.user(), "bench"),
+    "DELETE_USER": lambda s: (s.user(),),
+    "GET_REQUESTS_COMPLETED": lambda s: (s.user(),),
+    "INCREMENT_REQUESTS_COMPLETED": lambda s: (s.user(),),
+    "SET_SKILL": lambda s: (s.user(), "bench", s.rng.choice(tuple(TradeSkill)).value, 100),
+    "LIST_SKILLS": lambda s: (),
+    "LIST_CRAFTERS": lambda s: (),
+    "GET_THREAD": lambda s: (s.request(),),
+    "GET_OPEN_THREAD": lambda s: (s.request(),),
+    "DELETE_THREAD": lambda s: (s.request(),),
+    "SET_THREAD": lambda s: (s.request(), "1"),
+    "LIST_OPEN_THREADS": lambda s: (s.batch(),),
+    "MARK_THREADS_ARCHIVED": lambda s: (s.batch(),),
+    "ACQUIRE_LEASE": lambda s: ("jobs", "leader", NOW_EPOCH + 30, NOW_EPOCH),
+    "RELEASE_LEASE": lambda s: ("jobs", "leader"),
+    "GET_LEASE_HOLDER": lambda s: ("jobs", NOW_EPOCH),
+    "SET_NOTIFY_MODE": lambda s: (s.user(), "DIGEST"),
+    "LIST_NOTIFY_MODES": lambda s: (),
+    "SNAPSHOT_REQUESTS": lambda s: (),
+    "SNAPSHOT_SKILLS": lambda s: (),
+    "SNAPSHOT_USERS": lambda s: (),
+}
+
+
+def production_queries() -> dict[str, str]:
+    """Every statement the bot runs, the db module's constants and the export streams."""
+    queries = {
+        name: value
+        for name, value in vars(db).items()
+        if name.isupper()
+        and isinstance(value, str)
+        and value.split(None, 1)[0].upper() in SQL_VERBS
+    }
+    for repo in db.Repo.__subclasses__():
+        queries[f"STREAM_{repo.table.upper()}"] = (
+            f"SELECT * FROM {repo.table} ORDER BY {repo.order_by}"
+        )
+    return queries
+
+
+def is_write(sql: str) -> bool:
+    return sql.split(None, 1)[0].upper() != "SELECT"
+
+
+def measure(
+    conn: sqlite3.Connection,
+    sql: str,
+    params: Callable[[], tuple],
+    min_runs: int,
+    max_runs: int,
+    budget: float,
+) -> tuple[list[float], int]:
+    """Time one round of a statement, returns the run times and the rows of the last run."""
+    writes = is_write(sql)
+
+    def execute(args: tuple) -> tuple[float, int]:
+        if writes:
+            conn.execute("SAVEPOINT bench")
+        start = time.perf_counter()
+        cursor = conn.execute(sql, args)
+        rows = len(cursor.fetchall()) if cursor.description else cursor.rowcount
+        elapsed = time.perf_counter() - start
+        if writes:
+            conn.execute("ROLLBACK TO bench")
+            conn.execute("RELEASE bench")
+        return elapsed, rows
+
+    # Warm the page cache and the statement cache before anything is timed
+    for _ in range(WARMUP_RUNS):
+        execute(params())
+
+    samples = []
+    rows = 0
+    deadline = time.perf_counter() + budget
+    gc.disable()
+    try:
+        while len(samples) < max_runs and (
+            len(samples) < min_runs or time.perf_counter() < deadline
+        ):
+            elapsed, rows = execute(params())
+            samples.append(elapsed)
+    finally:
+        gc.enable()
+
+    return samples, rows
+
+
+def run(args: argparse.Namespace) -> dict:
+    """Benchmark every statement, ``args.rounds`` times over the whole set.
+
+    Rounds are interleaved so a burst of load on the host skews one round of a few
+    statements rather than every run of one. Runs of every round are pooled, and
+    regressions are judged on the mean of the fastest ``FASTEST_FRACTION`` of them.
+    """
+    queries = production_queries()
+    missing = sorted(
+        name for name in queries if name not in PARAMS and not name.startswith("STREAM_")
+    )
+    if missing:
+        raise SystemExit(f"No benchmark parameters for {', '.join(missing)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"), isolation_level=None)
+        try:
+            generate(conn, args.users, args.requests, args.seed)
+
+            draws = {}
+            results = {}
+            for name, sql in sorted(queries.items()):
+                scale = Scale(random.Random(f"{args.seed}:{name}"), args.users, args.requests)
+                draw = PARAMS.get(name, lambda s: ())
+                draws[name] = lambda draw=draw, scale=scale: draw(scale)
+                results[name] = {
+                    "sql": sql,
+                    "plan": [
+                        row[3]
+                        for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", draws[name]())
+                    ],
+                    "samples": [],
+                }
+
+            for _ in range(args.rounds):
+                for name, result in results.items():
+                    samples, result["rows"] = measure(
+                        conn,
+                        result["sql"],
+                        draws[name],
+                        args.min_runs,
+                        args.max_runs,
+                        args.budget / args.rounds,
+                    )
+                    result["samples"] += samples
+        finally:
+            conn.close()
+
+    queries = {}
+    for name, result in results.items():
+        samples = sorted(result["samples"])
+        fastest = samples[: max(1, int(len(samples) * FASTEST_FRACTION))]
+        queries[name] = {
+            "sql": result["sql"],
+            "plan": result["plan"],
+            "writes": is_write(result["sql"]),
+            "runs": len(samples),
+            "rows": result["rows"],
+            "fastest_us": round(statistics.fmean(fastest) * 1e6, 2),
+            "median_us": round(statistics.median(samples) * 1e6, 2),
+            "p95_us": round(samples[int((len(samples) - 1) * 0.95)] * 1e6, 2),
+        }
+
+    return {
+        "version": REPORT_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "dataset": {"users": args.users, "requests": args.requests, "seed": args.seed},
+        "queries": queries,
+    }
+
+
+def full_scans(plan: list[str]) -> set[str]:
+    """Tables a query plan reads in full, covering index scans aside."""
+    return {
+        step.split()[1]
+        for step in plan
+        if step.startswith("SCAN ")
+        and "COVERING INDEX" not in step
+        and "VIRTUAL TABLE" not in step
+    }
+
+
+def compare(
+    report: dict,
+    baseline: dict,
+    threshold: float,
+    noise_floor_us: float,
+    write_noise_floor_us: float,
+) -> tuple[list[str], list[str]]:
+    """Returns the regressions, and notes about plan changes and new or gone queries.
+
+    A statement regressed when its fastest runs are more than ``threshold`` (a
+    fraction) slower than the baseline's and by more than the noise floor, or when
+    its plan scans a table the baseline's plan didn't. Writes have a floor of their
+    own, ``write_noise_floor_us``, as the savepoint around them makes them noisier.
+    Timings only compare between runs on the same machine, plans compare anywhere.
+    """
+    if baseline.get("version") != REPORT_VERSION:
+        raise SystemExit(
+            f"Baseline is report version {baseline.get('version')}, regenerate it with this version ({REPORT_VERSION})"
+        )
+    if report["dataset"] != baseline["dataset"]:
+        raise SystemExit(
+            f"Baseline dataset {baseline['dataset']} doesn't match {report['dataset']}"
+        )
+
+    regressions, notes = [], []
+    current, previous = report["queries"], baseline["queries"]
+    for name in sorted(current.keys() | previous.keys()):
+        if name not in previous:
+            notes.append(f"{name}: new, no baseline")
+            continue
+        if name not in current:
+            notes.append(f"{name}: no longer run")
+            continue
+
+        now, before = current[name]["fastest_us"], previous[name]["fastest_us"]
+        floor = write_noise_floor_us if current[name]["writes"] else noise_floor_us
+        if now > before * (1 + threshold) and now - before > floor:
+            regressions.append(
+                f"{name}: fastest runs {before:.1f}us -> {now:.1f}us ({now / before - 1:+.0%})"
+            )
+        if current[name]["plan"] == previous[name]["plan"]:
+            continue
+        scans = full_scans(current[name]["plan"]) - full_scans(previous[name]["plan"])
+        if scans:
+            regressions.append(f"{name}: now scans {', '.join(sorted(scans))}")
+        notes.append(
+            f"{name}: plan changed from {previous[name]['plan']} to {current[name]['plan']}"
+        )
+    return regressions, notes
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument(
+        "--min-runs", type=int, default=3, help="Runs of each statement per round"
+    )
+    parser.add_argument("--max-runs", type=int, default=300)
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=1.5,
+        help="Seconds spent timing each statement, across all rounds",
+    )
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Compare against this JSON report")
+    parser.add_argument(
+        "--threshold", type=float, default=0.5, help="Allowed slowdown, as a fraction"
+    )
+    parser.add_argument(
+        "--noise-floor",
+        type=float,
+        default=25.0,
+        help="Slowdowns of reads smaller than this many microseconds are ignored",
+    )
+    parser.add_argument(
+        "--write-noise-floor",
+        type=float,
+        default=100.0,
+        help="Slowdowns of writes smaller than this many microseconds are ignored",
+    )
+    args = parser.parse_args(argv)
+
+    report = run(args)
+
+    print(f"sqlite {report['sqlite']}, {args.users} users, {args.requests} requests")
+    print(
+        f"{'query':<32} {'fastest (us)':>12} {'median (us)':>12} {'p95 (us)':>10} {'rows':>8}  plan"
+    )
+    for name, result in report["queries"].items():
+        print(
+            f"{name:<32} {result['fastest_us']:>12.1f} {result['median_us']:>12.1f} {result['p95_us']:>10.1f} {result['rows']:>8}  {'; '.join(result['plan'])}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions, notes = compare(
+        report, baseline, args.threshold, args.noise_floor, args.write_noise_floor
+    )
+    for note in notes:
+        print(f"note: {note}")
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    if regressions:
+        print(f"{len(regressions)} statement(s) slowed down more than {args.threshold:.0%}")
+        return 1
+    print(f"No statement slowed down more than {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Measure event loop latency while insight reports render.
+
+A probe task sleeps 1ms at a time and records how late it wakes up, standing in
+for interaction handling. It runs on an idle loop, then while reports render on
+the event loop, in a worker thread and in ReportRenderer's process pool.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_reports --requests 200000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from ser_gawain.analytics import Insight, build_snapshot
+from ser_gawain.db import SCHEMA
+from ser_gawain.reports import ReportRenderer, render_insight, snapshot_version
+
+
+# Reports rendered per run, cycling through every insight
+REPORTS = 20
+PROBE_INTERVAL = 0.001
+
+
+def seed(path: str, num_requests: int) -> None:
+    rng = random.Random(0)
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(SCHEMA)
+    conn.executemany(
+        "INSERT INTO users (user_id, user_name) VALUES (?, ?)",
+        ((str(i), f"user{i}") for i in range(500)),
+    )
+    conn.executemany(
+        "INSERT INTO crafting_requests (requestor_id, user_name, item_name, has_materials, amount, trade_skill, level_required, status, accepted_by, created_at, completed_on) VALUES (?, ?, ?, 1, ?, 'Arcana', 0, 'COMPLETED', ?, datetime('now', ?), datetime('now', ?))",
+        (
+            (str(i % 500), f"user{i % 500}", f"Item {i % 2000}", rng.randint(1, 10), str(rng.randrange(500)), f"-{i % 365} days", f"-{i % 365} days")
+            for i in range(num_requests)
+        ),
+    )
+    build_snapshot(conn, path)
+    conn.close()
+
+
+async def probe(stop: asyncio.Event) -> list[float]:
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+    return lags
+
+
+async def measure(name: str, render) -> None:
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await render()
+    elapsed = time.perf_counter() - start
+    stop.set()
+
+    lags = await probe_task
+    p99 = statistics.quantiles(lags, n=100, method="inclusive")[98] if len(lags) > 1 else lags[0]
+    print(
+        f"{name:<10} {elapsed:7.2f}s  lag p50 {statistics.median(lags) * 1000:7.2f}ms  "
+        f"p99 {p99 * 1000:7.2f}ms  max {max(lags) * 1000:7.2f}ms"
+    )
+
+
+async def main(num_requests: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "gawain.snapshot")
+        seed(path, num_requests)
+        now = time.time()
+        insights = [list(Insight)[i % len(Insight)] for i in range(REPORTS)]
+
+        async def idle():
+            await asyncio.sleep(1)
+
+        async def inline():
+            for insight in insights:
+                render_insight(path, insight, 365, now)
+                # Each report is its own interaction, let the loop run in between
+                await asyncio.sleep(0)
+
+        async def thread():
+            for insight in insights:
+                await asyncio.to_thread(render_insight, path, insight, 365, now)
+
+        reports = ReportRenderer()
+
+        async def pool():
+            # New versions every time, so nothing is served from the cache
+            for version, insight in enumerate(insights, snapshot_version(path)):
+                await reports.render(insight, version, render_insight, path, insight, 365, now)
+
+        try:
+            # Spawn the workers before measuring
+            await reports.render("warmup", 0, sorted, [])
+            await measure("idle", idle)
+            await measure("inline", inline)
+            await measure("thread", thread)
+            await measure("pool", pool)
+        finally:
+            reports.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,128 @@
+"""Compare per-query overhead of the repositories against hand-written cursor blocks.
+
+The "cursor" numbers reproduce how the cogs queried the database before the
+repository layer: a fresh cursor context per command, ad-hoc SQL and sqlite3.Row
+access by column name.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_repos --requests 5000 --iterations 2000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from ser_gawain.db import Database
+from ser_gawain.models import Status
+
+
+async def seed(db: Database, num_requests: int) -> None:
+    await db.skills.set_many([(str(i), f"user{i}", "Arcana", i % 251) for i in range(50)])
+    async with db.conn.cursor(transaction=True) as cursor:
+        await cursor.executemany(
+            "INSERT INTO crafting_requests (requestor_id, user_name, item_name, has_materials, amount, trade_skill, level_required, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (str(i % 50), f"user{i % 50}", f"Item {i}", i % 2, 1, "Arcana", i % 251, tuple(Status)[i % 4].name)
+                for i in range(num_requests)
+            ),
+        )
+
+
+async def cursor_get(db: Database, request_id: int) -> str:
+    async with db.conn.cursor() as cursor:
+        await cursor.execute(
+            "SELECT * FROM crafting_requests WHERE request_id = ?", (request_id,)
+        )
+        job = await cursor.fetchone()
+    return job["requestor_id"]
+
+
+async def repo_get(db: Database, request_id: int) -> str:
+    job = await db.requests.get(request_id)
+    return job.requestor_id
+
+
+async def cursor_list(db: Database, status: Status) -> int:
+    async with db.conn.cursor() as cursor:
+        await cursor.execute(
+            "SELECT request_id, user_name, item_name, CASE WHEN has_materials = 0 THEN 'Yes' ELSE 'No' END as has_materials, amount, status FROM crafting_requests WHERE status = ?",
+            (status.value.upper(),),
+        )
+        jobs = await cursor.fetchall()
+    return sum(job["amount"] for job in jobs)
+
+
+async def repo_list(db: Database, status: Status) -> int:
+    jobs = await db.requests.all(status)
+    return sum(job.amount for job in jobs)
+
+
+async def cursor_accept(db: Database, request_id: int) -> None:
+    async with db.conn.cursor() as cursor:
+        await cursor.execute(
+            "SELECT requestor_id FROM crafting_requests WHERE request_id = ? AND status = 'PENDING'",
+            (request_id,),
+        )
+        await cursor.fetchone()
+        await cursor.execute(
+            "UPDATE crafting_requests SET status = 'ACCEPTED', accepted_by = ? WHERE request_id = ?",
+            ("1", request_id),
+        )
+        await db.conn.commit()
+
+
+async def repo_accept(db: Database, request_id: int) -> None:
+    await db.requests.get(request_id)
+    await db.requests.accept(request_id, "1")
+
+
+async def timed(db: Database, func, args_list) -> float:
+    start = time.perf_counter()
+    for args in args_list:
+        await func(db, *args)
+    return (time.perf_counter() - start) / len(args_list) * 1_000_000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    ids = [(rng.randint(1, args.requests),) for _ in range(args.iterations)]
+    lists = [(tuple(Status)[i % 4],) for i in range(max(args.iterations // 20, 10))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = await Database.connect(os.path.join(tmp, "bench.db"))
+        try:
+            await db.create_tables()
+            await seed(db, args.requests)
+
+            # Each accept needs a fresh PENDING row, so reset them between runs
+            reset = "UPDATE crafting_requests SET status = 'PENDING', accepted_by = NULL"
+
+            results = {}
+            results["get"] = (await timed(db, cursor_get, ids), await timed(db, repo_get, ids))
+            results["list"] = (
+                await timed(db, cursor_list, lists),
+                await timed(db, repo_list, lists),
+            )
+            await db.conn.execute(reset)
+            cursor_accept_us = await timed(db, cursor_accept, ids)
+            await db.conn.execute(reset)
+            results["accept"] = (cursor_accept_us, await timed(db, repo_accept, ids))
+        finally:
+            await db.close()
+
+    print(f"{'query':<8} {'cursor (us)':>12} {'repo (us)':>12} {'ratio':>7}")
+    for name, (cursor_us, repo_us) in results.items():
+        print(f"{name:<8} {cursor_us:>12.1f} {repo_us:>12.1f} {cursor_us / repo_us:>6.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
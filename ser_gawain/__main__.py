@@ -1,12 +1,16 @@
 import asyncio
-import asqlite
 import discord
 import logging
 import os
+from typing import Optional
 from discord.ext import commands
 from discord.app_commands import CommandTree
 from dotenv import load_dotenv
 from logging.handlers import RotatingFileHandler
+from ser_gawain.backup import BackupManager
+from ser_gawain.db import DEFAULT_BACKEND, Database, connect
+from ser_gawain.leader import LeaderElection
+from ser_gawain.memory import ClientOptions, Profile, client_options
 
 
 load_dotenv()
@@ -14,6 +18,18 @@ load_dotenv()
 
 GUILD_ID = discord.Object(id=int(os.getenv("GUILD_ID")))
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
+# Every process of a deployment points at the same database file
+DATABASE_PATH = os.getenv("DATABASE_PATH", "gawain.db")
+# One of ser_gawain.db.BACKENDS, DATABASE_PATH is passed to it as the DSN
+DATABASE_BACKEND = os.getenv("DATABASE_BACKEND", DEFAULT_BACKEND)
+# Run one gateway shard per process by giving each its SHARD_ID out of SHARD_COUNT
+SHARD_ID = int(os.getenv("SHARD_ID")) if os.getenv("SHARD_ID") else None
+SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+# Ship WAL segments between base backups for point-in-time restores
+BACKUP_WAL_SHIPPING = os.getenv("BACKUP_WAL_SHIPPING", "").lower() in ("1", "true", "yes")
+# "low_memory" drops the member and message caches for large guilds
+MEMORY_PROFILE = Profile(os.getenv("MEMORY_PROFILE", Profile.STANDARD.value))
 DESCRIPTION = "Ser Gawain is a New World Aeternum bot that handles Company crafting requests and more."
 
 # Create formatters and handlers
@@ -56,79 +72,63 @@ class GawainTree(CommandTree):
 
 
 class Gawain(commands.Bot):
-    def __init__(self, *, intents: discord.Intents):
+    def __init__(
+        self,
+        *,
+        options: ClientOptions,
+        shard_id: Optional[int] = None,
+        shard_count: Optional[int] = None,
+    ):
         super().__init__(
             command_prefix="",
-            intents=intents,
             description=DESCRIPTION,
             tree_cls=GawainTree,
+            shard_id=shard_id,
+            shard_count=shard_count,
+            **options.kwargs(),
         )
-        self.conn = None
+        self.db: Database = None
+        self.leader: LeaderElection = None
+        self.backups: BackupManager = None
 
     async def setup_hook(self):
-        self.conn = await asqlite.connect("gawain.db")
-        await self.create_tables()
+        # The database is shared by every cog and closed only when the bot shuts down
+        self.db = await connect(DATABASE_PATH, DATABASE_BACKEND)
+        await self.db.create_tables()
+
+        # Background jobs run in whichever process holds the lease
+        self.leader = LeaderElection(self.db)
+        await self.leader.start()
+
+        self.backups = BackupManager(
+            self.db, BACKUP_DIR, ship_wal=BACKUP_WAL_SHIPPING, leader=self.leader
+        )
+        await self.backups.start()
 
         # Load Extensions
-        await self.load_extension("commands.crafting")
-        await self.load_extension("commands.users")
-
-    async def create_tables(self):
-        async with self.conn.cursor() as cursor:
-            await cursor.executescript(
-                """
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id TEXT PRIMARY KEY,
-                    user_name TEXT,
-                    requests_completed INTEGER DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-
-                CREATE TABLE IF NOT EXISTS crafting_requests (
-                    request_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    requestor_id TEXT,
-                    user_name TEXT,
-                    item_name TEXT,
-                    has_materials BOOLEAN,
-                    amount INTEGER,
-                    trade_skill TEXT,
-                    level_required INTEGER CHECK(level_required >= 0 AND level_required <= 250),
-                    status TEXT,
-                    accepted_by TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    completed_on TIMESTAMP DEFAULT NULL,
-                    FOREIGN KEY (accepted_by) REFERENCES users(user_id)
-                );
-
-                CREATE TABLE IF NOT EXISTS trade_skills (
-                    skill_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT,
-                    user_name TEXT,
-                    skill_name TEXT,
-                    skill_level INTEGER CHECK(skill_level >= 0 AND skill_level <= 250),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users(user_id),
-                    UNIQUE (user_id, skill_name)
-                );
-            """
-            )
-            await self.conn.commit()
+        await self.load_extension("ser_gawain.commands.crafting")
+        await self.load_extension("ser_gawain.commands.users")
 
     async def on_ready(self):
         logging.info(f"Logged on as {self.user}!")
 
     async def close(self):
-        if self.conn:
-            await self.conn.close()
+        # Cogs are unloaded by super().close() and may still need the database
         await super().close()
-
-
-intents = discord.Intents.default()
-intents.reactions = True
-intents.message_content = True
-intents.members = True
-
-bot = Gawain(intents=intents)
+        if self.backups:
+            await self.backups.close()
+        if self.leader:
+            await self.leader.close()
+        if self.db:
+            await self.db.close()
+
+
+logging.info(f"Using the {MEMORY_PROFILE.value} memory profile")
+bot = Gawain(
+    options=client_options(MEMORY_PROFILE),
+    shard_id=SHARD_ID,
+    shard_count=SHARD_COUNT,
+)
 
 # Run the bot
 bot.run(DISCORD_TOKEN, log_level=logging.INFO)
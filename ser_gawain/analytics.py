@@ -0,0 +1,383 @@
+import array
+import json
+import mmap
+import os
+import sqlite3
+import statistics
+import struct
+import time
+from collections import Counter, defaultdict
+from enum import Enum
+from itertools import compress
+from typing import Optional
+from ser_gawain.db import SNAPSHOT_REQUESTS, SNAPSHOT_SKILLS, SNAPSHOT_USERS
+from ser_gawain.models import (
+    STATUS_CODES,
+    TRADE_SKILL_CODES,
+    TRADE_SKILL_LABELS,
+    Status,
+)
+
+
+# Snapshot file layout: magic, header length, JSON header, then one block per
+# column. Each block is a native array aligned to 8 bytes, so a reader can cast the
+# memory-mapped bytes in place instead of parsing them.
+SNAPSHOT_MAGIC = b"GAWSNAP1"
+SNAPSHOT_ALIGNMENT = 8
+_HEADER_LENGTH = struct.Struct("<Q")
+
+# Stands in for NULL in the fixed-width columns: timestamps, codes and levels
+NULL_CODE = -1
+
+# Columns of each snapshot table and their array typecodes. Text columns are
+# dictionary encoded, the values live in the header and the column holds indexes.
+REQUEST_COLUMNS = {
+    "created_at": "q",
+    "completed_on": "q",
+    "status": "b",
+    "skill": "b",
+    "level_required": "h",
+    "amount": "q",
+    "item": "l",
+    "requestor": "l",
+    "accepted_by": "l",
+}
+SKILL_COLUMNS = {
+    "user": "l",
+    "skill": "b",
+    "level": "h",
+}
+
+COMPLETED = STATUS_CODES[Status.COMPLETED.name]
+PENDING = STATUS_CODES[Status.PENDING.name]
+
+# Rows shown per insight, keeps the rendered table inside an embed description
+INSIGHT_ROWS = 15
+
+
+class Insight(Enum):
+    TURNAROUND = "turnaround"
+    TOP_ITEMS = "top_items"
+    CRAFTERS = "crafters"
+    SKILLS = "skills"
+    COMPLETIONS = "completions"
+
+
+class _Dictionary:
+    """Assigns each distinct value the next integer code, in first-seen order."""
+
+    def __init__(self):
+        self.codes: dict[str, int] = {}
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return NULL_CODE
+        return self.codes.setdefault(value, len(self.codes))
+
+    @property
+    def values(self) -> list[str]:
+        return list(self.codes)
+
+
+def _code(value: Optional[int]) -> int:
+    return NULL_CODE if value is None else value
+
+
+def build_snapshot(conn: sqlite3.Connection, path: str) -> int:
+    """Write a columnar snapshot of the crafting tables to ``path``.
+
+    Blocking, meant to run in a worker thread against its own connection. The file is
+    written next to ``path`` and swapped in atomically, so readers holding the old
+    snapshot open keep a consistent view. Returns the number of requests written.
+    """
+    items = _Dictionary()
+    users = _Dictionary()
+
+    requests = {name: array.array(code) for name, code in REQUEST_COLUMNS.items()}
+    for (
+        created_at,
+        completed_on,
+        status,
+        trade_skill,
+        level_required,
+        amount,
+        item_name,
+        requestor_id,
+        accepted_by,
+    ) in conn.execute(SNAPSHOT_REQUESTS):
+        requests["created_at"].append(_code(created_at))
+        requests["completed_on"].append(_code(completed_on))
+        requests["status"].append(STATUS_CODES.get(status, NULL_CODE))
+        requests["skill"].append(TRADE_SKILL_CODES.get(trade_skill, NULL_CODE))
+        requests["level_required"].append(_code(level_required))
+        requests["amount"].append(amount or 0)
+        requests["item"].append(items.encode(item_name))
+        requests["requestor"].append(users.encode(requestor_id))
+        requests["accepted_by"].append(users.encode(accepted_by))
+
+    skills = {name: array.array(code) for name, code in SKILL_COLUMNS.items()}
+    for user_id, skill_name, skill_level in conn.execute(SNAPSHOT_SKILLS):
+        skills["user"].append(users.encode(user_id))
+        skills["skill"].append(TRADE_SKILL_CODES.get(skill_name, NULL_CODE))
+        skills["level"].append(_code(skill_level))
+
+    user_names = dict(conn.execute(SNAPSHOT_USERS))
+
+    tables = {"requests": requests, "skills": skills}
+    header = {
+        "created_at": time.time(),
+        "dictionaries": {
+            "items": items.values,
+            "users": users.values,
+            "user_names": [user_names.get(user_id) for user_id in users.values],
+        },
+        "tables": {},
+    }
+
+    offset = 0
+    for table, columns in tables.items():
+        rows = len(next(iter(columns.values())))
+        header["tables"][table] = {"rows": rows, "columns": {}}
+        for name, column in columns.items():
+            offset += -offset % SNAPSHOT_ALIGNMENT
+            header["tables"][table]["columns"][name] = {
+                "typecode": column.typecode,
+                "offset": offset,
+                "length": len(column),
+            }
+            offset += len(column) * column.itemsize
+
+    header_bytes = json.dumps(header).encode()
+    prefix = len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size + len(header_bytes)
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as snapshot_file:
+        snapshot_file.write(SNAPSHOT_MAGIC)
+        snapshot_file.write(_HEADER_LENGTH.pack(len(header_bytes)))
+        snapshot_file.write(header_bytes)
+        snapshot_file.write(bytes(-prefix % SNAPSHOT_ALIGNMENT))
+
+        written = 0
+        for columns in tables.values():
+            for column in columns.values():
+                snapshot_file.write(bytes(-written % SNAPSHOT_ALIGNMENT))
+                written += -written % SNAPSHOT_ALIGNMENT
+                column.tofile(snapshot_file)
+                written += len(column) * column.itemsize
+
+    os.replace(temp_path, path)
+    return len(requests["status"])
+
+
+def refresh_snapshot(database: str, path: str) -> int:
+    """Snapshot ``database`` through a read-only connection of its own.
+
+    The bot's shared connection is never used, so building a snapshot doesn't queue
+    behind (or hold up) commands.
+    """
+    conn = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+    try:
+        return build_snapshot(conn, path)
+    finally:
+        conn.close()
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot file.
+
+    Columns are returned as ``memoryview`` casts over the mapping, nothing is copied
+    until an aggregation reads it. Use as a context manager and don't keep columns
+    past the ``with`` block.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as snapshot_file:
+            self._mmap = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        if self._view[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an analytics snapshot")
+
+        start = len(SNAPSHOT_MAGIC)
+        (header_length,) = _HEADER_LENGTH.unpack_from(self._view, start)
+        start += _HEADER_LENGTH.size
+        header = json.loads(bytes(self._view[start : start + header_length]))
+        start += header_length
+        self._data_start = start + -start % SNAPSHOT_ALIGNMENT
+
+        self.created_at: float = header["created_at"]
+        self.items: list[str] = header["dictionaries"]["items"]
+        self.users: list[str] = header["dictionaries"]["users"]
+        self.user_names: list[Optional[str]] = header["dictionaries"]["user_names"]
+        self._tables: dict = header["tables"]
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def rows(self, table: str) -> int:
+        return self._tables[table]["rows"]
+
+    def column(self, table: str, name: str) -> memoryview:
+        spec = self._tables[table]["columns"][name]
+        start = self._data_start + spec["offset"]
+        size = array.array(spec["typecode"]).itemsize * spec["length"]
+        return self._view[start : start + size].cast(spec["typecode"])
+
+    def user_label(self, code: int) -> str:
+        return self.user_names[code] or self.users[code]
+
+    def close(self) -> None:
+        self._view.release()
+        self._mmap.close()
+
+
+def _turnaround(snapshot: Snapshot, since: int) -> tuple[list[str], list[tuple]]:
+    completed_on = snapshot.column("requests", "completed_on")
+    mask = [
+        status == COMPLETED and completed >= since and created != NULL_CODE
+        for status, completed, created in zip(
+            snapshot.column("requests", "status"),
+            completed_on,
+            snapshot.column("requests", "created_at"),
+        )
+    ]
+
+    hours: dict[int, list[float]] = defaultdict(list)
+    for skill, created, completed in compress(
+        zip(
+            snapshot.column("requests", "skill"),
+            snapshot.column("requests", "created_at"),
+            completed_on,
+        ),
+        mask,
+    ):
+        hours[skill].append((completed - created) / 3600)
+
+    rows = [
+        (
+            TRADE_SKILL_LABELS[skill] if skill != NULL_CODE else "None",
+            len(durations),
+            round(statistics.fmean(durations), 1),
+            round(statistics.median(durations), 1),
+        )
+        for skill, durations in hours.items()
+    ]
+    rows.sort(key=lambda row: row[1], reverse=True)
+    return ["Skill", "Completed", "Avg hours", "Median hours"], rows
+
+
+def _top_items(snapshot: Snapshot, since: int) -> tuple[list[str], list[tuple]]:
+    created_at = snapshot.column("requests", "created_at")
+    mask = [created >= since for created in created_at]
+
+    requests = Counter(compress(snapshot.column("requests", "item"), mask))
+    amounts: Counter = Counter()
+    for item, amount in compress(
+        zip(snapshot.column("requests", "item"), snapshot.column("requests", "amount")),
+        mask,
+    ):
+        amounts[item] += amount
+
+    rows = [
+        (snapshot.items[item] if item != NULL_CODE else "None", count, amounts[item])
+        for item, count in requests.most_common(INSIGHT_ROWS)
+    ]
+    return ["Item", "Requests", "Amount"], rows
+
+
+def _crafters(snapshot: Snapshot, since: int) -> tuple[list[str], list[tuple]]:
+    mask = [
+        status == COMPLETED and completed >= since
+        for status, completed in zip(
+            snapshot.column("requests", "status"),
+            snapshot.column("requests", "completed_on"),
+        )
+    ]
+    completed = Counter(compress(snapshot.column("requests", "accepted_by"), mask))
+    completed.pop(NULL_CODE, None)
+
+    rows = [
+        (snapshot.user_label(user), count)
+        for user, count in completed.most_common(INSIGHT_ROWS)
+    ]
+    return ["Crafter", "Completed"], rows
+
+
+def _skills(snapshot: Snapshot, since: int) -> tuple[list[str], list[tuple]]:
+    levels: dict[int, list[int]] = defaultdict(list)
+    for skill, level in zip(
+        snapshot.column("skills", "skill"), snapshot.column("skills", "level")
+    ):
+        if skill != NULL_CODE and level != NULL_CODE:
+            levels[skill].append(level)
+
+    pending = Counter(
+        compress(
+            snapshot.column("requests", "skill"),
+            [status == PENDING for status in snapshot.column("requests", "status")],
+        )
+    )
+
+    rows = [
+        (
+            label,
+            len(levels[skill]),
+            round(statistics.fmean(levels[skill])) if levels[skill] else 0,
+            max(levels[skill], default=0),
+            pending[skill],
+        )
+        for skill, label in enumerate(TRADE_SKILL_LABELS)
+    ]
+    return ["Skill", "Crafters", "Avg level", "Max level", "Pending"], rows
+
+
+def _completions(snapshot: Snapshot, since: int) -> tuple[list[str], list[tuple]]:
+    days = Counter(
+        completed // 86400
+        for status, completed in zip(
+            snapshot.column("requests", "status"),
+            snapshot.column("requests", "completed_on"),
+        )
+        if status == COMPLETED and completed >= since
+    )
+    if not days:
+        return ["Day", "Completed"], []
+
+    # One row per UTC day including the quiet ones, newest first
+    rows = [
+        (time.strftime("%Y-%m-%d", time.gmtime(day * 86400)), days[day])
+        for day in range(max(days), since // 86400 - 1, -1)
+    ]
+    return ["Day", "Completed"], rows
+
+
+_INSIGHTS = {
+    Insight.TURNAROUND: _turnaround,
+    Insight.TOP_ITEMS: _top_items,
+    Insight.CRAFTERS: _crafters,
+    Insight.SKILLS: _skills,
+    Insight.COMPLETIONS: _completions,
+}
+
+
+def compute_insight(
+    path: str,
+    insight: Insight,
+    days: int,
+    now: Optional[float] = None,
+    limit: Optional[int] = INSIGHT_ROWS,
+) -> tuple[list[str], list[tuple], float]:
+    """Aggregate ``insight`` over the last ``days`` days of the snapshot at ``path``.
+
+    Blocking, meant to run in a worker thread or process. Returns the table headers,
+    at most ``limit`` rows (all of them if None) and when the snapshot was taken.
+    Raises ``FileNotFoundError`` if no snapshot has been written yet.
+    """
+    since = int((time.time() if now is None else now) - days * 86400)
+    with Snapshot(path) as snapshot:
+        headers, rows = _INSIGHTS[insight](snapshot, since)
+        return headers, rows[:limit], snapshot.created_at
@@ -0,0 +1,71 @@
+import discord
+import logging
+from typing import Optional
+from ser_gawain.emojis import TRADE_SKILL_EMOJIS
+from ser_gawain.models import TradeSkill
+
+
+# Roles and emojis are matched to a trade skill by its lowercase name
+SKILL_ASSET_NAMES = {skill.value.lower(): skill for skill in TradeSkill}
+
+
+class GuildAssets:
+    """Trade skill roles and emojis of each guild, indexed by ``TradeSkill``.
+
+    Guild role and emoji collections are scanned only when a guild becomes available
+    or its roles or emojis change, every lookup in between is a dict access. Skills
+    a guild has no role for are logged whenever that set changes.
+    """
+
+    def __init__(self):
+        self._roles: dict[int, dict[TradeSkill, int]] = {}
+        self._emojis: dict[int, dict[TradeSkill, str]] = {}
+        self._missing: dict[int, frozenset[TradeSkill]] = {}
+
+    def __len__(self) -> int:
+        return len(self._roles)
+
+    def index(self, guild: discord.Guild) -> None:
+        """Rebuild the indexes of one guild from its cached roles and emojis."""
+        roles = {}
+        # Roles are ordered from the bottom, the lowest of duplicates wins as before
+        for role in guild.roles:
+            skill = SKILL_ASSET_NAMES.get(role.name)
+            if skill is not None:
+                roles.setdefault(skill, role.id)
+
+        emojis = {}
+        for emoji in guild.emojis:
+            skill = SKILL_ASSET_NAMES.get(emoji.name)
+            if skill is not None and emoji.available:
+                emojis.setdefault(skill, str(emoji))
+
+        self._roles[guild.id] = roles
+        self._emojis[guild.id] = emojis
+
+        missing = frozenset(TradeSkill) - roles.keys()
+        if missing and missing != self._missing.get(guild.id):
+            names = ", ".join(sorted(skill.value.lower() for skill in missing))
+            logging.warning(
+                f"Guild {guild.name} ({guild.id}) has no role named {names}, requests for those skills won't ping anyone"
+            )
+        self._missing[guild.id] = missing
+
+    def forget(self, guild_id: int) -> None:
+        self._roles.pop(guild_id, None)
+        self._emojis.pop(guild_id, None)
+        self._missing.pop(guild_id, None)
+
+    def role(self, guild_id: Optional[int], skill: TradeSkill) -> Optional[int]:
+        """ID of the role pinged for the skill, None if the guild has none."""
+        return self._roles.get(guild_id, {}).get(skill)
+
+    def emoji(self, guild_id: Optional[int], skill: TradeSkill) -> str:
+        """The guild's emoji for the skill, or the bundled fallback."""
+        return self._emojis.get(guild_id, {}).get(skill) or TRADE_SKILL_EMOJIS[skill]
+
+    def label(self, guild_id: Optional[int], skill: Optional[TradeSkill]) -> str:
+        """Skill name with its emoji, as shown in embeds."""
+        if skill is None:
+            return "None"
+        return f"{self.emoji(guild_id, skill)} {skill.value}"
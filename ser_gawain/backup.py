@@ -0,0 +1,556 @@
+import argparse
+import asyncio
+import gzip
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from discord.ext import tasks
+from typing import Optional
+from ser_gawain.db import Database
+from ser_gawain.leader import LeaderElection
+
+
+# Pages copied per step of the online backup, with a short pause after each step
+# so the bot's own connection is never starved while a backup runs
+BACKUP_STEP_PAGES = 64
+BACKUP_STEP_PAUSE = 0.002  # seconds
+
+# Writes from the bot make SQLite restart a stepped backup. After this many restarts
+# the rest is copied in one step, which under WAL only pins a read snapshot.
+BACKUP_MAX_RESTARTS = 5
+
+BACKUP_INTERVAL = 6  # hours
+BACKUP_KEEP = 7
+
+WAL_SHIP_INTERVAL = 60  # seconds
+# Once this much WAL has been shipped the WAL is checkpointed so SQLite restarts it
+WAL_ROLLOVER_SIZE = 4 * 1024 * 1024  # 4MB
+# How long a ship waits for the write lock before skipping to the next interval
+WAL_LOCK_TIMEOUT = 0.25  # seconds
+
+TIMESTAMP_FORMAT = "%Y%m%dT%H%M%SZ"
+
+# gawain-<taken at>[-<first WAL segment>-<segment it is consistent from>].db.gz
+BASE_PATTERN = re.compile(r"^gawain-(\d{8}T\d{6}Z)(?:-(\d{8})-(\d{8}))?\.db\.gz$")
+# wal-<sequence>-<shipped at>-<WAL salt>-<byte offset in the WAL>.gz
+SEGMENT_PATTERN = re.compile(r"^wal-(\d{8})-(\d{8}T\d{6}Z)-([0-9a-f]{16})-(\d{12})\.gz$")
+
+_WAL_HEADER = struct.Struct(">8I")
+_FRAME_HEADER = struct.Struct(">6I")
+
+
+def _timestamp(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+def _parse_timestamp(value: str) -> datetime:
+    return datetime.strptime(value, TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+
+
+@dataclass(slots=True)
+class BaseBackup:
+    path: str
+    taken_at: datetime
+    # First WAL segment of the generation the backup was taken in, and the segment
+    # shipped right after it. Both are None when WAL shipping was off.
+    generation: Optional[int]
+    ready: Optional[int]
+
+
+@dataclass(slots=True)
+class WalSegment:
+    path: str
+    sequence: int
+    shipped_at: datetime
+    salt: str
+    start: int
+
+
+def list_backups(backup_dir: str) -> tuple[list[BaseBackup], list[WalSegment]]:
+    """Base backups and WAL segments in ``backup_dir``, oldest first."""
+    bases = []
+    segments = []
+    for name in os.listdir(backup_dir):
+        path = os.path.join(backup_dir, name)
+        if match := BASE_PATTERN.match(name):
+            taken_at, generation, ready = match.groups()
+            bases.append(
+                BaseBackup(
+                    path,
+                    _parse_timestamp(taken_at),
+                    int(generation) if generation else None,
+                    int(ready) if ready else None,
+                )
+            )
+        elif match := SEGMENT_PATTERN.match(name):
+            sequence, shipped_at, salt, start = match.groups()
+            segments.append(
+                WalSegment(
+                    path, int(sequence), _parse_timestamp(shipped_at), salt, int(start)
+                )
+            )
+
+    bases.sort(key=lambda base: base.taken_at)
+    segments.sort(key=lambda segment: segment.sequence)
+    return bases, segments
+
+
+def backup_database(database: str, target: str) -> None:
+    """Copy ``database`` to ``target`` with the SQLite online backup API.
+
+    Blocking, meant to run in a worker thread. Uses its own read-only connection and
+    copies ``BACKUP_STEP_PAGES`` pages per step, so the bot's writes carry on while
+    the backup runs and the result is never a torn file.
+    """
+    source = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+    destination = sqlite3.connect(target)
+
+    last_remaining = None
+    restarts = 0
+
+    class TooManyRestarts(Exception):
+        pass
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        nonlocal last_remaining, restarts
+        # SQLite starts over when the source is written to from another connection
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > BACKUP_MAX_RESTARTS:
+                raise TooManyRestarts()
+        last_remaining = remaining
+        time.sleep(BACKUP_STEP_PAUSE)
+
+    try:
+        try:
+            source.backup(destination, pages=BACKUP_STEP_PAGES, progress=progress)
+        except TooManyRestarts:
+            logging.warning(
+                f"Backup of {database} restarted {restarts} times, copying the rest in one step"
+            )
+            source.backup(destination)
+    finally:
+        source.close()
+        destination.close()
+
+
+def _gzip_file(source: str, target: str) -> None:
+    temp_target = f"{target}.tmp"
+    with open(source, "rb") as source_file, gzip.open(temp_target, "wb") as target_file:
+        shutil.copyfileobj(source_file, target_file)
+    os.replace(temp_target, target)
+
+
+def rotate_backups(backup_dir: str, keep: int = BACKUP_KEEP) -> int:
+    """Delete all but the newest ``keep`` base backups and the WAL they no longer need.
+
+    Returns the number of files removed.
+    """
+    bases, segments = list_backups(backup_dir)
+    if len(bases) <= keep:
+        return 0
+
+    expired = bases[:-keep]
+    kept = bases[-keep:]
+    oldest_generation = min(
+        (base.generation for base in kept if base.generation is not None),
+        default=None,
+    )
+    if oldest_generation is not None:
+        expired += [
+            segment for segment in segments if segment.sequence < oldest_generation
+        ]
+
+    for backup in expired:
+        os.remove(backup.path)
+    return len(expired)
+
+
+class WalShipper:
+    """Copies committed WAL frames into compressed, numbered segments.
+
+    The bot's connection runs with ``wal_autocheckpoint=0`` while shipping is on, so
+    the WAL is only ever reset here: each ship takes the write lock for the moment it
+    takes to copy the frames committed since the last one, and once enough has been
+    shipped it checkpoints everything so the next write starts a new WAL generation.
+    No frame can be overwritten before it has been shipped.
+
+    Not thread safe, calls must be serialized by the caller.
+    """
+
+    def __init__(self, database: str, backup_dir: str):
+        self.database = database
+        self.wal_path = f"{database}-wal"
+        self.backup_dir = backup_dir
+
+        _, segments = list_backups(backup_dir)
+        self.next_sequence = segments[-1].sequence + 1 if segments else 0
+        # The first segment of the WAL generation being shipped
+        self.generation = self.next_sequence
+        self._salt: Optional[bytes] = None
+        self._offset = 0
+
+        self._lock_conn = sqlite3.connect(
+            database,
+            isolation_level=None,
+            timeout=WAL_LOCK_TIMEOUT,
+            check_same_thread=False,
+        )
+        self._checkpoint_conn = sqlite3.connect(
+            database, isolation_level=None, check_same_thread=False
+        )
+
+    def _committed_end(self, wal_file, page_size: int, salt: bytes) -> int:
+        """Offset just past the last commit frame of the current generation."""
+        position = end = max(self._offset, _WAL_HEADER.size)
+        frame_size = _FRAME_HEADER.size + page_size
+        wal_size = os.fstat(wal_file.fileno()).st_size
+
+        while position + frame_size <= wal_size:
+            wal_file.seek(position)
+            _, commit_size, salt_1, salt_2, _, _ = _FRAME_HEADER.unpack(
+                wal_file.read(_FRAME_HEADER.size)
+            )
+            # Frames left over from an earlier generation carry the old salt
+            if struct.pack(">2I", salt_1, salt_2) != salt:
+                break
+            position += frame_size
+            if commit_size:
+                end = position
+        return end
+
+    def _read_frames(self) -> Optional[tuple[str, bytes]]:
+        """Read the frames committed since the last ship and name their segment."""
+        try:
+            wal_file = open(self.wal_path, "rb")
+        except FileNotFoundError:
+            return None
+
+        with wal_file:
+            header = wal_file.read(_WAL_HEADER.size)
+            if len(header) < _WAL_HEADER.size:
+                return None
+
+            _, _, page_size, _, salt_1, salt_2, _, _ = _WAL_HEADER.unpack(header)
+            salt = struct.pack(">2I", salt_1, salt_2)
+            if salt != self._salt:
+                # SQLite restarted the WAL, ship the new generation from its header
+                self._salt = salt
+                self._offset = 0
+                self.generation = self.next_sequence
+
+            end = self._committed_end(wal_file, page_size, salt)
+            if end <= max(self._offset, _WAL_HEADER.size):
+                return None
+
+            wal_file.seek(self._offset)
+            data = wal_file.read(end - self._offset)
+
+        name = f"wal-{self.next_sequence:08d}-{_timestamp(datetime.now(timezone.utc))}-{salt.hex()}-{self._offset:012d}.gz"
+        self.next_sequence += 1
+        self._offset = end
+        return name, data
+
+    def ship(self) -> Optional[str]:
+        """Ship the frames committed since the last call, returns the new segment if any.
+
+        Blocking, meant to run in a worker thread. Skips (returning None) if the write
+        lock can't be taken within ``WAL_LOCK_TIMEOUT``. The lock is only held while
+        the frames are read, they are compressed after it is released.
+        """
+        try:
+            self._lock_conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            logging.warning(f"Skipping WAL ship, could not lock {self.database}: {e}")
+            return None
+
+        try:
+            frames = self._read_frames()
+
+            if self._offset >= WAL_ROLLOVER_SIZE:
+                # Every frame is read and writers are locked out, so backfilling the
+                # whole WAL lets the next write restart it without losing anything
+                busy, log, checkpointed = self._checkpoint_conn.execute(
+                    "PRAGMA wal_checkpoint(PASSIVE)"
+                ).fetchone()
+                if not busy and log == checkpointed:
+                    logging.info(f"Checkpointed {log} WAL frames after shipping")
+        finally:
+            self._lock_conn.execute("ROLLBACK")
+
+        if frames is None:
+            return None
+
+        name, data = frames
+        path = os.path.join(self.backup_dir, name)
+        with gzip.open(f"{path}.tmp", "wb") as segment_file:
+            segment_file.write(data)
+        os.replace(f"{path}.tmp", path)
+        return path
+
+    def close(self) -> None:
+        self._lock_conn.close()
+        self._checkpoint_conn.close()
+
+
+class BackupManager:
+    """Takes rotating base backups of the bot's database and optionally ships its WAL.
+
+    Everything blocking runs in worker threads on connections of its own, the shared
+    connection is only touched to turn off automatic checkpoints when shipping.
+
+    When several processes share the database, only the one holding ``leader``'s
+    lease backs up and ships. The others still keep automatic checkpoints off, and
+    a process taking over starts its shipper afresh from the segments on disk.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        backup_dir: str,
+        keep: int = BACKUP_KEEP,
+        ship_wal: bool = False,
+        leader: Optional[LeaderElection] = None,
+    ):
+        self.db = db
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.ship_wal = ship_wal
+        self.leader = leader
+        self.shipper: Optional[WalShipper] = None
+        # Ships and the ship that follows each base backup must not overlap
+        self._ship_lock = asyncio.Lock()
+        self._backup_lock = asyncio.Lock()
+
+    async def prepare(self) -> None:
+        """Create the backup directory and set up WAL shipping, without scheduling."""
+        os.makedirs(self.backup_dir, exist_ok=True)
+
+        if self.ship_wal:
+            # Only the shipper may reset the WAL, see WalShipper
+            async with self.db.conn.execute("PRAGMA wal_autocheckpoint=0"):
+                pass
+
+    async def start(self) -> None:
+        """Prepare and schedule the tasks, the first base backup is taken right away."""
+        await self.prepare()
+        if self.ship_wal:
+            self.ship_task.start()
+        self.backup_task.start()
+
+    async def close(self) -> None:
+        self.backup_task.cancel()
+        self.ship_task.cancel()
+        if self.shipper is None:
+            return
+
+        # Ship whatever was written since the last interval before the bot exits
+        if self.leading:
+            await self.ship()
+        self.shipper.close()
+
+    @property
+    def leading(self) -> bool:
+        return self.leader is None or self.leader.is_leader
+
+    @tasks.loop(hours=BACKUP_INTERVAL)
+    async def backup_task(self):
+        if not self.leading:
+            return
+
+        try:
+            await self.backup()
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Backup of {self.db.path} failed: {e}")
+
+    @tasks.loop(seconds=WAL_SHIP_INTERVAL)
+    async def ship_task(self):
+        if not self.leading:
+            # Another process ships now, its segments make this shipper's state stale
+            async with self._ship_lock:
+                if self.shipper is not None:
+                    self.shipper.close()
+                    self.shipper = None
+            return
+
+        try:
+            await self.ship()
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Shipping the WAL of {self.db.path} failed: {e}")
+
+    async def ship(self) -> Optional[str]:
+        async with self._ship_lock:
+            if self.shipper is None:
+                self.shipper = await asyncio.to_thread(
+                    WalShipper, self.db.path, self.backup_dir
+                )
+            return await asyncio.to_thread(self.shipper.ship)
+
+    async def backup(self) -> str:
+        """Take a compressed base backup, rotate old ones and return its path."""
+        async with self._backup_lock:
+            path = await self._backup()
+
+        removed = await asyncio.to_thread(rotate_backups, self.backup_dir, self.keep)
+        logging.info(f"Backed up {self.db.path} to {path}, removed {removed} old files")
+        return path
+
+    async def _backup(self) -> str:
+        taken_at = _timestamp(datetime.now(timezone.utc))
+        temp_path = os.path.join(self.backup_dir, f"gawain-{taken_at}.db.tmp")
+
+        try:
+            if not self.ship_wal:
+                name = f"gawain-{taken_at}.db.gz"
+                await asyncio.to_thread(backup_database, self.db.path, temp_path)
+            else:
+                # The backup is consistent with its WAL generation once the frames
+                # written while it ran have been shipped too
+                await self.ship()
+                generation = self.shipper.generation
+                await asyncio.to_thread(backup_database, self.db.path, temp_path)
+                await self.ship()
+                ready = max(self.shipper.next_sequence - 1, generation)
+                name = f"gawain-{taken_at}-{generation:08d}-{ready:08d}.db.gz"
+
+            path = os.path.join(self.backup_dir, name)
+            await asyncio.to_thread(_gzip_file, temp_path, path)
+            return path
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+def _replay_wal(database: str, wal: bytes) -> None:
+    """Apply one WAL generation to ``database`` by letting SQLite recover it."""
+    with open(f"{database}-wal", "wb") as wal_file:
+        wal_file.write(wal)
+
+    conn = sqlite3.connect(database)
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+
+def restore_backup(
+    backup_dir: str, target: str, until: Optional[datetime] = None
+) -> tuple[BaseBackup, int]:
+    """Rebuild the database at ``target`` as of ``until`` (or as late as possible).
+
+    Decompresses the newest base backup taken before ``until`` and replays the shipped
+    WAL segments after it, in order, up to ``until``. Returns the base backup used and
+    the number of segments replayed. Raises ``ValueError`` if no base backup fits.
+    The database at ``target`` is only replaced once the restored copy is complete.
+    """
+    bases, segments = list_backups(backup_dir)
+    candidates = [base for base in bases if until is None or base.taken_at <= until]
+    if not candidates:
+        raise ValueError(f"No base backup in {backup_dir} before {until}")
+    base = candidates[-1]
+
+    temp_target = f"{target}.restore"
+    try:
+        with gzip.open(base.path, "rb") as base_file, open(temp_target, "wb") as target_file:
+            shutil.copyfileobj(base_file, target_file)
+
+        replayed = 0
+        if base.generation is not None:
+            # Segments up to `ready` are always needed, the base is only consistent with them
+            segments = [
+                segment
+                for segment in segments
+                if segment.sequence >= base.generation
+                and (until is None or segment.sequence <= base.ready or segment.shipped_at <= until)
+            ]
+
+            wal = bytearray()
+            salt = None
+            for segment in segments:
+                if segment.start == 0 or segment.salt != salt:
+                    if wal:
+                        _replay_wal(temp_target, bytes(wal))
+                    wal.clear()
+                    salt = segment.salt
+
+                if segment.start != len(wal):
+                    logging.warning(
+                        f"WAL segment {segment.sequence} doesn't follow the previous one, stopping the replay there"
+                    )
+                    break
+
+                with gzip.open(segment.path, "rb") as segment_file:
+                    wal += segment_file.read()
+                replayed += 1
+
+            if wal:
+                _replay_wal(temp_target, bytes(wal))
+    except BaseException:
+        # The database being replaced is untouched, only the partial copy goes
+        for path in (temp_target, f"{temp_target}-wal", f"{temp_target}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+    # Stale WAL and shared memory files belong to the database being replaced, they
+    # may hold its latest transactions so they go only once the copy is complete
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(target + suffix):
+            os.remove(target + suffix)
+    os.replace(temp_target, target)
+    return base, replayed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and restore Ser Gawain backups.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="List base backups and WAL segments")
+    list_parser.add_argument("--backups", default="backups", help="Backup directory")
+
+    restore_parser = subparsers.add_parser(
+        "restore", help="Restore the database, optionally to a point in time"
+    )
+    restore_parser.add_argument("--backups", default="backups", help="Backup directory")
+    restore_parser.add_argument("--target", default="gawain.db", help="Database to write")
+    restore_parser.add_argument(
+        "--until",
+        type=lambda value: datetime.fromisoformat(value).astimezone(timezone.utc),
+        help="Restore to this ISO 8601 time, local time unless an offset is given",
+    )
+    restore_parser.add_argument(
+        "--force", action="store_true", help="Overwrite the target if it exists"
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "list":
+        bases, segments = list_backups(args.backups)
+        for base in bases:
+            print(f"{base.taken_at.isoformat()}  {os.path.basename(base.path)}")
+        print(f"{len(bases)} base backups, {len(segments)} WAL segments")
+        return
+
+    if os.path.exists(args.target) and not args.force:
+        parser.error(f"{args.target} exists, stop the bot and pass --force to overwrite it")
+
+    try:
+        base, replayed = restore_backup(args.backups, args.target, args.until)
+    except (ValueError, OSError, EOFError, zlib.error, sqlite3.DatabaseError) as e:
+        # Missing or corrupt backups, the target is left as it was
+        parser.error(str(e))
+
+    print(
+        f"Restored {args.target} from {os.path.basename(base.path)} and {replayed} WAL segments"
+    )
+
+
+if __name__ == "__main__":
+    main()
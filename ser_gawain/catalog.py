@@ -0,0 +1,186 @@
+import array
+import bisect
+import json
+import logging
+import os
+import pickle
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+from ser_gawain.models import TradeSkill
+
+
+# Item and recipe data shipped with the bot
+CATALOG_DATA = os.path.join(os.path.dirname(__file__), "data", "items.json")
+
+# Prebuilt index, loading it is a single unpickle instead of parsing and sorting the
+# data file on every start. Rebuilt whenever the data file changes.
+CATALOG_CACHE = "gawain.catalog"
+
+# Bumped whenever the pickled layout changes, older caches are rebuilt
+CATALOG_FORMAT = 1
+
+# Discord shows at most 25 autocomplete choices
+AUTOCOMPLETE_LIMIT = 25
+
+
+def normalize(name: str) -> str:
+    """Catalog key for an item name, case-insensitive with whitespace collapsed."""
+    return " ".join(name.split()).casefold()
+
+
+@dataclass(slots=True)
+class Item:
+    name: str
+    trade_skill: Optional[TradeSkill]
+    level_required: int
+    # Materials for one craft as (name, quantity) pairs
+    materials: tuple[tuple[str, int], ...]
+    # Items produced by one craft, ammunition comes in stacks
+    yields: int = 1
+
+    def crafts_for(self, amount: int) -> int:
+        """Crafts needed to end up with at least ``amount`` items."""
+        return -(-max(amount, 1) // self.yields)
+
+    def materials_for(self, amount: int) -> list[tuple[str, int]]:
+        """Total materials to craft ``amount`` items, one level deep."""
+        crafts = self.crafts_for(amount)
+        return [(name, quantity * crafts) for name, quantity in self.materials]
+
+
+class Catalog:
+    """In-memory index of craftable items.
+
+    Exact lookups go through a dict keyed by the normalized name. Searches bisect a
+    sorted array of every word suffix of every name ("iron sword" and "sword"), so
+    typing any word of an item name finds it, in time logarithmic in the catalog.
+    """
+
+    def __init__(self, items: Optional[list[Item]] = None):
+        self.items: list[Item] = sorted(
+            items or [], key=lambda item: normalize(item.name)
+        )
+        self._by_name = {
+            normalize(item.name): index for index, item in enumerate(self.items)
+        }
+
+        suffixes = []
+        for index, item in enumerate(self.items):
+            words = normalize(item.name).split(" ")
+            for start in range(len(words)):
+                suffixes.append((" ".join(words[start:]), index))
+        suffixes.sort()
+        self._keys = [key for key, _ in suffixes]
+        self._key_items = array.array("l", (index for _, index in suffixes))
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def get(self, name: str) -> Optional[Item]:
+        index = self._by_name.get(normalize(name))
+        return None if index is None else self.items[index]
+
+    def search(self, query: str, limit: int = AUTOCOMPLETE_LIMIT) -> list[Item]:
+        """Items with a word starting with ``query``, names starting with it first."""
+        query = normalize(query)
+        if not query:
+            return self.items[:limit]
+
+        matches = []
+        seen = set()
+        position = bisect.bisect_left(self._keys, query)
+        while (
+            position < len(self._keys)
+            and self._keys[position].startswith(query)
+            and len(matches) < limit
+        ):
+            index = self._key_items[position]
+            if index not in seen:
+                seen.add(index)
+                matches.append(self.items[index])
+            position += 1
+
+        matches.sort(key=lambda item: not normalize(item.name).startswith(query))
+        return matches
+
+
+def parse_catalog(data: bytes) -> Catalog:
+    """Build a catalog from the bundled JSON data.
+
+    Raises ValueError if an entry is malformed or names an unknown trade skill.
+    """
+    items = []
+    for entry in json.loads(data)["items"]:
+        try:
+            skill = entry.get("skill")
+            items.append(
+                Item(
+                    name=" ".join(entry["name"].split()),
+                    trade_skill=TradeSkill(skill) if skill else None,
+                    level_required=int(entry.get("level", 0)),
+                    materials=tuple(
+                        (name, int(quantity))
+                        for name, quantity in entry.get("materials", {}).items()
+                    ),
+                    yields=max(int(entry.get("yields", 1)), 1),
+                )
+            )
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Malformed catalog entry {entry!r}: {e}") from e
+    return Catalog(items)
+
+
+def _write_cache(catalog: Catalog, stamp: tuple, cache_path: str) -> None:
+    directory = os.path.dirname(os.path.abspath(cache_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(
+                (CATALOG_FORMAT, stamp, catalog), f, protocol=pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_catalog(
+    data_path: str = CATALOG_DATA, cache_path: Optional[str] = CATALOG_CACHE
+) -> Catalog:
+    """Load the catalog from its prebuilt index, rebuilding the index if it is stale.
+
+    Blocking, run it in a thread. The cache is only trusted for the exact data file
+    it was built from, anything unreadable is rebuilt from the data file.
+    """
+    stat = os.stat(data_path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    if cache_path is not None:
+        try:
+            with open(cache_path, "rb") as f:
+                version, cached_stamp, catalog = pickle.load(f)
+            if version == CATALOG_FORMAT and cached_stamp == stamp:
+                return catalog
+        except FileNotFoundError:
+            pass
+        except (
+            OSError,
+            pickle.UnpicklingError,
+            EOFError,
+            ValueError,
+            TypeError,
+            AttributeError,
+        ) as e:
+            logging.warning(f"Ignoring unreadable catalog cache {cache_path}: {e}")
+
+    with open(data_path, "rb") as f:
+        catalog = parse_catalog(f.read())
+
+    if cache_path is not None:
+        try:
+            _write_cache(catalog, stamp, cache_path)
+        except OSError as e:
+            logging.warning(f"Failed to write the catalog cache {cache_path}: {e}")
+
+    return catalog
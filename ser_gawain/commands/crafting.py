@@ -1,48 +1,83 @@
-from datetime import datetime
+from datetime import datetime, timezone
 import discord
 import asyncio
+import csv
+import gzip
+import heapq
+import io
+import itertools
+import json
 import sqlite3
-import asqlite
 import logging
+import tempfile
+import zlib
 from enum import Enum
 from typing import Optional
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
+from ser_gawain.analytics import Insight, refresh_snapshot
+from ser_gawain.assets import GuildAssets
+from ser_gawain.catalog import AUTOCOMPLETE_LIMIT, Catalog, load_catalog
+from ser_gawain.db import Database
+from ser_gawain.idempotency import (
+    IDEMPOTENCY_WINDOW,
+    IdempotencyCache,
+    request_fingerprint,
+)
+from ser_gawain.interactions import (
+    BULK_HANDLER_SLO,
+    defer,
+    edit_message,
+    reply,
+    reply_privately,
+    responsive,
+)
+from ser_gawain.memory import UserCache
+from ser_gawain.models import CraftingRequest, Status, TradeSkill
+from ser_gawain.notifications import Notifier, NotifyMode
+from ser_gawain.reports import ReportQueueFull, ReportRenderer
+from ser_gawain.threads import ThreadManager
 
 
 async def accept_request(
-    conn: asqlite.Connection, user_id: int, request_id: str
+    db: Database,
+    user_id: int,
+    request_id: str,
+    balancer: Optional["CrafterBalancer"] = None,
+    queue: Optional["RequestQueue"] = None,
+    notifier: Optional[Notifier] = None,
 ) -> tuple[bool, str]:
     try:
-        async with conn.cursor() as cursor:
-            # Check if the job is available for acceptance
-            result = await cursor.execute(
-                "SELECT requestor_id FROM crafting_requests WHERE request_id = ? AND status = 'PENDING'",
-                (request_id,),
-            )
-
-            job = await result.fetchone()
-
-            if not job:
-                return (
-                    False,
-                    f"Crafting request {request_id} is not available. It may have already been accepted or cancelled.",
-                )
+        # Check if the job is available for acceptance
+        job = await db.requests.get(request_id)
 
-            requestor_id = job["requestor_id"]
+        if job is None or job.status is not Status.PENDING:
+            return (
+                False,
+                f"Crafting request {request_id} is not available. It may have already been accepted or cancelled.",
+            )
 
-            if requestor_id == str(user_id):
-                return False, "You cannot accept your own crafting request."
+        if job.requestor_id == str(user_id):
+            return False, "You cannot accept your own crafting request."
 
-            # Update the job status
-            await cursor.execute(
-                "UPDATE crafting_requests SET status = 'ACCEPTED', accepted_by = ? WHERE request_id = ?",
-                (user_id, request_id),
+        # Update the job status, this fails if someone else accepted it first
+        if not await db.requests.accept(request_id, user_id):
+            return (
+                False,
+                f"Crafting request {request_id} is not available. It may have already been accepted or cancelled.",
             )
 
-            await conn.commit()
+        if balancer is not None:
+            balancer.add_load(user_id, 1)
+        if queue is not None:
+            queue.remove(request_id)
+        if notifier is not None:
+            notifier.notify(
+                [job.requestor_id],
+                f"Your crafting request {request_id} for {job.amount}x {job.item_name} was accepted by <@{user_id}>.",
+            )
 
-            return True, f"Crafting request {request_id} has been accepted"
+        return True, f"Crafting request {request_id} has been accepted"
 
     except sqlite3.DatabaseError as e:
         logging.error(f"Error accepting crafting request {request_id}: {e}")
@@ -53,38 +88,49 @@ async def accept_request(
 
 
 async def cancel_request(
-    conn: asqlite.Connection, user_id: int, request_id: str
+    db: Database,
+    user_id: int,
+    request_id: str,
+    balancer: Optional["CrafterBalancer"] = None,
+    threads: Optional[ThreadManager] = None,
+    queue: Optional["RequestQueue"] = None,
+    notifier: Optional[Notifier] = None,
 ) -> tuple[bool, str]:
     try:
-        async with conn.cursor() as cursor:
-            # Check if the job is available for cancellation
-            result = await cursor.execute(
-                "SELECT requestor_id FROM crafting_requests WHERE request_id = ? AND status = 'PENDING' OR status = 'ACCEPTED'",
-                (request_id,),
-            )
-
-            job = await result.fetchone()
-
-            if not job:
-                return (
-                    False,
-                    f"Crafting request {request_id} is not available for cancellation. It may have been already accepted or cancelled.",
-                )
+        # Check if the job is available for cancellation
+        job = await db.requests.get(request_id)
 
-            requestor_id = job["requestor_id"]
+        if job is None or job.status not in (Status.PENDING, Status.ACCEPTED):
+            return (
+                False,
+                f"Crafting request {request_id} is not available for cancellation. It may have been already accepted or cancelled.",
+            )
 
-            if requestor_id != str(user_id):
-                return False, "You can only cancel your own crafting requests."
+        if job.requestor_id != str(user_id):
+            return False, "You can only cancel your own crafting requests."
 
-            # Update the job status
-            await cursor.execute(
-                "UPDATE crafting_requests SET status = 'CANCELLED' WHERE request_id = ?",
-                (request_id,),
+        # Update the job status
+        if not await db.requests.cancel(request_id):
+            return (
+                False,
+                f"Crafting request {request_id} is not available for cancellation. It may have been already accepted or cancelled.",
             )
 
-            await conn.commit()
+        # The crafter who accepted the request is no longer working on it
+        if balancer is not None and job.status is Status.ACCEPTED:
+            balancer.add_load(job.accepted_by, -1)
+
+        if threads is not None:
+            threads.schedule_archive(request_id)
+        if queue is not None:
+            queue.remove(request_id)
+        if notifier is not None and job.status is Status.ACCEPTED:
+            notifier.notify(
+                [job.accepted_by],
+                f"Crafting request {request_id} for {job.amount}x {job.item_name} that you accepted was cancelled.",
+            )
 
-            return True, f"Crafting request {request_id} has been cancelled."
+        return True, f"Crafting request {request_id} has been cancelled."
 
     except sqlite3.DataError as e:
         logging.error(f"Error with the data provided {request_id}: {e}")
@@ -100,21 +146,436 @@ async def cancel_request(
         )
 
 
-class TradeSkill(Enum):
-    ARCANA = "Arcana"
-    ARMORING = "Armoring"
-    COOKING = "Cooking"
-    ENGINEERING = "Engineering"
-    FURNISHING = "Furnishing"
-    JEWELCRAFTING = "Jewelcrafting"
-    WEAPONSMITHING = "Weaponsmithing"
+class ExportTable(Enum):
+    REQUESTS = "crafting_requests"
+    SKILLS = "trade_skills"
+
+
+class ExportFormat(Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+# Rows pulled from the cursor per round trip to the database worker thread
+EXPORT_CHUNK_SIZE = 1000
+
+# Exports stay in memory up to this size before spilling over to a file on disk
+EXPORT_SPOOL_MAX_SIZE = 8 * 1024 * 1024  # 8MB
+
+
+def _write_export_chunk(
+    stream: io.TextIOWrapper,
+    export_format: ExportFormat,
+    columns: list[str],
+    rows: list[sqlite3.Row],
+) -> None:
+    if export_format is ExportFormat.CSV:
+        csv.writer(stream).writerows(tuple(row) for row in rows)
+    else:
+        stream.writelines(
+            json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows
+        )
+
+
+async def export_table(
+    db: Database,
+    table: ExportTable,
+    export_format: ExportFormat,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> tuple[tempfile.SpooledTemporaryFile, int]:
+    """Stream a table into a gzip-compressed CSV or NDJSON spooled temp file.
+
+    Rows are fetched ``chunk_size`` at a time and compressed as they arrive, so memory
+    use stays flat no matter how large the table is. Returns the file rewound to the
+    start along with the number of rows written.
+    """
+    export_file = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+    stream = io.TextIOWrapper(
+        gzip.GzipFile(fileobj=export_file, mode="wb"), encoding="utf-8", newline=""
+    )
+    rows_written = 0
+
+    try:
+        repo = db.requests if table is ExportTable.REQUESTS else db.skills
+        columns = await repo.columns()
+
+        if export_format is ExportFormat.CSV:
+            csv.writer(stream).writerow(columns)
+
+        async for rows in repo.stream(chunk_size):
+            # Compression is CPU bound, keep it off the event loop
+            await asyncio.to_thread(
+                _write_export_chunk, stream, export_format, columns, rows
+            )
+            rows_written += len(rows)
+
+        # Closing the wrapper flushes the gzip trailer but leaves export_file open
+        stream.close()
+    except BaseException:
+        export_file.close()
+        raise
+
+    export_file.seek(0)
+    return export_file, rows_written
+
+
+class CrafterBalancer:
+    """Tracks how busy each crafter is so requests can be handed to the least loaded one.
+
+    Load is the number of ACCEPTED requests a crafter holds plus any auto-assigned
+    offers still waiting on them. Each trade skill keeps a min-heap of
+    ``(load, sequence, user_id)`` entries; whenever a crafter's load or level changes
+    a fresh entry is pushed and the old one is left behind as stale, so transitions
+    cost O(log n) and picking a crafter never has to query the database.
+    """
+
+    def __init__(self):
+        self._levels: dict[str, dict[str, int]] = {}
+        self._skills: dict[str, set[str]] = {}
+        self._load: dict[str, int] = {}
+        # Offers waiting on each crafter, they aren't in the database
+        self._reserved: dict[str, int] = {}
+        self._heaps: dict[str, list[tuple[int, int, str]]] = {}
+        self._latest: dict[tuple[str, str], int] = {}
+        self._sequence = itertools.count()
+
+    async def load(self, db: Database) -> None:
+        """Build the heaps from the database, when the cog loads and on every refresh.
+
+        Offers this process is still waiting on are kept.
+        """
+        skills = await db.skills.all()
+        loads = await db.requests.accepted_counts()
+
+        self._levels.clear()
+        self._skills.clear()
+        self._heaps.clear()
+        self._latest.clear()
+        self._load = {str(user_id): count for user_id, count in loads}
+        for user_id, count in self._reserved.items():
+            self._load[user_id] = self._load.get(user_id, 0) + count
+        for skill in skills:
+            self.set_skill(skill.user_id, skill.skill_name, skill.skill_level)
+
+    def set_skill(self, user_id: int | str, skill_name: str, skill_level: int) -> None:
+        user_id = str(user_id)
+        self._levels.setdefault(skill_name, {})[user_id] = skill_level
+        self._skills.setdefault(user_id, set()).add(skill_name)
+        self._push(skill_name, user_id)
+
+    def add_load(self, user_id: int | str, delta: int) -> None:
+        user_id = str(user_id)
+        self._load[user_id] = max(0, self._load.get(user_id, 0) + delta)
+        for skill_name in self._skills.get(user_id, ()):
+            self._push(skill_name, user_id)
+
+    def reserve(self, user_id: int | str) -> None:
+        """Count an auto-assigned offer waiting on the crafter towards their load."""
+        user_id = str(user_id)
+        self._reserved[user_id] = self._reserved.get(user_id, 0) + 1
+        self.add_load(user_id, 1)
+
+    def release(self, user_id: int | str) -> None:
+        """Drop an offer counted by ``reserve`` once it's accepted, declined or expired."""
+        user_id = str(user_id)
+        count = self._reserved.get(user_id, 0) - 1
+        if count > 0:
+            self._reserved[user_id] = count
+        else:
+            self._reserved.pop(user_id, None)
+        self.add_load(user_id, -1)
+
+    def get_load(self, user_id: int | str) -> int:
+        return self._load.get(str(user_id), 0)
+
+    def levels(self, user_id: int | str) -> dict[str, int]:
+        """The crafter's level in each of their trade skills."""
+        return {
+            skill_name: self._levels[skill_name][str(user_id)]
+            for skill_name in self._skills.get(str(user_id), ())
+        }
+
+    def choose(
+        self,
+        skill_name: str,
+        level_required: int = 0,
+        exclude: frozenset[str] = frozenset(),
+    ) -> Optional[str]:
+        """Return the least loaded crafter with at least ``level_required`` in the skill."""
+        heap = self._heaps.get(skill_name)
+        if not heap:
+            return None
+
+        levels = self._levels[skill_name]
+        skipped = []
+        chosen = None
+
+        while heap:
+            entry = heapq.heappop(heap)
+            _, sequence, user_id = entry
+            if self._latest.get((skill_name, user_id)) != sequence:
+                continue
+
+            skipped.append(entry)
+            if user_id not in exclude and levels[user_id] >= level_required:
+                chosen = user_id
+                break
+
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+
+        return chosen
+
+    def qualified(self, skill_name: str, level_required: int = 0) -> list[str]:
+        """Every crafter with at least ``level_required`` in the skill."""
+        return [
+            user_id
+            for user_id, level in self._levels.get(skill_name, {}).items()
+            if level >= level_required
+        ]
+
+    def _push(self, skill_name: str, user_id: str) -> None:
+        sequence = next(self._sequence)
+        self._latest[(skill_name, user_id)] = sequence
+
+        heap = self._heaps.setdefault(skill_name, [])
+        heapq.heappush(heap, (self._load.get(user_id, 0), sequence, user_id))
+
+        # Drop stale entries once they outnumber the live ones
+        if len(heap) > 2 * len(self._levels[skill_name]) + 16:
+            self._heaps[skill_name] = heap = [
+                entry
+                for entry in heap
+                if self._latest.get((skill_name, entry[2])) == entry[1]
+            ]
+            heapq.heapify(heap)
+
+
+# Queue ranking weights, in hours of request age: having the materials puts a request
+# a day ahead, every item beyond the first puts it an hour back
+QUEUE_MATERIALS_BONUS = 24.0
+QUEUE_AMOUNT_PENALTY = 1.0
+
+
+def queue_rank(job: CraftingRequest) -> float:
+    """Sort key of an open request, lower ranks first.
+
+    Ranking by ``bonus + age`` and by ``bonus - created_at`` orders requests the same
+    way at any moment, so the key can be computed once when the request is queued.
+    """
+    bonus = QUEUE_MATERIALS_BONUS * job.has_materials - QUEUE_AMOUNT_PENALTY * max(
+        job.amount - 1, 0
+    )
+    return job.created_timestamp / 3600 - bonus
+
+
+class RequestQueue:
+    """Open (PENDING) requests ranked for crafters, one min-heap per trade skill.
+
+    Requests are pushed when created and dropped when they leave PENDING, removed
+    entries are left in the heap as stale and skipped, like in CrafterBalancer. A
+    crafter's queue merges the best requests of each of their skills (and of requests
+    without a skill) that they have the level for, without scanning the table.
+    """
+
+    def __init__(self):
+        self._jobs: dict[int, CraftingRequest] = {}
+        self._heaps: dict[Optional[str], list[tuple[float, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    async def load(self, db: Database) -> None:
+        """Build the heaps from the database, when the cog loads and on every refresh."""
+        jobs = await db.requests.all(Status.PENDING)
+
+        self._jobs.clear()
+        self._heaps.clear()
+        for job in jobs:
+            self.add(job)
+
+    def add(self, job: CraftingRequest) -> None:
+        if job.status is not Status.PENDING:
+            return
+
+        self._jobs[job.request_id] = job
+        skill_name = job.trade_skill.value if job.trade_skill else None
+        heap = self._heaps.setdefault(skill_name, [])
+        heapq.heappush(heap, (queue_rank(job), job.request_id))
+
+        # Drop stale entries once they outnumber the live ones
+        if len(heap) > 2 * len(self._jobs) + 16:
+            self._heaps[skill_name] = heap = [
+                entry for entry in heap if entry[1] in self._jobs
+            ]
+            heapq.heapify(heap)
+
+    def remove(self, request_id: int | str) -> None:
+        self._jobs.pop(int(request_id), None)
+
+    def _best(
+        self, skill_name: Optional[str], level: int, user_id: str, limit: int
+    ) -> list[tuple[float, int]]:
+        heap = self._heaps.get(skill_name)
+        if not heap:
+            return []
+
+        popped = []
+        best = []
+        while heap and len(best) < limit:
+            entry = heapq.heappop(heap)
+            job = self._jobs.get(entry[1])
+            if job is None:
+                continue
+
+            popped.append(entry)
+            if job.requestor_id != user_id and (job.level_required or 0) <= level:
+                best.append(entry)
+
+        for entry in popped:
+            heapq.heappush(heap, entry)
+
+        return best
+
+    def for_crafter(
+        self, user_id: int | str, levels: dict[str, int], limit: int = 10
+    ) -> list[CraftingRequest]:
+        """The ``limit`` best open requests ``user_id`` can craft at ``levels``."""
+        user_id = str(user_id)
+        entries = self._best(None, 0, user_id, limit)
+        for skill_name, level in levels.items():
+            entries += self._best(skill_name, level, user_id, limit)
+
+        return [self._jobs[request_id] for _, request_id in sorted(entries)[:limit]]
+
+
+# Matches the CHECK constraint on trade_skills.skill_level
+MIN_SKILL_LEVEL = 0
+MAX_SKILL_LEVEL = 250
+
+# Largest roster attachment the import command will download
+MAX_ROSTER_SIZE = 5 * 1024 * 1024  # 5MB
+
+# Number of row errors shown inline before the rest are attached as a file
+MAX_INLINE_IMPORT_ERRORS = 10
+
+# Column names accepted in a roster, including the ones produced by /crafting export
+ROSTER_COLUMNS = {
+    "user_id": ("user_id",),
+    "user_name": ("user_name",),
+    "skill": ("skill", "skill_name"),
+    "level": ("level", "skill_level"),
+}
+
+_TRADE_SKILLS_BY_NAME = {
+    key: skill
+    for skill in TradeSkill
+    for key in (skill.name.lower(), skill.value.lower())
+}
+
+
+def _roster_value(record: dict, column: str):
+    for key in ROSTER_COLUMNS[column]:
+        value = record.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _read_roster_records(data: bytes, filename: str) -> list[dict]:
+    filename = filename.lower()
+    if filename.endswith(".gz"):
+        data = gzip.decompress(data)
+        filename = filename.removesuffix(".gz")
+
+    text = data.decode("utf-8-sig")
+
+    if filename.endswith(".csv"):
+        return list(csv.DictReader(io.StringIO(text)))
+
+    if filename.endswith((".ndjson", ".jsonl")):
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    if filename.endswith(".json"):
+        records = json.loads(text)
+        if not isinstance(records, list):
+            raise ValueError("JSON rosters must contain a list of rows.")
+        return records
+
+    raise ValueError("Rosters must be .csv, .json or .ndjson files.")
+
+
+def parse_skill_roster(
+    data: bytes, filename: str
+) -> tuple[list[tuple[str, str, str, int]], list[str]]:
+    """Parse and validate an uploaded crafter skill roster.
+
+    Accepts CSV, JSON or NDJSON (optionally gzip-compressed) with ``user_id``,
+    ``user_name``, ``skill`` and ``level`` columns. Returns the valid rows as
+    ``(user_id, user_name, skill_name, skill_level)`` tuples together with a list of
+    per-row error messages. Raises ``ValueError`` if the file itself can't be read.
+    """
+    try:
+        records = _read_roster_records(data, filename)
+    except (
+        OSError,
+        EOFError,
+        zlib.error,
+        UnicodeDecodeError,
+        json.JSONDecodeError,
+        csv.Error,
+    ) as e:
+        # Truncated or corrupt gzip data, malformed CSV or JSON
+        raise ValueError(f"Could not read roster: {e}") from e
+
+    rows = []
+    errors = []
+
+    # Row 1 is the CSV header, so data rows are numbered from 2 to match spreadsheets
+    for row_number, record in enumerate(records, start=2):
+        if not isinstance(record, dict):
+            errors.append(f"Row {row_number}: Expected an object with named columns.")
+            continue
+
+        user_id = str(_roster_value(record, "user_id") or "").strip()
+        user_name = str(_roster_value(record, "user_name") or "").strip()
+        skill_name = str(_roster_value(record, "skill") or "").strip()
+        level = _roster_value(record, "level")
+
+        if not user_id.isdigit():
+            errors.append(f"Row {row_number}: Invalid user ID '{user_id}'.")
+            continue
+
+        skill = _TRADE_SKILLS_BY_NAME.get(skill_name.lower())
+        if skill is None:
+            errors.append(f"Row {row_number}: Unknown trade skill '{skill_name}'.")
+            continue
+
+        try:
+            level = int(level)
+        except (TypeError, ValueError):
+            errors.append(f"Row {row_number}: Invalid skill level '{level}'.")
+            continue
+
+        if not MIN_SKILL_LEVEL <= level <= MAX_SKILL_LEVEL:
+            errors.append(
+                f"Row {row_number}: Skill level {level} must be between {MIN_SKILL_LEVEL} and {MAX_SKILL_LEVEL}."
+            )
+            continue
+
+        rows.append((user_id, user_name or None, skill.value, level))
+
+    return rows, errors
+
+
+def accept_keys(interaction: discord.Interaction, request_id: int | str) -> tuple:
+    """Idempotency keys of accepting a request, shared by the button and the command."""
+    return interaction.id, ("accept", str(request_id), interaction.user.id)
 
 
-class Status(Enum):
-    PENDING = "Pending"
-    ACCEPTED = "Accepted"
-    COMPLETED = "Completed"
-    CANCELLED = "Cancelled"
+def accept_succeeded(outcome: tuple[bool, str]) -> bool:
+    """Only accepts that went through are repeated, a retry of a failed one runs again."""
+    return outcome[0]
 
 
 class RequestAcceptButton(discord.ui.Button):
@@ -125,17 +586,26 @@ class RequestAcceptButton(discord.ui.Button):
         )
         self.request_id = request_id
 
+    @responsive(ephemeral=True)
     async def callback(self, interaction: discord.Interaction):
-        # await interaction.response.defer(ephemeral=True)
-
         # https://discordpy.readthedocs.io/en/stable/ext/commands/cogs.html?highlight=get_cog#using-cogs
         # Used as a way to share data between the callback and the button
         # This was the best way without using a classmethod or staticmethod
         cog = interaction.client.get_cog("Crafting")
-        success, message = await accept_request(
-            cog.conn, interaction.user.id, self.request_id
+        (success, message), _ = await cog.idempotency.run(
+            accept_keys(interaction, self.request_id),
+            lambda: accept_request(
+                cog.db,
+                interaction.user.id,
+                self.request_id,
+                cog.balancer,
+                cog.queue,
+                cog.notifier,
+            ),
+            remember=accept_succeeded,
         )
-        await interaction.response.send_message(
+        await reply(
+            interaction,
             f"{message} by {interaction.user.mention}!" if success else message,
             ephemeral=True,
         )
@@ -149,14 +619,20 @@ class RequestCancelButton(discord.ui.Button):
         )
         self.request_id = request_id
 
+    @responsive(ephemeral=True)
     async def callback(self, interaction: discord.Interaction):
-        # await interaction.response.defer()
-
         cog = interaction.client.get_cog("Crafting")
         success, message = await cancel_request(
-            cog.conn, interaction.user.id, self.request_id
+            cog.db,
+            interaction.user.id,
+            self.request_id,
+            cog.balancer,
+            cog.threads,
+            cog.queue,
+            cog.notifier,
         )
-        await interaction.response.send_message(
+        await reply(
+            interaction,
             f"{message}" if success else message,
             ephemeral=True,
         )
@@ -171,43 +647,54 @@ class RequestOpenThreadButton(discord.ui.Button):
         self.request_id = request_id
         self.item_name = item_name
 
+    @responsive(ephemeral=True)
     async def callback(self, interaction: discord.Interaction):
-        await interaction.response.defer()
+        await defer(interaction)
         cog = interaction.client.get_cog("Crafting")
 
-        # Get the requestor's user object
-        result = await cog.conn.execute(
-            "SELECT requestor_id FROM crafting_requests WHERE request_id = ?",
-            (self.request_id,),
-        )
+        job = await cog.db.requests.get(self.request_id)
 
-        requestor_id = await result.fetchone()
+        if job is None:
+            await interaction.followup.send(
+                f"Crafting request {self.request_id} not found.", ephemeral=True
+            )
+            return
 
-        requestor_user = cog.bot.get_user(int(requestor_id[0]))
+        # Threads of completed and cancelled requests are archived and locked
+        if job.status not in (Status.PENDING, Status.ACCEPTED):
+            await interaction.followup.send(
+                f"Crafting request {self.request_id} is {job.status_label.lower()}.",
+                ephemeral=True,
+            )
+            return
 
         # Only another interested person can open the thread, not the requestor
-        if interaction.user.id == int(requestor_id[0]):
+        if interaction.user.id == int(job.requestor_id):
             await interaction.followup.send(
                 "Threads can only be opened by interested crafters, not the requestor. Please wait for someone else to  accept your request.",
                 ephemeral=True,
             )
             return
 
-        # Thread creation process
+        # Adding them to the thread only takes their ID, no need to look the user up
+        requestor_user = discord.Object(int(job.requestor_id))
+
+        # Reuse the request's thread if one was already opened
         try:
-            thread = await interaction.message.create_thread(
-                name=f"Request #{self.request_id} | {self.item_name}",
-                reason=f"Create thread for crafting request {self.request_id}",
+            thread, created = await cog.threads.open(
+                interaction.message,
+                self.request_id,
+                f"Request #{self.request_id} | {self.item_name}",
+                (requestor_user, interaction.user),
             )
 
-            await thread.add_user(requestor_user)
-            await thread.add_user(interaction.user)
-            await thread.send(
-                f"Thread requested by {interaction.user.mention}. Please use this thread to discuss the crafting request with the requestor."
-            )
+            if created:
+                await thread.send(
+                    f"Thread requested by {interaction.user.mention}. Please use this thread to discuss the crafting request with the requestor."
+                )
 
             await interaction.followup.send(
-                f"Thread created for request {self.request_id}.",
+                f"Thread {'created' if created else 'opened'} for request {self.request_id}: {thread.mention}",
                 ephemeral=True,
             )
         except discord.errors.HTTPException as e:
@@ -218,14 +705,11 @@ class RequestOpenThreadButton(discord.ui.Button):
                 f"Failed to create thread for request {self.request_id}. Reason: {e}",
                 ephemeral=True,
             )
-            return
-
-        # Thread cleanup process
-        try:
-            await thread.leave()
-        except discord.errors.HTTPException as e:
-            logging.error(
-                f"Failed to leave thread for request {self.request_id}. Reason: {e}"
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Database error opening thread for request {self.request_id}: {e}")
+            await interaction.followup.send(
+                f"Failed to open a thread for request {self.request_id}. Please try again.",
+                ephemeral=True,
             )
 
 
@@ -243,22 +727,401 @@ class RequestView(discord.ui.View):
         await self.message.edit(view=self)
 
 
+# How long an auto-assigned crafter has to respond before the request opens to everyone
+ASSIGNMENT_TIMEOUT = 15 * 60.0
+
+
+def build_request_embed(
+    request_id: int,
+    item: str,
+    amount: int,
+    has_materials: bool,
+    skill: Optional[TradeSkill],
+    level_required: Optional[int],
+    materials: Optional[list[tuple[str, int]]] = None,
+    skill_emoji: Optional[str] = None,
+) -> discord.Embed:
+    request_embed = discord.Embed(
+        title="Crafting Request",
+        color=discord.Color.gold(),
+    )
+
+    skill_label = skill.value if skill else "None"
+    if skill_emoji:
+        skill_label = f"{skill_emoji} {skill_label}"
+
+    request_embed.add_field(
+        name=f"Crafting Request",
+        value=f"**ID:** {request_id}\n**Item:** {item}\n**Amount:** {amount}\n**Has Materials:** {has_materials}\n**Trade Skill:** {skill_label}\n**Level Required:** {level_required}",
+    )
+
+    if materials:
+        request_embed.add_field(
+            name="Materials",
+            value="\n".join(f"{quantity} x {name}" for name, quantity in materials),
+        )
+
+    return request_embed
+
+
+class AssignmentAcceptButton(discord.ui.Button):
+    def __init__(self):
+        super().__init__(
+            style=discord.ButtonStyle.primary,
+            emoji="✅",
+        )
+
+    @responsive()
+    async def callback(self, interaction: discord.Interaction):
+        view: RequestAssignmentView = self.view
+        if not view.resolve():
+            await reply(
+                interaction,
+                f"Crafting request {view.request_id} is no longer assigned to you.",
+            )
+            return
+
+        success, message = await accept_request(
+            view.cog.db,
+            interaction.user.id,
+            view.request_id,
+            view.cog.balancer,
+            view.cog.queue,
+            view.cog.notifier,
+        )
+        await edit_message(interaction, view=view.disabled())
+        await interaction.followup.send(message)
+
+        if success:
+            await view.channel.send(
+                f"<@{view.requestor_id}> {message} by {interaction.user.mention}!"
+            )
+
+
+class AssignmentDeclineButton(discord.ui.Button):
+    def __init__(self):
+        super().__init__(
+            style=discord.ButtonStyle.secondary,
+            emoji="❌",
+        )
+
+    @responsive()
+    async def callback(self, interaction: discord.Interaction):
+        view: RequestAssignmentView = self.view
+        if not view.resolve():
+            await reply(
+                interaction,
+                f"Crafting request {view.request_id} is no longer assigned to you.",
+            )
+            return
+
+        await edit_message(interaction, view=view.disabled())
+        await interaction.followup.send(
+            f"Crafting request {view.request_id} declined. It has been opened to all crafters."
+        )
+        await view.open_to_all()
+
+
+class RequestAssignmentView(discord.ui.View):
+    """Accept/decline buttons sent by DM to a crafter picked by auto-assign.
+
+    The crafter's offer counts towards their load until they answer. Declining or
+    letting the offer time out posts the request to the channel like a normal one.
+    """
+
+    def __init__(
+        self,
+        cog: "Crafting",
+        crafter_id: str,
+        requestor_id: int,
+        request_id: int,
+        item_name: str,
+        skill: TradeSkill,
+        request_embed: discord.Embed,
+        channel: discord.abc.Messageable,
+    ):
+        super().__init__(timeout=ASSIGNMENT_TIMEOUT)
+        self.cog = cog
+        self.crafter_id = crafter_id
+        self.requestor_id = requestor_id
+        self.request_id = str(request_id)
+        self.item_name = item_name
+        self.skill = skill
+        self.request_embed = request_embed
+        self.channel = channel
+        self.resolved = False
+        self.add_item(AssignmentAcceptButton())
+        self.add_item(AssignmentDeclineButton())
+
+    def resolve(self) -> bool:
+        """Release the crafter's pending offer. Returns False if already resolved."""
+        if self.resolved:
+            return False
+
+        self.resolved = True
+        self.stop()
+        self.cog.balancer.release(self.crafter_id)
+        return True
+
+    def disabled(self) -> "RequestAssignmentView":
+        for item in self.children:
+            item.disabled = True
+        return self
+
+    async def open_to_all(self) -> None:
+        try:
+            request = await self.cog.db.requests.get(self.request_id)
+        except sqlite3.DatabaseError as e:
+            logging.error(
+                f"Database error opening crafting request {self.request_id}: {e}"
+            )
+            return
+
+        # The requestor may have cancelled while the offer was pending
+        if request is None or request.status is not Status.PENDING:
+            return
+
+        await self.cog.post_open_request(
+            self.channel,
+            self.request_id,
+            self.item_name,
+            self.skill,
+            self.request_embed,
+        )
+
+    async def on_timeout(self) -> None:
+        if not self.resolve():
+            return
+
+        try:
+            await self.message.edit(view=self.disabled())
+        except discord.errors.HTTPException as e:
+            logging.error(
+                f"Failed to expire assignment for request {self.request_id}. Reason: {e}"
+            )
+
+        await self.open_to_all()
+
+
+# Analytics snapshot for /crafting insights, rebuilt in the background on this interval
+SNAPSHOT_PATH = "gawain.snapshot"
+SNAPSHOT_INTERVAL = 15  # minutes
+
+# When several processes share the database (one gateway shard each), the others
+# accept requests, set skills and change notification preferences too, so every
+# process rebuilds its in-memory indexes this often. Auto-assignment and /crafting
+# queue lag other processes by at most this. A single process is always up to date
+STATE_REFRESH_INTERVAL = 60.0  # seconds
+
+
 class Crafting(commands.GroupCog):
     def __init__(self, bot):
         self.bot = bot
-        self.conn: asqlite.Connection = self.bot.conn
+        self.db: Database = self.bot.db
+        self.balancer = CrafterBalancer()
+        self.queue = RequestQueue()
+        self.threads = ThreadManager(bot, self.db)
+        self.reports = ReportRenderer()
+        self.idempotency = IdempotencyCache()
+        # Empty until cog_load has read the item catalog
+        self.catalog = Catalog()
+        self.users = UserCache(bot)
+        self.notifier = Notifier(bot, users=self.users)
+        # Filled in once the guilds are available, see the listeners below
+        self.assets = GuildAssets()
+
+    @property
+    def sharded(self) -> bool:
+        """Whether the bot runs as several gateway shards, possibly in several processes"""
+        return (self.bot.shard_count or 1) > 1
+
+    async def cog_load(self):
+        try:
+            self.catalog = await asyncio.to_thread(load_catalog)
+            logging.info(f"Item catalog loaded with {len(self.catalog)} items")
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to load the item catalog: {e}")
+        await self.refresh_state()
+        self.notifier.start()
+        if self.sharded:
+            self.refresh_task.start()
+        self.update_snapshot.start()
 
     async def cog_unload(self):
-        await self.conn.close()
+        self.refresh_task.cancel()
+        self.update_snapshot.cancel()
+        self.reports.close()
+        await self.threads.close()
+        await self.notifier.close()
+
+    # Trade skill roles and emojis are indexed when guilds become available and
+    # whenever they change, so requests never scan a guild's roles
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        for guild in self.bot.guilds:
+            self.assets.index(guild)
+        logging.info(f"Indexed trade skill roles and emojis of {len(self.assets)} guild(s)")
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild: discord.Guild):
+        self.assets.index(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        self.assets.index(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.assets.forget(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        self.assets.index(role.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.assets.index(role.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        # Roles are matched by name, permission or color changes don't matter
+        if before.name != after.name:
+            self.assets.index(after.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_emojis_update(self, guild: discord.Guild, before, after):
+        self.assets.index(guild)
+
+    async def refresh_state(self) -> None:
+        """Rebuild the crafter loads, the request queue and notification preferences."""
+        await self.balancer.load(self.db)
+        await self.queue.load(self.db)
+        await self.notifier.load(self.db)
+
+    @tasks.loop(seconds=STATE_REFRESH_INTERVAL)
+    async def refresh_task(self):
+        try:
+            await self.refresh_state()
+        except sqlite3.Error as e:
+            logging.error(f"Failed to refresh crafting state from the database: {e}")
+
+    @refresh_task.before_loop
+    async def before_refresh(self):
+        # cog_load has just refreshed
+        await asyncio.sleep(STATE_REFRESH_INTERVAL)
+
+    @tasks.loop(minutes=SNAPSHOT_INTERVAL)
+    async def update_snapshot(self):
+        """Rebuild the analytics snapshot that /crafting insights reads from"""
+        if not self.bot.leader.is_leader:
+            return
+
+        try:
+            requests = await asyncio.to_thread(
+                refresh_snapshot, self.db.path, SNAPSHOT_PATH
+            )
+            logging.info(f"Analytics snapshot refreshed with {requests} requests")
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Failed to refresh the analytics snapshot: {e}")
+
+    async def ping_skill_role(
+        self, channel: discord.abc.GuildChannel, skill: Optional[TradeSkill]
+    ) -> None:
+        # Get the role for the skill if it exists
+        if skill is None:
+            return
+
+        role_id = self.assets.role(channel.guild.id, skill)
+        if role_id is not None:
+            await channel.send(f"<@&{role_id}>")
+
+    async def post_open_request(
+        self,
+        channel: discord.abc.GuildChannel,
+        request_id: str,
+        item_name: str,
+        skill: Optional[TradeSkill],
+        request_embed: discord.Embed,
+    ) -> None:
+        """Post a request to the channel for any crafter to pick up"""
+        request_view = RequestView(request_id, item_name)
+
+        try:
+            request_view.message = await channel.send(
+                embed=request_embed, view=request_view
+            )
+            await self.ping_skill_role(channel, skill)
+        except discord.errors.HTTPException as e:
+            logging.error(
+                f"Failed to post crafting request {request_id}. Reason: {e}"
+            )
+
+    async def offer_request(
+        self,
+        interaction: discord.Interaction,
+        request_id: int,
+        item_name: str,
+        skill: TradeSkill,
+        level_required: Optional[int],
+        request_embed: discord.Embed,
+    ) -> Optional[str]:
+        """DM the least busy qualified crafter with the request.
+
+        Returns the crafter's user ID, or None if nobody could be assigned.
+        """
+        requestor_id = str(interaction.user.id)
+        declined = set()
+
+        while True:
+            crafter_id = self.balancer.choose(
+                skill.value,
+                level_required or 0,
+                exclude=frozenset({requestor_id, *declined}),
+            )
+            if crafter_id is None:
+                return None
+
+            view = RequestAssignmentView(
+                self,
+                crafter_id,
+                interaction.user.id,
+                request_id,
+                item_name,
+                skill,
+                request_embed,
+                interaction.channel,
+            )
+
+            # Reserve the crafter right away so concurrent requests spread out
+            self.balancer.reserve(crafter_id)
+
+            try:
+                crafter = await self.users.get(crafter_id)
+                view.message = await crafter.send(
+                    f"{interaction.user.mention} needs a crafter. You have {int(ASSIGNMENT_TIMEOUT // 60)} minutes to accept before it opens to everyone.",
+                    embed=request_embed,
+                    view=view,
+                )
+                return crafter_id
+            except discord.errors.HTTPException as e:
+                # DMs closed or the user left, try the next crafter
+                logging.warning(
+                    f"Could not offer crafting request {request_id} to {crafter_id}. Reason: {e}"
+                )
+                view.resolve()
+                declined.add(crafter_id)
 
     @app_commands.command(name="request", description="Make a crafting request")
     @app_commands.describe(
-        item="The item to craft",
+        item="The item to craft, known items fill in the trade skill and level",
         amount="The amount of the item to craft",
         has_materials="Whether the materials are already owned",
         skill="The trade skill to use",
         level_required="The level required for the trade skill",
+        auto_assign="Offer to the least busy crafter with the skill, needs a trade skill, off when sharded",
     )
+    @responsive()
     async def request(
         self,
         interaction: discord.Interaction,
@@ -267,113 +1130,160 @@ class Crafting(commands.GroupCog):
         amount: Optional[int] = 1,
         skill: Optional[TradeSkill] = None,
         level_required: Optional[int] = None,
+        auto_assign: Optional[bool] = False,
     ):
         """Make a crafting request"""
         requestor_id = interaction.user.id
         user_name = interaction.user.name
 
-        await interaction.response.defer()
+        # Known items get their canonical name, and the skill and level the user left out
+        materials = None
+        catalog_item = self.catalog.get(item)
+        if catalog_item is not None:
+            item = catalog_item.name
+            if skill is None:
+                skill = catalog_item.trade_skill
+            if level_required is None:
+                level_required = catalog_item.level_required
+            materials = catalog_item.materials_for(amount or 1)
+
+        # Offers are DMs and Discord sends every DM button click to shard 0, so a view
+        # waiting in another shard's process would never hear back from the crafter
+        if auto_assign and self.sharded:
+            await reply(
+                interaction,
+                "Auto-assign isn't available while the bot runs as several shards. Leave it off to ask everyone.",
+                ephemeral=True,
+            )
+            return
 
-        try:
-            async with self.conn.cursor() as cursor:
-                # Check if the user exists in the users table, if not, add them
-                await cursor.execute(
-                    "SELECT * FROM users WHERE user_id = ?", (requestor_id,)
-                )
-                if await cursor.fetchone() is None:
-                    await cursor.execute(
-                        "INSERT INTO users (user_id, user_name) VALUES (?, ?)",
-                        (requestor_id, user_name),
-                    )
+        # Crafters are chosen by skill, without one there is nobody to offer it to
+        if auto_assign and skill is None:
+            await reply(
+                interaction,
+                f"Auto-assign needs a trade skill and none is known for {item}. Choose a skill, or leave auto-assign off to ask everyone.",
+                ephemeral=True,
+            )
+            return
 
-                    await self.conn.commit()
-
-                # Add to the crafting requests table
-                await cursor.execute(
-                    """INSERT INTO crafting_requests 
-                    (requestor_id, user_name, item_name, has_materials, amount, trade_skill, level_required, status) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?) 
-                    """,
-                    (
-                        requestor_id,
-                        user_name,
-                        item,
-                        has_materials,
-                        amount,
-                        skill.value if skill else None,
-                        level_required,
-                        "PENDING",
-                    ),
-                )
+        await defer(interaction)
 
-                # Get the job ID
-                request_id = cursor.get_cursor().lastrowid
+        # Double submissions and retries are answered with the request made first
+        fingerprint = request_fingerprint(
+            requestor_id, item, amount, skill.value if skill else None
+        )
 
-                # Commit the changes to the database
-                await self.conn.commit()
+        try:
+            # Add to the crafting requests table, the requestor is added as a user if needed
+            (request_id, created), fresh = await self.idempotency.run(
+                (interaction.id, fingerprint),
+                lambda: self.db.requests.create_once(
+                    fingerprint,
+                    IDEMPOTENCY_WINDOW,
+                    requestor_id,
+                    user_name,
+                    item,
+                    has_materials,
+                    amount,
+                    skill.value if skill else None,
+                    level_required,
+                ),
+            )
 
-                # Log the request
-                logging.info(
-                    f"User {user_name} ({requestor_id}) created a crafting request for {item} with amount {amount} and skill {skill} and level {level_required}"
+            if not (created and fresh):
+                # The request was deferred publicly, only the requestor sees this
+                await reply_privately(
+                    interaction,
+                    f"You already requested {item} as crafting request {request_id}.",
                 )
+                return
 
-                # Get the role for the skill if it exists
-                skill_role = None
-                if skill:
-                    skill_role = discord.utils.get(
-                        interaction.guild.roles, name=skill.value.lower()
-                    )
+            self.queue.add(await self.db.requests.get(request_id))
 
-                # Create the Embed with View
-                request_embed = discord.Embed(
-                    title="Crafting Request",
-                    color=discord.Color.gold(),
-                )
+            # Log the request
+            logging.info(
+                f"User {user_name} ({requestor_id}) created a crafting request for {item} with amount {amount} and skill {skill} and level {level_required}"
+            )
 
-                request_embed.add_field(
-                    name=f"Crafting Request",
-                    value=f"**ID:** {request_id}\n**Item:** {item}\n**Amount:** {amount}\n**Has Materials:** {has_materials}\n**Trade Skill:** {skill.value if skill else 'None'}\n**Level Required:** {level_required}",
+            # Create the Embed with View
+            request_embed = build_request_embed(
+                request_id,
+                item,
+                amount,
+                has_materials,
+                skill,
+                level_required,
+                materials,
+                self.assets.emoji(interaction.guild_id, skill) if skill else None,
+            )
+
+            if auto_assign:
+                crafter_id = await self.offer_request(
+                    interaction, request_id, item, skill, level_required, request_embed
                 )
 
-                request_view = RequestView(str(request_id), item)
+                if crafter_id is not None:
+                    await interaction.followup.send(
+                        f"Crafting request {request_id} has been offered to the least busy {skill.value} crafter. It will open to everyone if they don't accept within {int(ASSIGNMENT_TIMEOUT // 60)} minutes.",
+                        embed=request_embed,
+                    )
+                    logging.info(
+                        f"Crafting request {request_id} auto-assigned to {crafter_id}"
+                    )
+                    return
+
+            request_view = RequestView(str(request_id), item)
 
-                await interaction.followup.send(embed=request_embed, view=request_view)
+            await interaction.followup.send(embed=request_embed, view=request_view)
 
-                if skill_role is not None:
-                    await interaction.channel.send(f"<@&{skill_role.id}>")
+            await self.ping_skill_role(interaction.channel, skill)
+            if skill is not None:
+                self.notifier.notify(
+                    self.balancer.qualified(skill.value, level_required or 0),
+                    f"New crafting request {request_id}: {amount}x {item} ({skill.value} {level_required or 0}) from {user_name}.",
+                    exclude=requestor_id,
+                )
 
-                # Set the message attribute of the dropdown view to the original response
-                # We need to do this in order to edit the message later for timeout
-                request_view.message = await interaction.original_response()
+            # Set the message attribute of the dropdown view to the original response
+            # We need to do this in order to edit the message later for timeout
+            request_view.message = await interaction.original_response()
 
         except sqlite3.Error as e:
             logging.error(f"Database error in request command: {e}")
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 "An error occurred while creating your request. Please try again.",
                 ephemeral=True,
             )
         except Exception as e:
             logging.error(f"Unexpected error in request command: {e}")
-            await interaction.response.send_message(
-                "An unexpected error occurred. Please try again.", ephemeral=True
+            await reply(
+                interaction,
+                "An unexpected error occurred. Please try again.",
+                ephemeral=True,
             )
 
+    @request.autocomplete("item")
+    async def request_item_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ) -> list[app_commands.Choice[str]]:
+        return [
+            app_commands.Choice(name=item.name, value=item.name)
+            for item in self.catalog.search(current, AUTOCOMPLETE_LIMIT)
+        ]
+
     @app_commands.command(
         name="status",
         description="Check the status of a specific crafting request by ID",
     )
+    @responsive()
     async def status(self, interaction: discord.Interaction, request_id: str):
         """Check the status of a crafting request"""
-        await interaction.response.defer()
+        await defer(interaction)
 
         # Check if the request exists
         try:
-            async with self.conn.cursor() as cursor:
-                await cursor.execute(
-                    "SELECT user_name, item_name, amount, trade_skill, level_required, status, CASE WHEN has_materials = 0 THEN 'Yes' ELSE 'No' END as has_materials FROM crafting_requests WHERE request_id = ?",
-                    (request_id,),
-                )
-                request = await cursor.fetchone()
+            request = await self.db.requests.get(request_id)
 
             if request is None:
                 await interaction.followup.send(
@@ -390,43 +1300,43 @@ class Crafting(commands.GroupCog):
 
             status_embed.add_field(
                 name="Requestor",
-                value=f"{request["user_name"]}",
+                value=f"{request.user_name}",
                 inline=False,
             )
 
             status_embed.add_field(
                 name="Item",
-                value=f"{request['item_name']}",
+                value=f"{request.item_name}",
                 inline=False,
             )
 
             status_embed.add_field(
                 name="Has Materials",
-                value=f"{request['has_materials']}",
+                value="Yes" if request.has_materials else "No",
                 inline=False,
             )
 
             status_embed.add_field(
                 name="Amount",
-                value=f"{request['amount']}",
+                value=f"{request.amount}",
                 inline=False,
             )
 
             status_embed.add_field(
                 name="Trade Skill",
-                value=f"{request['trade_skill']}",
+                value=self.assets.label(interaction.guild_id, request.trade_skill),
                 inline=True,
             )
 
             status_embed.add_field(
                 name="Level Required",
-                value=f"{request['level_required']}",
+                value=f"{request.level_required}",
                 inline=True,
             )
 
             status_embed.add_field(
                 name="Status",
-                value=f"{request['status']}",
+                value=request.status_label,
                 inline=False,
             )
 
@@ -446,13 +1356,22 @@ class Crafting(commands.GroupCog):
             )
 
     @app_commands.command(name="cancel", description="Cancel a crafting request")
+    @responsive(ephemeral=True)
     async def cancel(self, interaction: discord.Interaction, request_id: int):
         """Cancel a crafting request"""
 
         user_id = interaction.user.id
-        await interaction.response.defer(ephemeral=True)
+        await defer(interaction, ephemeral=True)
 
-        success, message = await cancel_request(self.conn, user_id, request_id)
+        success, message = await cancel_request(
+            self.db,
+            user_id,
+            request_id,
+            self.balancer,
+            self.threads,
+            self.queue,
+            self.notifier,
+        )
 
         if success:
             await interaction.followup.send(
@@ -466,19 +1385,15 @@ class Crafting(commands.GroupCog):
     @app_commands.describe(
         status="The status of the crafting request to list",
     )
+    @responsive()
     async def list(self, interaction: discord.Interaction, status: Optional[Status]):
         """List crafting requests by status"""
 
-        await interaction.response.defer()
+        await defer(interaction)
 
         if status:
             try:
-                async with self.conn.cursor() as cursor:
-                    await cursor.execute(
-                        "SELECT request_id, user_name, item_name, CASE WHEN has_materials = 0 THEN 'Yes' ELSE 'No' END as has_materials, amount, status FROM crafting_requests WHERE status = ?",
-                        (status.value.upper(),),
-                    )
-                    jobs = await cursor.fetchall()
+                jobs = await self.db.requests.all(status)
 
                 jobs_embed = discord.Embed(
                     title="Crafting Requests",
@@ -488,8 +1403,8 @@ class Crafting(commands.GroupCog):
 
                 for job in jobs:
                     jobs_embed.add_field(
-                        name=f"Job ID: {job['request_id']}",
-                        value=f"**User:** {job['user_name']}\n**Item:** {job['item_name']}\n**Has Materials:** {job['has_materials']}\n**Amount:** {job['amount']}\n**Status:** {job['status']}",
+                        name=f"Job ID: {job.request_id}",
+                        value=f"**User:** {job.user_name}\n**Item:** {job.item_name}\n**Has Materials:** {'Yes' if job.has_materials else 'No'}\n**Amount:** {job.amount}\n**Status:** {job.status_label}",
                         inline=True,
                     )
 
@@ -508,11 +1423,7 @@ class Crafting(commands.GroupCog):
                 )
         else:
             try:
-                async with self.conn.cursor() as cursor:
-                    await cursor.execute(
-                        "SELECT request_id, user_name, item_name, CASE WHEN has_materials = 0 THEN 'Yes' ELSE 'No' END as has_materials, amount, status FROM crafting_requests",
-                    )
-                    jobs = await cursor.fetchall()
+                jobs = await self.db.requests.all()
 
                 all_jobs_embed = discord.Embed(
                     title="Crafting Requests",
@@ -522,8 +1433,8 @@ class Crafting(commands.GroupCog):
 
                 for job in jobs:
                     all_jobs_embed.add_field(
-                        name=f"Request ID: {job['request_id']}",
-                        value=f"**User:** {job['user_name']}\n**Item:** {job['item_name']}\n**Has Materials:** {job['has_materials']}\n**Amount:** {job['amount']}\n**Status:** {job['status']}",
+                        name=f"Request ID: {job.request_id}",
+                        value=f"**User:** {job.user_name}\n**Item:** {job.item_name}\n**Has Materials:** {'Yes' if job.has_materials else 'No'}\n**Amount:** {job.amount}\n**Status:** {job.status_label}",
                         inline=True,
                     )
 
@@ -541,25 +1452,65 @@ class Crafting(commands.GroupCog):
                     ephemeral=True,
                 )
 
+    @app_commands.command(
+        name="queue", description="Open crafting requests you can craft, best first"
+    )
+    @app_commands.describe(limit="How many requests to show")
+    @responsive(ephemeral=True)
+    async def my_queue(
+        self,
+        interaction: discord.Interaction,
+        limit: app_commands.Range[int, 1, 25] = 10,
+    ):
+        """Rank the open requests the caller has the trade skill levels for"""
+        levels = self.balancer.levels(interaction.user.id)
+        jobs = self.queue.for_crafter(interaction.user.id, levels, limit)
+
+        if not jobs:
+            await reply(
+                interaction,
+                "There are no open crafting requests you can craft right now. Use `/crafting set_skill` to add your trade skills.",
+                ephemeral=True,
+            )
+            return
+
+        queue_embed = discord.Embed(
+            title="Your Crafting Queue",
+            description="Open requests matching your trade skills, materials provided and oldest first",
+            color=discord.Color.gold(),
+        )
+
+        for rank, job in enumerate(jobs, start=1):
+            queue_embed.add_field(
+                name=f"#{rank} | Request ID: {job.request_id}",
+                value=f"**User:** {job.user_name}\n**Item:** {job.item_name}\n**Has Materials:** {'Yes' if job.has_materials else 'No'}\n**Amount:** {job.amount}\n**Trade Skill:** {job.trade_skill_label} {job.level_required or ''}\n**Requested:** <t:{int(job.created_timestamp)}:R>",
+                inline=True,
+            )
+
+        await reply(interaction, embed=queue_embed, ephemeral=True)
+
     @app_commands.command(name="accept", description="Accept a crafting request")
+    @responsive(ephemeral=True)
     async def accept(self, interaction: discord.Interaction, request_id: str):
         """Accept a crafting request"""
         user_id = interaction.user.id
-        await interaction.response.defer(ephemeral=True)
-
-        success, message = await accept_request(self.conn, user_id, request_id)
+        await defer(interaction, ephemeral=True)
+
+        (success, message), fresh = await self.idempotency.run(
+            accept_keys(interaction, request_id),
+            lambda: accept_request(
+                self.db, user_id, request_id, self.balancer, self.queue, self.notifier
+            ),
+            remember=accept_succeeded,
+        )
 
-        if success:
+        # A repeat of an accept that went through doesn't ping the requestor again
+        if success and fresh:
             try:
-                async with self.conn.cursor() as cursor:
-                    job = await cursor.execute(
-                        "SELECT requestor_id FROM crafting_requests WHERE request_id = ?",
-                        (request_id,),
-                    ).fetchone()
-                    requestor_id = job["requestor_id"]
+                job = await self.db.requests.get(request_id)
 
                 await interaction.followup.send(
-                    f"<@{requestor_id}> {message} by {interaction.user.mention}!",
+                    f"<@{job.requestor_id}> {message} by {interaction.user.mention}!",
                 )
             except sqlite3.DatabaseError as e:
                 logging.error(f"Database error in accept command: {e}")
@@ -571,56 +1522,52 @@ class Crafting(commands.GroupCog):
             await interaction.followup.send(message, ephemeral=True)
 
     @app_commands.command(name="complete", description="Complete a crafting request")
+    @responsive()
     async def complete(self, interaction: discord.Interaction, request_id: str):
         """Complete a crafting request"""
 
         user_id = interaction.user.id
 
-        await interaction.response.defer()
+        await defer(interaction)
 
         # Get the job details matching the entered job ID
         try:
-            async with self.conn.cursor() as cursor:
-                job = await cursor.execute(
-                    "SELECT * FROM crafting_requests WHERE request_id = ? AND status = 'ACCEPTED'",
-                    (request_id,),
-                ).fetchone()
-
-                # If the job exists and is not already completed
-                if not job:
-                    await interaction.followup.send(
-                        f"Crafting request {request_id} not found or already completed.",
-                        ephemeral=True,
-                    )
-                    return
-
-                # Check if the user who accepted the job is the same as the user who is completing the job
-                if job["accepted_by"] != str(user_id):
-                    await interaction.followup.send(
-                        f"You are not the one who accepted this job. Only the person who accepted the job can complete it.",
-                        ephemeral=True,
-                    )
-                    return
+            job = await self.db.requests.get(request_id)
 
-                # Get who requested the crafting request to use later
-                requestor_id: str = job["requestor_id"]
+            # If the job exists and is not already completed
+            if job is None or job.status is not Status.ACCEPTED:
+                await interaction.followup.send(
+                    f"Crafting request {request_id} not found or already completed.",
+                    ephemeral=True,
+                )
+                return
 
-                # Update the job status to "COMPLETED"
-                current_time = datetime.now()
-                await cursor.execute(
-                    "UPDATE crafting_requests SET status = 'COMPLETED', completed_on = ? WHERE request_id = ?",
-                    (request_id, current_time),
+            # Check if the user who accepted the job is the same as the user who is completing the job
+            if job.accepted_by != str(user_id):
+                await interaction.followup.send(
+                    f"You are not the one who accepted this job. Only the person who accepted the job can complete it.",
+                    ephemeral=True,
                 )
+                return
+
+            # Get who requested the crafting request to use later
+            requestor_id: str = job.requestor_id
 
-                await cursor.execute(
-                    """UPDATE users 
-                    SET requests_completed = COALESCE(requests_completed, 0) + 1 
-                    WHERE user_id = ?
-                    """,
-                    (user_id),
+            # Update the job status to "COMPLETED" and credit the crafter
+            current_time = datetime.now(timezone.utc)
+            if not await self.db.requests.complete(request_id, user_id, current_time):
+                await interaction.followup.send(
+                    f"Crafting request {request_id} not found or already completed.",
+                    ephemeral=True,
                 )
+                return
 
-                await self.conn.commit()
+            self.balancer.add_load(user_id, -1)
+            self.threads.schedule_archive(request_id)
+            self.notifier.notify(
+                [requestor_id],
+                f"Your crafting request {request_id} for {job.amount}x {job.item_name} has been completed by {interaction.user.mention}.",
+            )
 
             await interaction.followup.send(
                 f"<@{requestor_id}> Crafting request {request_id} has been completed by {interaction.user.mention}"
@@ -643,6 +1590,7 @@ class Crafting(commands.GroupCog):
             )
 
     @app_commands.command(name="set_skill", description="Set a trade skill")
+    @responsive(ephemeral=True)
     async def set_skill(
         self, interaction: discord.Interaction, skill: TradeSkill, skill_level: int
     ):
@@ -651,55 +1599,77 @@ class Crafting(commands.GroupCog):
         user_id = interaction.user.id
 
         try:
-            async with self.conn.cursor() as cursor:
-                await cursor.execute(
-                    "INSERT INTO trade_skills (user_id, user_name, skill_name, skill_level) VALUES (?, ?, ?, ?) ON CONFLICT (user_id, skill_name) DO UPDATE SET skill_level = ?",
-                    (
-                        user_id,
-                        interaction.user.name,
-                        skill.value,
-                        skill_level,
-                        skill_level,
-                    ),
-                )
-                await self.conn.commit()
+            await self.db.skills.set(
+                user_id, interaction.user.name, skill.value, skill_level
+            )
 
-            await interaction.response.send_message(
-                f"Trade skill {skill.value} set to {skill_level}!", ephemeral=True
+            self.balancer.set_skill(user_id, skill.value, skill_level)
+
+            await reply(
+                interaction,
+                f"Trade skill {skill.value} set to {skill_level}!",
+                ephemeral=True,
             )
         except sqlite3.DatabaseError as e:
             logging.error(f"Database error in set_skill command: {e}")
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 "An error occurred while setting the trade skill. Please try again.",
                 ephemeral=True,
             )
         except discord.errors.HTTPException as e:
             logging.error(f"Error in sending message: {e}")
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 "An error occurred while sending the message. Please try again.",
                 ephemeral=True,
             )
 
+    @app_commands.command(
+        name="notifications",
+        description="Choose how to be notified about your requests and new work",
+    )
+    @app_commands.describe(
+        mode="Instant DMs, one DM an hour with everything since the last, or none"
+    )
+    @responsive(ephemeral=True)
+    async def notifications(self, interaction: discord.Interaction, mode: NotifyMode):
+        """Set the notification preference of the invoking user"""
+        user_id = interaction.user.id
+
+        try:
+            await self.db.notifications.set(user_id, mode.name)
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Database error in notifications command: {e}")
+            await reply(
+                interaction,
+                "An error occurred while saving your preference. Please try again.",
+                ephemeral=True,
+            )
+            return
+
+        self.notifier.set_mode(user_id, mode)
+        await reply(interaction, f"Notifications set to {mode.value}.", ephemeral=True)
+
     @app_commands.command(
         name="crafters", description="List crafters with their trained skills"
     )
+    @responsive()
     async def crafters(self, interaction: discord.Interaction):
         """List crafters with their trained skills"""
-        await interaction.response.defer()
+        await defer(interaction)
 
         # Fetch crafters and their trained skills
         try:
-            async with self.conn.cursor() as cursor:
-                await cursor.execute(
-                    "SELECT user_name, GROUP_CONCAT(skill_name || ': ' || skill_level, ', ') AS skills FROM trade_skills GROUP BY user_id, user_name"
-                )
-                crafters = await cursor.fetchall()
+            crafters = await self.db.skills.crafters()
 
             if not crafters or len(crafters) == 0:
-                await interaction.response.send_message(
+                await reply(
+                    interaction,
                     "No crafters found. Use `/set_skill` to set a trade skill.",
                     ephemeral=True,
                 )
+                return
 
             crafters_embed = discord.Embed(
                 title="Crafters",
@@ -709,40 +1679,48 @@ class Crafting(commands.GroupCog):
 
             for crafter in crafters:
                 crafters_embed.add_field(
-                    name=f"Crafter: {crafter[0].capitalize()}",
-                    value=f"**Skills:** {crafter[1]}",
+                    name=f"Crafter: {crafter.display_name}",
+                    value=f"**Skills:** {crafter.skills}",
                     inline=False,
                 )
 
             await interaction.followup.send(embed=crafters_embed)
         except sqlite3.DatabaseError as e:
             logging.error(f"Database error in crafters command: {e}")
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 "An error occurred while fetching crafters. Please try again.",
                 ephemeral=True,
             )
         except discord.errors.HTTPException as e:
             logging.error(f"Error in sending message: {e}")
-            await interaction.response.send_message(
+            await reply(
+                interaction,
                 "An error occurred while sending the message. Please try again.",
                 ephemeral=True,
             )
 
     @app_commands.command(name="delete", description="Delete a crafting request")
     @app_commands.default_permissions(administrator=True)
+    @responsive(ephemeral=True)
     async def delete(self, interaction: discord.Interaction, request_id: str):
         """Delete a crafting request"""
-        await interaction.response.defer(ephemeral=True)
+        await defer(interaction, ephemeral=True)
 
         try:
-            async with self.conn.cursor() as cursor:
-                await cursor.execute(
-                    "DELETE FROM crafting_requests WHERE request_id = ?", (request_id,)
-                )
-                await self.conn.commit()
+            job, thread_id = await self.db.requests.delete(request_id)
 
-            await interaction.response.send_message(
-                f"Crafting request {request_id} has been deleted!", ephemeral=True
+            if job is not None and job.status is Status.ACCEPTED:
+                self.balancer.add_load(job.accepted_by, -1)
+
+            self.queue.remove(request_id)
+            if thread_id is not None:
+                self.threads.schedule_archive(request_id, thread_id)
+
+            await reply(
+                interaction,
+                f"Crafting request {request_id} has been deleted!",
+                ephemeral=True,
             )
 
             logging.info(
@@ -755,6 +1733,210 @@ class Crafting(commands.GroupCog):
                 ephemeral=True,
             )
 
+    @app_commands.command(
+        name="export", description="Export crafting requests or crafter skills"
+    )
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.describe(
+        table="The data to export",
+        export_format="The file format of the export",
+    )
+    @responsive(ephemeral=True, slo=BULK_HANDLER_SLO)
+    async def export(
+        self,
+        interaction: discord.Interaction,
+        table: ExportTable,
+        export_format: Optional[ExportFormat] = ExportFormat.CSV,
+    ):
+        """Export a table as a gzip-compressed CSV or NDJSON attachment"""
+        await defer(interaction, ephemeral=True)
+
+        try:
+            export_file, rows_written = await export_table(
+                self.db, table, export_format
+            )
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Database error in export command: {e}")
+            await interaction.followup.send(
+                "An error occurred while exporting the data. Please try again.",
+                ephemeral=True,
+            )
+            return
+
+        with export_file:
+            file_size = export_file.seek(0, io.SEEK_END)
+            export_file.seek(0)
+
+            if file_size > interaction.guild.filesize_limit:
+                await interaction.followup.send(
+                    f"The export is {file_size // (1024 * 1024)}MB, which is larger than this server's upload limit.",
+                    ephemeral=True,
+                )
+                return
+
+            filename = f"{table.value}-{datetime.now():%Y%m%d-%H%M%S}.{export_format.value}.gz"
+
+            try:
+                await interaction.followup.send(
+                    f"Exported {rows_written} rows from `{table.value}`.",
+                    file=discord.File(export_file, filename=filename),
+                    ephemeral=True,
+                )
+            except discord.errors.HTTPException as e:
+                logging.error(f"Error in sending message: {e}")
+                await interaction.followup.send(
+                    "An error occurred while uploading the export. Please try again.",
+                    ephemeral=True,
+                )
+                return
+
+        logging.info(
+            f"{table.value} exported as {export_format.value} ({rows_written} rows) by {interaction.user.id}({interaction.user.name})"
+        )
+
+    @app_commands.command(
+        name="import_skills", description="Import crafter skills from a roster file"
+    )
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.describe(
+        roster="A CSV, JSON or NDJSON file with user_id, user_name, skill and level columns",
+    )
+    @responsive(ephemeral=True, slo=BULK_HANDLER_SLO)
+    async def import_skills(
+        self, interaction: discord.Interaction, roster: discord.Attachment
+    ):
+        """Bulk import crafter skills from an uploaded roster"""
+        await defer(interaction, ephemeral=True)
+
+        if roster.size > MAX_ROSTER_SIZE:
+            await interaction.followup.send(
+                f"Rosters can be at most {MAX_ROSTER_SIZE // (1024 * 1024)}MB.",
+                ephemeral=True,
+            )
+            return
+
+        try:
+            data = await roster.read()
+            # Parsing thousands of rows is CPU bound, keep it off the event loop
+            rows, errors = await asyncio.to_thread(
+                parse_skill_roster, data, roster.filename
+            )
+        except discord.errors.HTTPException as e:
+            logging.error(f"Failed to download roster {roster.filename}: {e}")
+            await interaction.followup.send(
+                "An error occurred while downloading the roster. Please try again.",
+                ephemeral=True,
+            )
+            return
+        except ValueError as e:
+            await interaction.followup.send(str(e), ephemeral=True)
+            return
+
+        if rows:
+            try:
+                await self.db.skills.set_many(rows)
+            except sqlite3.DatabaseError as e:
+                logging.error(f"Database error in import_skills command: {e}")
+                await interaction.followup.send(
+                    "An error occurred while importing the roster. No skills were changed.",
+                    ephemeral=True,
+                )
+                return
+
+            for user_id, _, skill_name, skill_level in rows:
+                self.balancer.set_skill(user_id, skill_name, skill_level)
+
+        logging.info(
+            f"{len(rows)} trade skills imported from {roster.filename} by {interaction.user.id}({interaction.user.name}) with {len(errors)} errors"
+        )
+
+        message = f"Imported {len(rows)} trade skills from {roster.filename}."
+        if not errors:
+            await interaction.followup.send(message, ephemeral=True)
+            return
+
+        message += f" {len(errors)} rows were skipped:\n" + "\n".join(
+            errors[:MAX_INLINE_IMPORT_ERRORS]
+        )
+
+        if len(errors) <= MAX_INLINE_IMPORT_ERRORS:
+            await interaction.followup.send(message, ephemeral=True)
+            return
+
+        await interaction.followup.send(
+            message + "\nSee the attached file for the full list.",
+            file=discord.File(
+                io.BytesIO("\n".join(errors).encode("utf-8")),
+                filename="import_errors.txt",
+            ),
+            ephemeral=True,
+        )
+
+    @app_commands.command(
+        name="insights", description="Crafting statistics for company officers"
+    )
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.describe(
+        insight="The statistic to show",
+        days="How many days back to look",
+    )
+    @responsive(ephemeral=True, slo=BULK_HANDLER_SLO)
+    async def insights(
+        self,
+        interaction: discord.Interaction,
+        insight: Insight,
+        days: app_commands.Range[int, 1, 365] = 30,
+    ):
+        """Aggregate the analytics snapshot, never the live database"""
+        await defer(interaction, ephemeral=True)
+
+        try:
+            report = await self.reports.render_insight(SNAPSHOT_PATH, insight, days)
+        except FileNotFoundError:
+            await interaction.followup.send(
+                "No analytics snapshot has been taken yet. Please try again in a few minutes.",
+                ephemeral=True,
+            )
+            return
+        except (ValueError, OSError) as e:
+            logging.error(f"Failed to read the analytics snapshot: {e}")
+            await interaction.followup.send(
+                "An error occurred while reading the analytics snapshot. Please try again.",
+                ephemeral=True,
+            )
+            return
+        except ReportQueueFull:
+            await interaction.followup.send(
+                "Too many reports are being prepared right now. Please try again in a moment.",
+                ephemeral=True,
+            )
+            return
+
+        if not report.rows:
+            await interaction.followup.send(
+                f"No crafting activity in the last {days} days.", ephemeral=True
+            )
+            return
+
+        insights_embed = discord.Embed(
+            title=f"Insights: {insight.name.replace('_', ' ').title()}",
+            description=f"```\n{report.table}\n```",
+            color=discord.Color.blue(),
+            timestamp=datetime.fromtimestamp(report.created_at, timezone.utc),
+        )
+        insights_embed.set_footer(text=f"Last {days} days, snapshot taken")
+
+        if report.chart is None:
+            await interaction.followup.send(embed=insights_embed, ephemeral=True)
+            return
+
+        insights_embed.set_image(url="attachment://insight.png")
+        await interaction.followup.send(
+            embed=insights_embed,
+            file=discord.File(io.BytesIO(report.chart), filename="insight.png"),
+            ephemeral=True,
+        )
+
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(Crafting(bot))
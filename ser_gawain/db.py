@@ -0,0 +1,542 @@
+import asqlite
+import asyncio
+import json
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional, TypeVar
+from ser_gawain.models import Crafter, CrafterSkill, CraftingRequest, Status
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    user_name TEXT,
+    requests_completed INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS crafting_requests (
+    request_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    requestor_id TEXT,
+    user_name TEXT,
+    item_name TEXT,
+    has_materials BOOLEAN,
+    amount INTEGER,
+    trade_skill TEXT,
+    level_required INTEGER CHECK(level_required >= 0 AND level_required <= 250),
+    status TEXT,
+    accepted_by TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    completed_on TIMESTAMP DEFAULT NULL,
+    FOREIGN KEY (accepted_by) REFERENCES users(user_id)
+);
+
+-- Open and accepted requests are a small part of the table, the queue and the
+-- crafter loads read them without scanning completed ones
+CREATE INDEX IF NOT EXISTS idx_crafting_requests_status ON crafting_requests (status, accepted_by);
+
+CREATE TABLE IF NOT EXISTS trade_skills (
+    skill_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT,
+    user_name TEXT,
+    skill_name TEXT,
+    skill_level INTEGER CHECK(skill_level >= 0 AND skill_level <= 250),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(user_id),
+    UNIQUE (user_id, skill_name)
+);
+
+CREATE TABLE IF NOT EXISTS request_threads (
+    request_id INTEGER PRIMARY KEY,
+    thread_id TEXT NOT NULL,
+    archived BOOLEAN DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (request_id) REFERENCES crafting_requests(request_id)
+);
+
+CREATE TABLE IF NOT EXISTS request_keys (
+    idempotency_key TEXT PRIMARY KEY,
+    request_id INTEGER,
+    created_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS notification_preferences (
+    user_id TEXT PRIMARY KEY,
+    mode TEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# sqlite3 keeps compiled statements in a per-connection LRU keyed by the SQL text.
+# Every query below is a module constant so repeated calls always hit that cache;
+# the size leaves plenty of headroom over the number of distinct statements.
+STATEMENT_CACHE_SIZE = 256
+
+
+# Column order matches the fields of CraftingRequest
+REQUEST_COLUMNS = "request_id, requestor_id, user_name, item_name, has_materials, amount, trade_skill, level_required, status, accepted_by, created_at, completed_on"
+
+GET_REQUEST = f"SELECT {REQUEST_COLUMNS} FROM crafting_requests WHERE request_id = ?"
+LIST_REQUESTS = f"SELECT {REQUEST_COLUMNS} FROM crafting_requests"
+LIST_REQUESTS_BY_STATUS = (
+    f"SELECT {REQUEST_COLUMNS} FROM crafting_requests WHERE status = ?"
+)
+CREATE_REQUEST = """INSERT INTO crafting_requests
+    (requestor_id, user_name, item_name, has_materials, amount, trade_skill, level_required, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, 'PENDING')
+"""
+# A key is claimed again once it is older than the window, so the insert only
+# changes a row when the request isn't a duplicate
+CLAIM_REQUEST_KEY = """INSERT INTO request_keys (idempotency_key, created_at) VALUES (?, ?)
+    ON CONFLICT (idempotency_key) DO UPDATE SET request_id = NULL, created_at = excluded.created_at
+    WHERE request_keys.created_at < ?
+"""
+SET_REQUEST_KEY = "UPDATE request_keys SET request_id = ? WHERE idempotency_key = ?"
+GET_REQUEST_KEY = "SELECT request_id FROM request_keys WHERE idempotency_key = ?"
+PRUNE_REQUEST_KEYS = "DELETE FROM request_keys WHERE created_at < ?"
+ACCEPT_REQUEST = "UPDATE crafting_requests SET status = 'ACCEPTED', accepted_by = ? WHERE request_id = ? AND status = 'PENDING'"
+CANCEL_REQUEST = "UPDATE crafting_requests SET status = 'CANCELLED' WHERE request_id = ? AND status IN ('PENDING', 'ACCEPTED')"
+COMPLETE_REQUEST = "UPDATE crafting_requests SET status = 'COMPLETED', completed_on = ? WHERE request_id = ? AND status = 'ACCEPTED' AND accepted_by = ?"
+DELETE_REQUEST = "DELETE FROM crafting_requests WHERE request_id = ?"
+COUNT_ACCEPTED_BY_CRAFTER = "SELECT accepted_by, COUNT(*) FROM crafting_requests WHERE status = 'ACCEPTED' AND accepted_by IS NOT NULL GROUP BY accepted_by"
+
+ADD_USER = "INSERT INTO users (user_id, user_name) VALUES (?, ?)"
+ENSURE_USER = "INSERT INTO users (user_id, user_name) VALUES (?, ?) ON CONFLICT (user_id) DO NOTHING"
+DELETE_USER = "DELETE FROM users WHERE user_id = ?"
+GET_REQUESTS_COMPLETED = "SELECT requests_completed FROM users WHERE user_id = ?"
+INCREMENT_REQUESTS_COMPLETED = "UPDATE users SET requests_completed = COALESCE(requests_completed, 0) + 1 WHERE user_id = ?"
+
+SET_SKILL = """INSERT INTO trade_skills (user_id, user_name, skill_name, skill_level) VALUES (?, ?, ?, ?)
+    ON CONFLICT (user_id, skill_name) DO UPDATE SET skill_level = excluded.skill_level, user_name = COALESCE(excluded.user_name, user_name)
+"""
+LIST_SKILLS = "SELECT user_id, user_name, skill_name, skill_level FROM trade_skills"
+# Rows imported without a name don't split a crafter in two, MAX skips NULL names
+LIST_CRAFTERS = "SELECT user_id, MAX(user_name), GROUP_CONCAT(skill_name || ': ' || skill_level, ', ') AS skills FROM trade_skills GROUP BY user_id"
+
+GET_THREAD = "SELECT thread_id FROM request_threads WHERE request_id = ?"
+GET_OPEN_THREAD = "SELECT thread_id FROM request_threads WHERE request_id = ? AND archived = 0"
+DELETE_THREAD = "DELETE FROM request_threads WHERE request_id = ?"
+SET_THREAD = """INSERT INTO request_threads (request_id, thread_id) VALUES (?, ?)
+    ON CONFLICT (request_id) DO UPDATE SET thread_id = excluded.thread_id, archived = 0
+"""
+# Batches are passed as one JSON array so the statement text (and its cache entry)
+# doesn't change with the number of requests
+LIST_OPEN_THREADS = "SELECT request_id, thread_id FROM request_threads WHERE archived = 0 AND request_id IN (SELECT value FROM json_each(?))"
+MARK_THREADS_ARCHIVED = "UPDATE request_threads SET archived = 1 WHERE request_id IN (SELECT value FROM json_each(?))"
+
+# A lease is taken over once it has expired, and renewed only by its holder
+ACQUIRE_LEASE = """INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)
+    ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+    WHERE leases.holder = excluded.holder OR leases.expires_at < ?
+"""
+RELEASE_LEASE = "DELETE FROM leases WHERE name = ? AND holder = ?"
+GET_LEASE_HOLDER = "SELECT holder FROM leases WHERE name = ? AND expires_at >= ?"
+
+SET_NOTIFY_MODE = """INSERT INTO notification_preferences (user_id, mode) VALUES (?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET mode = excluded.mode, updated_at = CURRENT_TIMESTAMP
+"""
+LIST_NOTIFY_MODES = "SELECT user_id, mode FROM notification_preferences"
+
+# Analytics snapshots read the tables through their own connection, timestamps come
+# back as epoch seconds so they can be stored in fixed-width columns
+SNAPSHOT_REQUESTS = "SELECT CAST(strftime('%s', created_at) AS INTEGER), CAST(strftime('%s', completed_on) AS INTEGER), status, trade_skill, level_required, amount, item_name, requestor_id, accepted_by FROM crafting_requests ORDER BY request_id"
+SNAPSHOT_SKILLS = "SELECT user_id, skill_name, skill_level FROM trade_skills ORDER BY skill_id"
+SNAPSHOT_USERS = "SELECT user_id, user_name FROM users"
+
+
+T = TypeVar("T")
+
+
+class Repo:
+    """Shared plumbing for the per-table repositories.
+
+    Every repository shares one connection, so there is only ever one transaction
+    open on it. Writes hold the database's ``lock``: a transaction can't be begun
+    inside another one, and a statement from one coroutine must not land in another
+    coroutine's transaction where its rollback would discard it.
+    """
+
+    table: str
+    order_by: str
+
+    def __init__(self, conn: asqlite.Connection, lock: asyncio.Lock):
+        self.conn = conn
+        self.lock = lock
+
+    @asynccontextmanager
+    async def _transaction(self) -> AsyncIterator[asqlite.Cursor]:
+        async with self.lock:
+            async with self.conn.cursor(transaction=True) as cursor:
+                yield cursor
+
+    async def _write(self, sql: str, params: tuple) -> int:
+        """Execute a single statement, returns the number of rows it changed."""
+        async with self.lock:
+            async with self.conn.execute(sql, params) as cursor:
+                return cursor.get_cursor().rowcount
+
+    async def _fetchone(
+        self, sql: str, params: tuple, row_factory: Callable[..., T]
+    ) -> Optional[T]:
+        # sqlite3 applies the row factory at fetch time on the database thread, so
+        # rows arrive already mapped without an intermediate sqlite3.Row
+        async with self.conn.execute(sql, params) as cursor:
+            cursor.get_cursor().row_factory = row_factory
+            return await cursor.fetchone()
+
+    async def _fetchall(
+        self, sql: str, params: tuple, row_factory: Callable[..., T]
+    ) -> list[T]:
+        async with self.conn.execute(sql, params) as cursor:
+            cursor.get_cursor().row_factory = row_factory
+            return await cursor.fetchall()
+
+    async def columns(self) -> list[str]:
+        rows = await self.conn.fetchall(f"PRAGMA table_info({self.table})")
+        return [row["name"] for row in rows]
+
+    async def stream(self, chunk_size: int) -> AsyncIterator[list[sqlite3.Row]]:
+        """Yield every row of the table, ``chunk_size`` rows per database round trip."""
+        async with self.conn.cursor() as cursor:
+            await cursor.execute(f"SELECT * FROM {self.table} ORDER BY {self.order_by}")
+            while rows := await cursor.fetchmany(chunk_size):
+                yield rows
+
+
+class RequestRepo(Repo):
+    table = "crafting_requests"
+    order_by = "request_id"
+
+    async def get(self, request_id: int | str) -> Optional[CraftingRequest]:
+        return await self._fetchone(
+            GET_REQUEST, (request_id,), CraftingRequest.from_row
+        )
+
+    async def all(self, status: Optional[Status] = None) -> list[CraftingRequest]:
+        if status is None:
+            return await self._fetchall(LIST_REQUESTS, (), CraftingRequest.from_row)
+        return await self._fetchall(
+            LIST_REQUESTS_BY_STATUS, (status.name,), CraftingRequest.from_row
+        )
+
+    async def _insert(
+        self,
+        cursor: asqlite.Cursor,
+        requestor_id: int | str,
+        user_name: str,
+        item_name: str,
+        has_materials: bool,
+        amount: int,
+        trade_skill: Optional[str],
+        level_required: Optional[int],
+    ) -> int:
+        await cursor.execute(ENSURE_USER, (str(requestor_id), user_name))
+        await cursor.execute(
+            CREATE_REQUEST,
+            (
+                str(requestor_id),
+                user_name,
+                item_name,
+                has_materials,
+                amount,
+                trade_skill,
+                level_required,
+            ),
+        )
+        return cursor.get_cursor().lastrowid
+
+    async def create(
+        self,
+        requestor_id: int | str,
+        user_name: str,
+        item_name: str,
+        has_materials: bool,
+        amount: int,
+        trade_skill: Optional[str],
+        level_required: Optional[int],
+    ) -> int:
+        """Insert a PENDING request, adding the requestor as a user if needed."""
+        async with self._transaction() as cursor:
+            return await self._insert(
+                cursor,
+                requestor_id,
+                user_name,
+                item_name,
+                has_materials,
+                amount,
+                trade_skill,
+                level_required,
+            )
+
+    async def create_once(
+        self,
+        idempotency_key: str,
+        window: float,
+        requestor_id: int | str,
+        user_name: str,
+        item_name: str,
+        has_materials: bool,
+        amount: int,
+        trade_skill: Optional[str],
+        level_required: Optional[int],
+    ) -> tuple[int, bool]:
+        """Like ``create``, unless the same key was used in the last ``window`` seconds.
+
+        Returns the request ID and whether it was created by this call. The key is
+        claimed in the same transaction as the insert, so concurrent duplicates from
+        any process sharing the database create one request between them.
+        """
+        now = time.time()
+        async with self._transaction() as cursor:
+            await cursor.execute(
+                CLAIM_REQUEST_KEY, (idempotency_key, now, now - window)
+            )
+            if cursor.get_cursor().rowcount != 1:
+                await cursor.execute(GET_REQUEST_KEY, (idempotency_key,))
+                row = await cursor.fetchone()
+                return row[0], False
+
+            await cursor.execute(PRUNE_REQUEST_KEYS, (now - window,))
+            request_id = await self._insert(
+                cursor,
+                requestor_id,
+                user_name,
+                item_name,
+                has_materials,
+                amount,
+                trade_skill,
+                level_required,
+            )
+            await cursor.execute(SET_REQUEST_KEY, (request_id, idempotency_key))
+            return request_id, True
+
+    async def accept(self, request_id: int | str, user_id: int | str) -> bool:
+        """Mark a PENDING request as accepted. Returns False if it wasn't PENDING."""
+        return await self._write(ACCEPT_REQUEST, (str(user_id), request_id)) == 1
+
+    async def cancel(self, request_id: int | str) -> bool:
+        return await self._write(CANCEL_REQUEST, (request_id,)) == 1
+
+    async def complete(
+        self, request_id: int | str, user_id: int | str, completed_on: datetime
+    ) -> bool:
+        """Complete a request accepted by ``user_id`` and credit them with it.
+
+        ``completed_on`` is stored in UTC in the same format as ``CURRENT_TIMESTAMP``,
+        so it can be compared with ``created_at``. Naive datetimes are local time.
+        """
+        completed_on = completed_on.astimezone(timezone.utc)
+        async with self._transaction() as cursor:
+            await cursor.execute(
+                COMPLETE_REQUEST,
+                (f"{completed_on:%Y-%m-%d %H:%M:%S}", request_id, str(user_id)),
+            )
+            if cursor.get_cursor().rowcount != 1:
+                return False
+
+            await cursor.execute(INCREMENT_REQUESTS_COMPLETED, (str(user_id),))
+            return True
+
+    async def delete(
+        self, request_id: int | str
+    ) -> tuple[Optional[CraftingRequest], Optional[int]]:
+        """Delete a request and its thread mapping.
+
+        Returns the row as it was before deletion, and the request's thread ID if it
+        has one that isn't archived yet, which is left to the caller to archive.
+        """
+        async with self._transaction() as cursor:
+            cursor.get_cursor().row_factory = CraftingRequest.from_row
+            await cursor.execute(GET_REQUEST, (request_id,))
+            job = await cursor.fetchone()
+
+            cursor.get_cursor().row_factory = None
+            await cursor.execute(GET_OPEN_THREAD, (request_id,))
+            thread = await cursor.fetchone()
+
+            # The mapping references the request, it goes first
+            await cursor.execute(DELETE_THREAD, (request_id,))
+            await cursor.execute(DELETE_REQUEST, (request_id,))
+        return job, int(thread[0]) if thread is not None else None
+
+    async def accepted_counts(self) -> list[tuple[str, int]]:
+        rows = await self.conn.fetchall(COUNT_ACCEPTED_BY_CRAFTER)
+        return [(accepted_by, count) for accepted_by, count in rows]
+
+
+class UserRepo(Repo):
+    table = "users"
+    order_by = "user_id"
+
+    async def add(self, user_id: int | str, user_name: str) -> None:
+        """Add a user. Raises ``sqlite3.IntegrityError`` if they already exist."""
+        await self._write(ADD_USER, (str(user_id), user_name))
+
+    async def delete(self, user_id: int | str) -> bool:
+        return await self._write(DELETE_USER, (str(user_id),)) == 1
+
+    async def requests_completed(self, user_id: int | str) -> Optional[int]:
+        row = await self.conn.fetchone(GET_REQUESTS_COMPLETED, (str(user_id),))
+        return row[0] if row is not None else None
+
+
+class SkillRepo(Repo):
+    table = "trade_skills"
+    order_by = "skill_id"
+
+    async def set(
+        self,
+        user_id: int | str,
+        user_name: Optional[str],
+        skill_name: str,
+        skill_level: int,
+    ) -> None:
+        async with self._transaction() as cursor:
+            await cursor.execute(ENSURE_USER, (str(user_id), user_name))
+            await cursor.execute(
+                SET_SKILL, (str(user_id), user_name, skill_name, skill_level)
+            )
+
+    async def set_many(
+        self, rows: Iterable[tuple[str, Optional[str], str, int]]
+    ) -> None:
+        """Upsert ``(user_id, user_name, skill_name, skill_level)`` rows in one transaction.
+
+        Users missing from the users table are added first so the trade_skills
+        foreign key holds, then every skill is written with one ``executemany``.
+        """
+        rows = list(rows)
+        users = {user_id: user_name for user_id, user_name, _, _ in rows}
+
+        async with self._transaction() as cursor:
+            await cursor.executemany(ENSURE_USER, users.items())
+            await cursor.executemany(SET_SKILL, rows)
+
+    async def all(self) -> list[CrafterSkill]:
+        return await self._fetchall(LIST_SKILLS, (), CrafterSkill.from_row)
+
+    async def crafters(self) -> list[Crafter]:
+        return await self._fetchall(LIST_CRAFTERS, (), Crafter.from_row)
+
+
+class ThreadRepo(Repo):
+    table = "request_threads"
+    order_by = "request_id"
+
+    async def get(self, request_id: int | str) -> Optional[int]:
+        row = await self.conn.fetchone(GET_THREAD, (request_id,))
+        return int(row[0]) if row is not None else None
+
+    async def set(self, request_id: int | str, thread_id: int) -> None:
+        await self._write(SET_THREAD, (request_id, str(thread_id)))
+
+    async def open(self, request_ids: Iterable[int]) -> dict[int, int]:
+        """Map each of ``request_ids`` that has an unarchived thread to its thread ID."""
+        rows = await self.conn.fetchall(
+            LIST_OPEN_THREADS, (json.dumps([int(i) for i in request_ids]),)
+        )
+        return {request_id: int(thread_id) for request_id, thread_id in rows}
+
+    async def mark_archived(self, request_ids: Iterable[int]) -> None:
+        await self._write(
+            MARK_THREADS_ARCHIVED, (json.dumps([int(i) for i in request_ids]),)
+        )
+
+
+class LeaseRepo(Repo):
+    table = "leases"
+    order_by = "name"
+
+    async def acquire(self, name: str, holder: str, ttl: float) -> bool:
+        """Take or renew the lease ``name`` for ``ttl`` seconds.
+
+        Returns False if another holder has it and it hasn't expired yet. Expiry is
+        wall clock time, so every process sharing the database must agree on it.
+        """
+        now = time.time()
+        return await self._write(ACQUIRE_LEASE, (name, holder, now + ttl, now)) == 1
+
+    async def release(self, name: str, holder: str) -> None:
+        await self._write(RELEASE_LEASE, (name, holder))
+
+    async def holder(self, name: str) -> Optional[str]:
+        row = await self.conn.fetchone(GET_LEASE_HOLDER, (name, time.time()))
+        return row[0] if row is not None else None
+
+
+class NotificationRepo(Repo):
+    table = "notification_preferences"
+    order_by = "user_id"
+
+    async def set(self, user_id: int | str, mode: str) -> None:
+        await self._write(SET_NOTIFY_MODE, (str(user_id), mode))
+
+    async def all(self) -> list[tuple[str, str]]:
+        rows = await self.conn.fetchall(LIST_NOTIFY_MODES)
+        return [(user_id, mode) for user_id, mode in rows]
+
+
+class Database:
+    """Owns the bot's SQLite connection and the repositories built on it.
+
+    Created once in ``Gawain.setup_hook`` and shared by every cog, which must not
+    close it themselves.
+    """
+
+    def __init__(self, conn: asqlite.Connection, path: str = ":memory:"):
+        self.conn = conn
+        self.path = path
+        # Serializes writes on the shared connection, see Repo
+        self.lock = asyncio.Lock()
+        self.requests = RequestRepo(conn, self.lock)
+        self.users = UserRepo(conn, self.lock)
+        self.skills = SkillRepo(conn, self.lock)
+        self.threads = ThreadRepo(conn, self.lock)
+        self.leases = LeaseRepo(conn, self.lock)
+        self.notifications = NotificationRepo(conn, self.lock)
+
+    @classmethod
+    async def connect(cls, database: str) -> "Database":
+        conn = await asqlite.connect(
+            database, cached_statements=STATEMENT_CACHE_SIZE
+        )
+        return cls(conn, database)
+
+    async def create_tables(self) -> None:
+        async with self.conn.cursor() as cursor:
+            await cursor.executescript(SCHEMA)
+
+    async def close(self) -> None:
+        await self.conn.close()
+
+
+# Storage backends by name. Each connects to a DSN and returns a Database, and the
+# cogs only ever reach storage through its repositories, so a backend for another
+# engine provides a Database subclass with repositories speaking its dialect
+BACKENDS: dict[str, Callable[[str], Awaitable[Database]]] = {
+    "sqlite": Database.connect,
+}
+DEFAULT_BACKEND = "sqlite"
+
+
+def register_backend(name: str, connect: Callable[[str], Awaitable[Database]]) -> None:
+    BACKENDS[name] = connect
+
+
+async def connect(dsn: str, backend: str = DEFAULT_BACKEND) -> Database:
+    """Connect with the named backend, raises ``ValueError`` for an unknown one."""
+    try:
+        factory = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Unknown database backend '{backend}', expected one of {', '.join(BACKENDS)}"
+        ) from None
+    return await factory(dsn)
@@ -1,10 +1,14 @@
-trade_craft_emojis = {
-    "arcana": "<:arcana:1117467467070738502>",
-    "armoring": "<:armoring:1117467468502857759>",
-    "cooking": "<:cooking:1117467470174638120>",
-    "engineering": "<:engineering:1117467471746969610>",
-    "furnishing": "<:furnishing:1117467473207384174>",
-    "jewelcrafting": "<:jewelcrafting:1117467474742960208>",
-    "leatherworking": "<:leatherworking:1117467476376373308>",
-    "smelting": "<:smelting:1117467477985775676>",
+from ser_gawain.models import TradeSkill
+
+
+# Shown next to a trade skill in guilds without their own emoji for it. Guild emojis
+# named after the skill in lowercase (":arcana:") are picked up at runtime instead.
+TRADE_SKILL_EMOJIS = {
+    TradeSkill.ARCANA: "\N{CRYSTAL BALL}",
+    TradeSkill.ARMORING: "\N{SHIELD}\N{VARIATION SELECTOR-16}",
+    TradeSkill.COOKING: "\N{COOKING}",
+    TradeSkill.ENGINEERING: "\N{BOW AND ARROW}",
+    TradeSkill.FURNISHING: "\N{CHAIR}",
+    TradeSkill.JEWELCRAFTING: "\N{RING}",
+    TradeSkill.WEAPONSMITHING: "\N{CROSSED SWORDS}\N{VARIATION SELECTOR-16}",
 }
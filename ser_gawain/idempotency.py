@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable, Iterable, Optional, TypeVar
+
+
+# Repeats of the same action within this window are answered with the first result
+IDEMPOTENCY_WINDOW = 30.0  # seconds
+
+# Results remembered at once, the oldest are forgotten first past this
+IDEMPOTENCY_MAX_ENTRIES = 4096
+
+T = TypeVar("T")
+
+
+def request_fingerprint(
+    requestor_id: int | str, item_name: str, amount: Optional[int], skill: Optional[str]
+) -> str:
+    """Hash of what makes two crafting requests the same request.
+
+    Item names are compared case-insensitively with whitespace collapsed, so
+    "Iron  sword" and "iron sword" are duplicates.
+    """
+    normalized = json.dumps(
+        [
+            str(requestor_id),
+            " ".join(item_name.split()).casefold(),
+            amount or 1,
+            skill,
+        ]
+    )
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class IdempotencyCache:
+    """Remembers the outcome of recent actions so repeats don't run them again.
+
+    An action is registered under several keys at once, for example the interaction
+    that started it and a fingerprint of what it does, and a later call matching any
+    of them gets the same result. Calls arriving while the action is still running
+    wait for it. Failures are not remembered, so the next attempt runs again: an
+    exception always counts as one, and ``run`` can be told which results do too.
+
+    Each process keeps its own cache. A guild's interactions, and so their retries,
+    all reach the process running that guild's shard, while DM interactions all go
+    to shard 0. Nothing that can be repeated is started from a DM when sharded,
+    since auto-assign offers are turned off then. Duplicates between processes are
+    still caught by the database, with request keys for new requests and
+    conditional updates for accepts.
+    """
+
+    def __init__(
+        self,
+        window: float = IDEMPOTENCY_WINDOW,
+        max_entries: int = IDEMPOTENCY_MAX_ENTRIES,
+    ):
+        self.window = window
+        self.max_entries = max_entries
+        # Insertion order is expiry order, every entry lives for the same window
+        self._entries: OrderedDict[Hashable, tuple[float, asyncio.Future]] = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        while self._entries:
+            key, (expires, _) = next(iter(self._entries.items()))
+            if expires > now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[key]
+
+    def _forget(self, keys: list[Hashable], future: asyncio.Future) -> None:
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is future:
+                del self._entries[key]
+
+    async def run(
+        self,
+        keys: Iterable[Hashable],
+        action: Callable[[], Awaitable[T]],
+        remember: Optional[Callable[[T], bool]] = None,
+    ) -> tuple[T, bool]:
+        """Run ``action`` unless one of ``keys`` ran recently.
+
+        Returns the result and True if it came from this call, or the earlier
+        call's result and False for a repeat. Results ``remember`` returns False for
+        are handed to the calls already waiting, but not kept for later ones.
+        """
+        keys = list(keys)
+        self._evict()
+
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return await asyncio.shield(entry[1]), False
+
+        future = asyncio.get_running_loop().create_future()
+        expires = time.monotonic() + self.window
+        for key in keys:
+            self._entries[key] = (expires, future)
+
+        try:
+            result = await action()
+        except BaseException as e:
+            self._forget(keys, future)
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Repeats waiting on it get the error, nobody else retrieves it
+                future.exception()
+            raise
+
+        future.set_result(result)
+        if remember is not None and not remember(result):
+            self._forget(keys, future)
+        self._evict()
+        return result, True
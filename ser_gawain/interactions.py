@@ -0,0 +1,168 @@
+import asyncio
+import contextlib
+import contextvars
+import discord
+import functools
+import logging
+import time
+import traceback
+from collections import Counter
+from typing import Optional
+
+
+# Discord drops interactions that aren't acknowledged within 3 seconds. Handlers
+# that haven't responded this long after they started are deferred for them.
+ACK_BUDGET = 2.0  # seconds
+
+# Handlers still running after this long are logged with where they are waiting
+HANDLER_SLO = 5.0  # seconds
+# Exports, imports and reports legitimately take longer
+BULK_HANDLER_SLO = 30.0  # seconds
+
+# Handlers that ran past their SLO, by qualified name, since the bot started
+slo_breaches: Counter[str] = Counter()
+
+# Serializes the first response of the interaction being handled, so the watchdog
+# and the handler never both try to acknowledge it
+_ack_lock: contextvars.ContextVar[Optional[asyncio.Lock]] = contextvars.ContextVar(
+    "ack_lock", default=None
+)
+
+
+def _acknowledging():
+    lock = _ack_lock.get()
+    return lock if lock is not None else contextlib.nullcontext()
+
+
+async def defer(interaction: discord.Interaction, *, ephemeral: bool = False) -> None:
+    """Acknowledge the interaction, unless it already has been."""
+    async with _acknowledging():
+        if not interaction.response.is_done():
+            await interaction.response.defer(ephemeral=ephemeral)
+
+
+async def reply(interaction: discord.Interaction, content: Optional[str] = None, **kwargs):
+    """Send a message as the response, or as a followup once the interaction was acknowledged.
+
+    Takes the arguments of ``InteractionResponse.send_message``.
+    """
+    async with _acknowledging():
+        if not interaction.response.is_done():
+            await interaction.response.send_message(content, **kwargs)
+            return
+
+    await interaction.followup.send(content, **kwargs)
+
+
+async def reply_privately(
+    interaction: discord.Interaction, content: Optional[str] = None, **kwargs
+):
+    """Send an ephemeral message, even once the interaction was deferred publicly.
+
+    The first followup to a deferral replaces its "thinking" message and keeps that
+    message's visibility, so the deferral is deleted and the message is sent as a
+    followup of its own. Only for handlers that haven't sent anything else yet.
+    """
+    async with _acknowledging():
+        if not interaction.response.is_done():
+            await interaction.response.send_message(content, ephemeral=True, **kwargs)
+            return
+
+    await interaction.delete_original_response()
+    await interaction.followup.send(content, ephemeral=True, **kwargs)
+
+
+async def edit_message(interaction: discord.Interaction, **kwargs) -> None:
+    """Edit the message a component belongs to, whether or not it was acknowledged."""
+    async with _acknowledging():
+        if not interaction.response.is_done():
+            await interaction.response.edit_message(**kwargs)
+            return
+
+    await interaction.edit_original_response(**kwargs)
+
+
+def _stack(task: asyncio.Task) -> str:
+    """Format the chain of awaits a task is suspended in, outermost first.
+
+    ``Task.get_stack`` only returns the outermost frame of a suspended coroutine,
+    which for a handler is always the wrapper.
+    """
+    frames = []
+    awaiting = task.get_coro()
+    while awaiting is not None:
+        frame = getattr(awaiting, "cr_frame", None) or getattr(awaiting, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append((frame, frame.f_lineno))
+        awaiting = getattr(awaiting, "cr_await", None) or getattr(
+            awaiting, "gi_yieldfrom", None
+        )
+    return "".join(traceback.StackSummary.extract(frames).format())
+
+
+async def _watch(
+    interaction: discord.Interaction,
+    handler: asyncio.Task,
+    name: str,
+    ephemeral: bool,
+    budget: float,
+    slo: float,
+) -> None:
+    await asyncio.sleep(budget)
+    try:
+        async with _acknowledging():
+            if not interaction.response.is_done():
+                await interaction.response.defer(ephemeral=ephemeral)
+                logging.info(f"{name} didn't respond within {budget}s, deferred it")
+    except (discord.errors.HTTPException, discord.errors.InteractionResponded) as e:
+        logging.error(f"Failed to defer {name}. Reason: {e}")
+
+    await asyncio.sleep(max(slo - budget, 0))
+    slo_breaches[name] += 1
+    logging.warning(
+        f"{name} has been running for over {slo}s ({slo_breaches[name]} times so far), waiting at:\n{_stack(handler).rstrip()}"
+    )
+
+
+def responsive(ephemeral: bool = False, slo: Optional[float] = None):
+    """Guard a command or component callback taking ``(self, interaction, ...)``.
+
+    If the handler hasn't responded within ``ACK_BUDGET`` seconds it is deferred for
+    it, ``ephemeral`` should match what the handler itself would send first.
+    Handlers respond through ``defer``, ``reply`` and ``edit_message``, which pick
+    the response or the followup depending on what has already been sent. Handlers
+    running past ``slo`` seconds (``HANDLER_SLO`` by default) are counted in
+    ``slo_breaches`` and logged with a snapshot of their stack.
+    """
+
+    def decorator(func):
+        name = func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(self, interaction: discord.Interaction, *args, **kwargs):
+            limit = HANDLER_SLO if slo is None else slo
+            token = _ack_lock.set(asyncio.Lock())
+            started = time.perf_counter()
+            watchdog = asyncio.create_task(
+                _watch(
+                    interaction,
+                    asyncio.current_task(),
+                    name,
+                    ephemeral,
+                    ACK_BUDGET,
+                    limit,
+                )
+            )
+            try:
+                return await func(self, interaction, *args, **kwargs)
+            finally:
+                watchdog.cancel()
+                _ack_lock.reset(token)
+                elapsed = time.perf_counter() - started
+                if elapsed > limit:
+                    logging.warning(f"{name} finished after {elapsed:.1f}s")
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import time
+from typing import Optional
+from discord.ext import tasks
+from ser_gawain.db import Database
+
+
+# Lease shared by every background job that must run in one process only
+JOBS_LEASE = "jobs"
+
+# How long a lease holds without being renewed, a standby process takes over at
+# most this long after the leader stops
+LEASE_TTL = 30.0
+
+# Renewing well within the TTL leaves room for a slow database
+LEASE_RENEW_INTERVAL = 10.0
+
+
+class LeaderElection:
+    """Elects one of the processes sharing the database to run background jobs.
+
+    Every process races for the same lease row, the winner keeps renewing it and the
+    others retry on the same schedule until it expires. Leadership is judged against
+    the monotonic clock from before each renewal was sent, so a process stops
+    considering itself leader no later than the lease it wrote runs out, even if
+    the database stops answering.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        name: str = JOBS_LEASE,
+        holder: Optional[str] = None,
+        ttl: float = LEASE_TTL,
+    ):
+        self.db = db
+        self.name = name
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}"
+        self.ttl = ttl
+        self._leader_until = 0.0
+
+    @property
+    def is_leader(self) -> bool:
+        return time.monotonic() < self._leader_until
+
+    async def renew(self) -> bool:
+        """Take or renew the lease, returns whether this process is now the leader."""
+        was_leader = self.is_leader
+        started = time.monotonic()
+        try:
+            acquired = await self.db.leases.acquire(self.name, self.holder, self.ttl)
+        except sqlite3.Error as e:
+            # Keep whatever is left of the current lease, it may be renewed next time
+            logging.error(f"Failed to renew the {self.name} lease: {e}")
+            return self.is_leader
+
+        self._leader_until = started + self.ttl if acquired else 0.0
+        if acquired and not was_leader:
+            logging.info(f"{self.holder} took the {self.name} lease")
+        elif was_leader and not acquired:
+            logging.warning(f"{self.holder} lost the {self.name} lease")
+        return acquired
+
+    async def start(self) -> None:
+        """Settle leadership once, then keep renewing in the background."""
+        await self.renew()
+        self.renew_task.start()
+
+    async def close(self) -> None:
+        """Stop renewing and hand the lease over right away instead of letting it expire."""
+        self.renew_task.cancel()
+        if not self.is_leader:
+            return
+
+        self._leader_until = 0.0
+        try:
+            await self.db.leases.release(self.name, self.holder)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to release the {self.name} lease: {e}")
+
+    @tasks.loop(seconds=LEASE_RENEW_INTERVAL)
+    async def renew_task(self):
+        await self.renew()
+
+    @renew_task.before_loop
+    async def before_renew(self):
+        # start() has just renewed
+        await asyncio.sleep(LEASE_RENEW_INTERVAL)
@@ -0,0 +1,103 @@
+import asyncio
+import discord
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional
+
+
+# Users kept by UserCache beyond what discord.py caches itself
+USER_CACHE_SIZE = 256
+
+
+class Profile(Enum):
+    # Every intent the bot has historically asked for, with discord.py's caches
+    STANDARD = "standard"
+    # Only what the cogs use: interactions carry the invoking user, roles and emojis
+    # come with the guild, and nobody's messages are read
+    LOW_MEMORY = "low_memory"
+
+
+@dataclass(slots=True)
+class ClientOptions:
+    intents: discord.Intents
+    max_messages: Optional[int]
+    member_cache_flags: discord.MemberCacheFlags
+    chunk_guilds_at_startup: bool
+
+    def kwargs(self) -> dict:
+        """Keyword arguments for ``discord.Client``."""
+        return {
+            "intents": self.intents,
+            "max_messages": self.max_messages,
+            "member_cache_flags": self.member_cache_flags,
+            "chunk_guilds_at_startup": self.chunk_guilds_at_startup,
+        }
+
+
+def client_options(profile: Profile) -> ClientOptions:
+    if profile is Profile.LOW_MEMORY:
+        intents = discord.Intents.none()
+        # Roles for skill pings, emojis for skill labels
+        intents.guilds = True
+        intents.emojis_and_stickers = True
+        return ClientOptions(
+            intents=intents,
+            # Views keep a reference to their own message, nothing reads the cache
+            max_messages=None,
+            member_cache_flags=discord.MemberCacheFlags.none(),
+            chunk_guilds_at_startup=False,
+        )
+
+    intents = discord.Intents.default()
+    intents.reactions = True
+    intents.message_content = True
+    intents.members = True
+    return ClientOptions(
+        intents=intents,
+        max_messages=1000,
+        member_cache_flags=discord.MemberCacheFlags.from_intents(intents),
+        chunk_guilds_at_startup=True,
+    )
+
+
+class UserCache:
+    """Resolves user IDs to users, fetching the ones discord.py doesn't have cached.
+
+    Without the members intent discord.py only keeps users something else holds on
+    to, so users needed for DMs are fetched on first use and the most recently used
+    ``max_size`` are kept. Concurrent lookups of the same user share one fetch.
+    """
+
+    def __init__(self, client: discord.Client, max_size: int = USER_CACHE_SIZE):
+        self.client = client
+        self.max_size = max_size
+        self._users: OrderedDict[int, discord.User] = OrderedDict()
+        self._fetching: dict[int, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    async def get(self, user_id: int | str) -> discord.User:
+        """Return the user, raises ``discord.NotFound`` if they don't exist."""
+        user_id = int(user_id)
+
+        user = self._users.get(user_id)
+        if user is not None:
+            self._users.move_to_end(user_id)
+            return user
+
+        user = self.client.get_user(user_id)
+        if user is None:
+            task = self._fetching.get(user_id)
+            if task is None:
+                task = asyncio.create_task(self.client.fetch_user(user_id))
+                self._fetching[user_id] = task
+                task.add_done_callback(lambda _: self._fetching.pop(user_id, None))
+            user = await asyncio.shield(task)
+
+        self._users[user_id] = user
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+        return user
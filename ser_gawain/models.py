@@ -0,0 +1,137 @@
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Optional
+
+
+class TradeSkill(Enum):
+    ARCANA = "Arcana"
+    ARMORING = "Armoring"
+    COOKING = "Cooking"
+    ENGINEERING = "Engineering"
+    FURNISHING = "Furnishing"
+    JEWELCRAFTING = "Jewelcrafting"
+    WEAPONSMITHING = "Weaponsmithing"
+
+
+class Status(Enum):
+    PENDING = "Pending"
+    ACCEPTED = "Accepted"
+    COMPLETED = "Completed"
+    CANCELLED = "Cancelled"
+
+
+# Requests hold their status and skill as small integer codes (the enum declaration
+# order) instead of a fresh string per row. These tables are built once so mapping a
+# row, comparing a status or rendering a label is a single tuple or dict lookup.
+STATUSES = tuple(Status)
+STATUS_LABELS = tuple(status.value for status in Status)
+STATUS_CODES = {status.name: code for code, status in enumerate(Status)}
+
+TRADE_SKILLS = tuple(TradeSkill)
+TRADE_SKILL_LABELS = tuple(skill.value for skill in TradeSkill)
+TRADE_SKILL_CODES = {skill.value: code for code, skill in enumerate(TradeSkill)}
+
+
+@dataclass(slots=True)
+class CraftingRequest:
+    request_id: int
+    requestor_id: str
+    user_name: str
+    item_name: str
+    has_materials: bool
+    amount: int
+    skill_code: Optional[int]
+    level_required: Optional[int]
+    status_code: int
+    accepted_by: Optional[str]
+    created_at: str
+    completed_on: Optional[str]
+
+    @classmethod
+    def from_row(cls, cursor: sqlite3.Cursor, row: tuple) -> "CraftingRequest":
+        """sqlite3 row factory, maps the raw result tuple without building a ``sqlite3.Row``."""
+        (
+            request_id,
+            requestor_id,
+            user_name,
+            item_name,
+            has_materials,
+            amount,
+            trade_skill,
+            level_required,
+            status,
+            accepted_by,
+            created_at,
+            completed_on,
+        ) = row
+        return cls(
+            request_id,
+            requestor_id,
+            user_name,
+            item_name,
+            bool(has_materials),
+            amount,
+            TRADE_SKILL_CODES.get(trade_skill),
+            level_required,
+            STATUS_CODES[status],
+            accepted_by,
+            created_at,
+            completed_on,
+        )
+
+    @property
+    def status(self) -> Status:
+        return STATUSES[self.status_code]
+
+    @property
+    def created_timestamp(self) -> float:
+        # CURRENT_TIMESTAMP is stored as UTC without an offset
+        return (
+            datetime.fromisoformat(self.created_at)
+            .replace(tzinfo=timezone.utc)
+            .timestamp()
+        )
+
+    @property
+    def status_label(self) -> str:
+        return STATUS_LABELS[self.status_code]
+
+    @property
+    def trade_skill(self) -> Optional[TradeSkill]:
+        return TRADE_SKILLS[self.skill_code] if self.skill_code is not None else None
+
+    @property
+    def trade_skill_label(self) -> str:
+        return (
+            TRADE_SKILL_LABELS[self.skill_code] if self.skill_code is not None else "None"
+        )
+
+
+@dataclass(slots=True)
+class Crafter:
+    user_id: str
+    user_name: Optional[str]
+    skills: str
+
+    @classmethod
+    def from_row(cls, cursor: sqlite3.Cursor, row: tuple) -> "Crafter":
+        return cls(*row)
+
+    @property
+    def display_name(self) -> str:
+        # Skills imported from a roster may come without a name
+        return self.user_name.capitalize() if self.user_name else self.user_id
+
+
+@dataclass(slots=True)
+class CrafterSkill:
+    user_id: str
+    user_name: Optional[str]
+    skill_name: str
+    skill_level: int
+
+    @classmethod
+    def from_row(cls, cursor: sqlite3.Cursor, row: tuple) -> "CrafterSkill":
+        return cls(*row)
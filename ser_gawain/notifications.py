@@ -0,0 +1,230 @@
+import asyncio
+import discord
+import logging
+import time
+from enum import Enum
+from typing import Iterable, Optional
+from discord.ext import tasks
+from ser_gawain.db import Database
+from ser_gawain.memory import UserCache
+
+
+# Digests collect notifications for this long before they are sent as one DM
+DIGEST_INTERVAL = 60  # minutes
+
+# DMs in flight at once
+NOTIFY_WORKERS = 4
+
+# DMs sent per second across all workers, well under Discord's global limit so
+# interactions are never starved of requests
+DM_RATE = 5.0
+
+# Lines kept per user between sends, older lines are summarized past this
+NOTIFY_MAX_LINES = 20
+
+# Discord's message length limit
+DM_MAX_LENGTH = 2000
+
+# How long closing waits for queued DMs to go out
+NOTIFY_DRAIN_TIMEOUT = 10.0  # seconds
+
+
+class NotifyMode(Enum):
+    INSTANT = "Instant"
+    DIGEST = "Hourly digest"
+    OFF = "Off"
+
+
+# Users who never chose get nothing, the channel messages still reach them
+DEFAULT_MODE = NotifyMode.OFF
+
+
+def format_dm(lines: list[str], dropped: int = 0, digest: bool = False) -> str:
+    """Merge a user's pending notifications into one message within Discord's limit."""
+    header = "**Crafting digest**\n" if digest else ""
+    # Leave room for the longest footer this message can end up with
+    footer = f"\n...and {dropped + len(lines)} more"
+    budget = DM_MAX_LENGTH - len(header) - len(footer)
+    body = []
+    for line in lines:
+        budget -= len(line) + 1
+        if budget < 0:
+            break
+        body.append(line)
+
+    dropped += len(lines) - len(body)
+    footer = f"\n...and {dropped} more" if dropped else ""
+    return header + "\n".join(body) + footer
+
+
+class Notifier:
+    """Delivers crafting request notifications by DM according to each user's preference.
+
+    Events are queued without waiting on Discord. Instant notifications for a user
+    that pile up while a DM is on its way are merged into their next DM, digest
+    notifications are held and merged into one DM per user every
+    ``DIGEST_INTERVAL``. A fixed pool of workers sends the DMs at no more than
+    ``DM_RATE`` per second, so a burst of events costs one DM per user rather than
+    one per event.
+    """
+
+    def __init__(
+        self,
+        client: discord.Client,
+        workers: int = NOTIFY_WORKERS,
+        rate: float = DM_RATE,
+        users: Optional[UserCache] = None,
+    ):
+        self.client = client
+        self.users = users or UserCache(client)
+        self.workers = workers
+        self.rate = rate
+        self._modes: dict[str, NotifyMode] = {}
+        # Lines waiting per user and how many were dropped to stay within the cap
+        self._instant: dict[str, tuple[list[str], int]] = {}
+        self._digests: dict[str, tuple[list[str], int]] = {}
+        self._ready: dict[str, tuple[list[str], int, bool]] = {}
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        self._next_send = 0.0
+
+    async def load(self, db: Database) -> None:
+        """Read every user's preference, when the cog loads and on every refresh."""
+        self._modes = {
+            user_id: NotifyMode[mode]
+            for user_id, mode in await db.notifications.all()
+            if mode in NotifyMode.__members__
+        }
+
+    def mode(self, user_id: int | str) -> NotifyMode:
+        return self._modes.get(str(user_id), DEFAULT_MODE)
+
+    def set_mode(self, user_id: int | str, mode: NotifyMode) -> None:
+        user_id = str(user_id)
+        self._modes[user_id] = mode
+        # Held lines follow the user's new choice
+        lines = self._digests.pop(user_id, None)
+        if lines is not None and mode is NotifyMode.INSTANT:
+            self._hold(self._instant, user_id, lines)
+            self._schedule(user_id)
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self.digest_task.start()
+
+    async def close(self) -> None:
+        """Send what is still held, waiting up to ``NOTIFY_DRAIN_TIMEOUT`` seconds."""
+        self.digest_task.cancel()
+        self.flush_digests()
+        if self._tasks:
+            try:
+                await asyncio.wait_for(self._queue.join(), NOTIFY_DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                logging.warning(
+                    f"Dropped notifications for {self._queue.qsize()} user(s) on shutdown"
+                )
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def notify(
+        self,
+        user_ids: Iterable[Optional[int | str]],
+        text: str,
+        exclude: Optional[int | str] = None,
+    ) -> None:
+        """Queue ``text`` for each of ``user_ids`` that wants notifications.
+
+        ``exclude`` is the user who caused the event, they already know about it.
+        """
+        exclude = str(exclude) if exclude is not None else None
+        for user_id in {str(user_id) for user_id in user_ids if user_id is not None}:
+            if user_id == exclude:
+                continue
+
+            mode = self.mode(user_id)
+            if mode is NotifyMode.INSTANT:
+                self._hold(self._instant, user_id, ([text], 0))
+                self._schedule(user_id)
+            elif mode is NotifyMode.DIGEST:
+                self._hold(self._digests, user_id, ([text], 0))
+
+    def pending(self, user_id: int | str) -> int:
+        """Notifications held for the user, whether instant or waiting for a digest."""
+        user_id = str(user_id)
+        return sum(
+            len(held[user_id][0]) + held[user_id][1]
+            for held in (self._instant, self._digests, self._ready)
+            if user_id in held
+        )
+
+    def _hold(
+        self,
+        held: dict[str, tuple[list[str], int]],
+        user_id: str,
+        new: tuple[list[str], int],
+    ) -> None:
+        lines, dropped = held.get(user_id, ([], 0))
+        lines = lines + new[0]
+        dropped += new[1]
+        if len(lines) > NOTIFY_MAX_LINES:
+            dropped += len(lines) - NOTIFY_MAX_LINES
+            lines = lines[-NOTIFY_MAX_LINES:]
+        held[user_id] = (lines, dropped)
+
+    def _schedule(self, user_id: str) -> None:
+        # Users already queued pick up the new lines when their turn comes
+        if user_id not in self._ready:
+            self._ready[user_id] = ([], 0, False)
+            self._queue.put_nowait(user_id)
+
+    def flush_digests(self) -> None:
+        """Queue every held digest for sending now."""
+        digests, self._digests = self._digests, {}
+        for user_id, (lines, dropped) in digests.items():
+            self._schedule(user_id)
+            ready, ready_dropped, _ = self._ready[user_id]
+            self._ready[user_id] = (ready + lines, ready_dropped + dropped, True)
+
+    async def _throttle(self) -> None:
+        # Each send reserves the next free slot, so workers never burst past the rate
+        now = time.monotonic()
+        slot = max(now, self._next_send)
+        self._next_send = slot + 1 / self.rate
+        await asyncio.sleep(slot - now)
+
+    async def _work(self) -> None:
+        while True:
+            user_id = await self._queue.get()
+            try:
+                await self._throttle()
+                lines, dropped, digest = self._ready.pop(user_id)
+                instant, instant_dropped = self._instant.pop(user_id, ([], 0))
+                await self._send(
+                    user_id,
+                    format_dm(lines + instant, dropped + instant_dropped, digest),
+                )
+            except Exception as e:
+                logging.error(f"Failed to notify {user_id}. Reason: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _send(self, user_id: str, content: str) -> None:
+        try:
+            user = await self.users.get(user_id)
+            await user.send(content)
+        except discord.errors.Forbidden:
+            # DMs closed, their preference stays so it works once they open them
+            logging.warning(f"Could not notify {user_id}, their DMs are closed")
+        except discord.errors.HTTPException as e:
+            logging.error(f"Failed to notify {user_id}. Reason: {e}")
+
+    @tasks.loop(minutes=DIGEST_INTERVAL)
+    async def digest_task(self):
+        self.flush_digests()
+
+    @digest_task.before_loop
+    async def before_digest(self):
+        # The first digest goes out a full interval after startup
+        await asyncio.sleep(DIGEST_INTERVAL * 60)
+
@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import struct
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+from tabulate import tabulate
+from ser_gawain.analytics import INSIGHT_ROWS, Insight, compute_insight
+
+
+# Worker processes rendering reports, kept small so the bot never competes with
+# itself for every core on the host
+REPORT_WORKERS = 2
+
+# Reports queued or rendering at once, past this new reports are turned away
+REPORT_MAX_PENDING = 8
+
+# Rendered reports kept for repeat requests against the same data
+REPORT_CACHE_SIZE = 32
+
+# Completions chart geometry, in pixels
+CHART_WIDTH = 720
+CHART_HEIGHT = 240
+CHART_MARGIN = 12
+CHART_BACKGROUND = b"\x2b\x2d\x31"
+CHART_AXIS = b"\x80\x84\x8e"
+CHART_BAR = b"\x58\x65\xf2"
+
+
+class ReportQueueFull(Exception):
+    """Raised when ``REPORT_MAX_PENDING`` reports are already queued or rendering."""
+
+
+@dataclass(slots=True)
+class Report:
+    table: str
+    rows: int
+    created_at: float
+    chart: Optional[bytes] = None
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + kind
+        + data
+        + struct.pack(">I", zlib.crc32(kind + data))
+    )
+
+
+def render_bar_chart(
+    values: list[int], width: int = CHART_WIDTH, height: int = CHART_HEIGHT
+) -> bytes:
+    """Render ``values`` as a bar chart, oldest on the left, and return a PNG.
+
+    Plain RGB scanlines compressed with zlib, so charts need no imaging library.
+    """
+    plot_width = width - 2 * CHART_MARGIN
+    plot_height = height - 2 * CHART_MARGIN
+    bar_width = max(plot_width // max(len(values), 1), 1)
+    top = max(values, default=0) or 1
+    bars = [round(value / top * plot_height) for value in values[: plot_width]]
+
+    scanlines = bytearray()
+    for y in range(height):
+        # Pixels above the axis, the axis itself sits at 0
+        level = height - CHART_MARGIN - y
+        row = bytearray(CHART_BACKGROUND * width)
+        if level == 0:
+            row[CHART_MARGIN * 3 : (width - CHART_MARGIN) * 3] = CHART_AXIS * plot_width
+        elif level > 0:
+            for index, bar in enumerate(bars):
+                if bar >= level:
+                    # Leave a pixel between bars when there is room for one
+                    start = CHART_MARGIN + index * bar_width
+                    end = start + max(bar_width - 1, 1)
+                    row[start * 3 : end * 3] = CHART_BAR * (end - start)
+        scanlines += b"\x00" + row
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", header)
+        + _png_chunk(b"IDAT", zlib.compress(bytes(scanlines), 6))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+def render_insight(path: str, insight: Insight, days: int, now: float) -> Report:
+    """Aggregate and format an insight, runs in a worker process."""
+    headers, rows, created_at = compute_insight(path, insight, days, now, limit=None)
+
+    chart = None
+    if insight is Insight.COMPLETIONS and rows:
+        chart = render_bar_chart([count for _, count in reversed(rows)])
+
+    return Report(
+        table=tabulate(rows[:INSIGHT_ROWS], headers=headers),
+        rows=len(rows),
+        created_at=created_at,
+        chart=chart,
+    )
+
+
+def snapshot_version(path: str) -> int:
+    """Data version of the snapshot at ``path``, it changes every time it's rebuilt.
+
+    Raises ``FileNotFoundError`` if no snapshot has been written yet.
+    """
+    return os.stat(path).st_mtime_ns
+
+
+class ReportRenderer:
+    """Renders reports in a process pool so formatting never blocks the event loop.
+
+    Each report has a key (what is rendered) and a data version that grows whenever
+    the data it is rendered from changes. Finished reports are cached per key until
+    a newer version is asked for, identical requests share one job, and asking for a newer version of a report cancels the
+    job for the older one (it's dropped from the queue if it hasn't started yet);
+    whoever was waiting on it gets the newer report instead.
+    """
+
+    def __init__(
+        self,
+        workers: int = REPORT_WORKERS,
+        max_pending: int = REPORT_MAX_PENDING,
+        cache_size: int = REPORT_CACHE_SIZE,
+    ):
+        self.max_pending = max_pending
+        self.cache_size = cache_size
+        self._cache: OrderedDict[Hashable, tuple[int, Any]] = OrderedDict()
+        self._jobs: dict[Hashable, tuple[int, asyncio.Future]] = {}
+        # Spawned workers don't inherit the bot's threads, sockets or event loop
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def _cached(self, key: Hashable, version: int) -> tuple[bool, Any]:
+        entry = self._cache.get(key)
+        if entry is None or entry[0] < version:
+            return False, None
+
+        self._cache.move_to_end(key)
+        return True, entry[1]
+
+    def _submit(
+        self, key: Hashable, version: int, func: Callable, args: tuple
+    ) -> asyncio.Future:
+        job = self._jobs.get(key)
+        if job is not None:
+            # A job rendering the same or newer data is as good as a new one
+            if job[0] >= version:
+                return job[1]
+
+            # Superseded, its waiters move to the new job
+            if job[1].cancel():
+                logging.info(f"Cancelled stale report {key!r} for version {job[0]!r}")
+        elif len(self._jobs) >= self.max_pending:
+            raise ReportQueueFull(f"{len(self._jobs)} reports are already pending")
+
+        future = asyncio.wrap_future(self._executor.submit(func, *args))
+        self._jobs[key] = (version, future)
+
+        def done(future: asyncio.Future) -> None:
+            if self._jobs.get(key, (None, None))[1] is future:
+                del self._jobs[key]
+            if future.cancelled() or future.exception() is not None:
+                return
+
+            self._cache[key] = (version, future.result())
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        future.add_done_callback(done)
+        return future
+
+    async def render(self, key: Hashable, version: int, func: Callable, *args) -> Any:
+        """Return ``func(*args)`` rendered in a worker process, cached per version.
+
+        ``func`` and its arguments must be picklable. Raises ``ReportQueueFull`` when
+        too many reports are pending, and whatever ``func`` raises.
+        """
+        hit, result = self._cached(key, version)
+        if hit:
+            return result
+
+        future = self._submit(key, version, func, args)
+        while True:
+            # Waiting without awaiting the job directly, so a stale job being
+            # cancelled doesn't cancel the caller
+            await asyncio.wait([future])
+            if not future.cancelled():
+                return future.result()
+
+            newer = self._jobs.get(key)
+            if newer is None:
+                raise asyncio.CancelledError()
+            future = newer[1]
+
+    async def render_insight(self, path: str, insight: Insight, days: int) -> Report:
+        """Render an insight from the analytics snapshot at ``path``.
+
+        The snapshot's own timestamp is used as "now", so a cached report stays
+        correct for as long as the snapshot it was rendered from.
+        """
+        version = snapshot_version(path)
+        return await self.render(
+            ("insight", path, insight, days),
+            version,
+            render_insight,
+            path,
+            insight,
+            days,
+            version / 1e9,
+        )
+
+    def close(self) -> None:
+        """Drop queued jobs and let the workers exit once they finish their current one."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._cache.clear()
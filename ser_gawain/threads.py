@@ -0,0 +1,226 @@
+import asyncio
+import discord
+import logging
+import sqlite3
+from typing import Iterable, Optional
+from ser_gawain.db import Database
+
+
+# Completed and cancelled requests are collected for this long before their threads
+# are archived, so a burst of completions shares one lookup and one update
+ARCHIVE_BATCH_DELAY = 5.0
+
+# Upper bound on thread API calls in flight while archiving a batch
+ARCHIVE_CONCURRENCY = 5
+
+# Batches a thread that failed to archive is retried with before it's given up on
+ARCHIVE_MAX_ATTEMPTS = 5
+
+
+class ThreadManager:
+    """Owns the discussion thread of each crafting request.
+
+    The ``request_id -> thread_id`` mapping is kept in the database so a request keeps
+    one thread across button clicks and restarts. Opening a request's thread again
+    only adds the new members, and completing or cancelling the request queues its
+    thread to be archived and locked with the next batch, so each request costs at
+    most one thread create and one archive.
+    """
+
+    def __init__(self, client: discord.Client, db: Database):
+        self.client = client
+        self.db = db
+        self._opening: dict[int, asyncio.Task] = {}
+        # Request ID to its thread ID, when that is known without the mapping
+        self._pending_archive: dict[int, Optional[int]] = {}
+        self._archive_attempts: dict[int, int] = {}
+        self._archive_task: Optional[asyncio.Task] = None
+
+    async def _resolve(self, thread_id: int) -> Optional[discord.Thread]:
+        # Archived threads drop out of the cache, only those need a fetch
+        thread = self.client.get_channel(thread_id)
+        if thread is not None:
+            return thread
+
+        try:
+            return await self.client.fetch_channel(thread_id)
+        except (discord.NotFound, discord.Forbidden):
+            return None
+
+    async def _get_or_create(
+        self, message: discord.Message, request_id: int, name: str
+    ) -> tuple[discord.Thread, bool]:
+        thread_id = await self.db.threads.get(request_id)
+        if thread_id is not None:
+            thread = await self._resolve(thread_id)
+            if thread is not None:
+                return thread, False
+
+        # Threads opened before the mapping existed are still attached to the message
+        thread = message.thread
+        created = thread is None
+        if created:
+            thread = await message.create_thread(
+                name=name,
+                reason=f"Create thread for crafting request {request_id}",
+            )
+
+        await self.db.threads.set(request_id, thread.id)
+        return thread, created
+
+    async def open(
+        self,
+        message: discord.Message,
+        request_id: int | str,
+        name: str,
+        members: Iterable[Optional[discord.abc.Snowflake]],
+    ) -> tuple[discord.Thread, bool]:
+        """Return the request's thread with ``members`` added, creating it on first use.
+
+        The second value is True only for the call that created the thread.
+        Concurrent calls for the same request share a single lookup/create.
+        """
+        request_id = int(request_id)
+
+        task = self._opening.get(request_id)
+        created_here = task is None
+        if created_here:
+            task = asyncio.create_task(self._get_or_create(message, request_id, name))
+            self._opening[request_id] = task
+            task.add_done_callback(lambda _: self._opening.pop(request_id, None))
+
+        thread, created = await asyncio.shield(task)
+
+        members = [member for member in members if member is not None]
+        results = await asyncio.gather(
+            *(thread.add_user(member) for member in members), return_exceptions=True
+        )
+        for member, result in zip(members, results):
+            if isinstance(result, Exception):
+                logging.error(
+                    f"Failed to add {member.id} to the thread for request {request_id}. Reason: {result}"
+                )
+
+        return thread, created and created_here
+
+    def _queue(self, request_id: int, thread_id: Optional[int]) -> None:
+        if self._pending_archive.get(request_id) is None:
+            self._pending_archive[request_id] = thread_id
+
+    def schedule_archive(
+        self, request_id: int | str, thread_id: Optional[int] = None
+    ) -> None:
+        """Queue a completed or cancelled request's thread for the next archive batch.
+
+        The thread is looked up in the mapping unless ``thread_id`` is given, which
+        deleted requests have to do as their mapping is deleted with them.
+        """
+        self._queue(int(request_id), thread_id)
+        if self._archive_task is None or self._archive_task.done():
+            self._archive_task = asyncio.create_task(self._archive_later())
+
+    async def _archive_later(self) -> None:
+        # Requests queued or re-queued while a batch was being archived go in the next
+        while True:
+            await asyncio.sleep(ARCHIVE_BATCH_DELAY)
+            await self.flush()
+            if not self._pending_archive:
+                return
+
+    async def _archive(
+        self, semaphore: asyncio.Semaphore, request_id: int, thread_id: int
+    ) -> Optional[int]:
+        async with semaphore:
+            try:
+                thread = await self._resolve(thread_id)
+                # A deleted thread has nothing left to archive
+                if thread is None:
+                    return request_id
+
+                await thread.edit(
+                    archived=True,
+                    locked=True,
+                    reason=f"Crafting request {request_id} closed",
+                )
+            except discord.errors.HTTPException as e:
+                logging.error(
+                    f"Failed to archive thread for request {request_id}. Reason: {e}"
+                )
+                return None
+
+            return request_id
+
+    def _retry(self, pending: dict[int, Optional[int]]) -> None:
+        """Queue requests whose threads failed to archive for the next batch."""
+        for request_id, thread_id in pending.items():
+            attempts = self._archive_attempts.get(request_id, 0) + 1
+            if attempts < ARCHIVE_MAX_ATTEMPTS:
+                self._archive_attempts[request_id] = attempts
+                self._queue(request_id, thread_id)
+            else:
+                self._archive_attempts.pop(request_id, None)
+                logging.error(
+                    f"Giving up on archiving the thread for request {request_id} after {attempts} attempts"
+                )
+
+    async def flush(self) -> None:
+        """Archive and lock the threads of every queued request now.
+
+        Requests whose thread couldn't be looked up or archived are queued again for
+        the next batch, up to ``ARCHIVE_MAX_ATTEMPTS`` times.
+        """
+        pending, self._pending_archive = self._pending_archive, {}
+        if not pending:
+            return
+
+        threads = {
+            request_id: thread_id
+            for request_id, thread_id in pending.items()
+            if thread_id is not None
+        }
+        lookup = [request_id for request_id in pending if request_id not in threads]
+        if lookup:
+            try:
+                threads.update(await self.db.threads.open(lookup))
+            except sqlite3.DatabaseError as e:
+                logging.error(f"Failed to look up threads to archive: {e}")
+                self._retry(pending)
+                return
+
+        semaphore = asyncio.Semaphore(ARCHIVE_CONCURRENCY)
+        archived = await asyncio.gather(
+            *(
+                self._archive(semaphore, request_id, thread_id)
+                for request_id, thread_id in threads.items()
+            )
+        )
+        archived = [request_id for request_id in archived if request_id is not None]
+        self._retry(
+            {
+                request_id: pending[request_id]
+                for request_id in threads.keys() - set(archived)
+            }
+        )
+        for request_id in pending.keys() - threads.keys():
+            self._archive_attempts.pop(request_id, None)
+        if not archived:
+            return
+
+        try:
+            await self.db.threads.mark_archived(archived)
+        except sqlite3.DatabaseError as e:
+            # Archiving an archived thread again is harmless, the next batch marks them
+            logging.error(f"Failed to mark threads as archived: {e}")
+            self._retry({request_id: pending[request_id] for request_id in archived})
+            return
+
+        for request_id in archived:
+            self._archive_attempts.pop(request_id, None)
+
+        logging.info(f"Archived {len(archived)} crafting request thread(s)")
+
+    async def close(self) -> None:
+        """Archive anything still queued instead of waiting for the batch delay."""
+        if self._archive_task is not None and not self._archive_task.done():
+            self._archive_task.cancel()
+        await self.flush()
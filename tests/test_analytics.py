@@ -0,0 +1,73 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from ser_gawain.analytics import Insight, Snapshot, build_snapshot, compute_insight
+from ser_gawain.db import SCHEMA
+
+
+class TestAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "gawain.snapshot")
+
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.executescript(SCHEMA)
+        self.conn.executemany(
+            "INSERT INTO users (user_id, user_name) VALUES (?, ?)",
+            [("1", "alice"), ("2", "bob"), ("3", "carol")],
+        )
+        self.conn.executemany(
+            "INSERT INTO crafting_requests (requestor_id, user_name, item_name, has_materials, amount, trade_skill, level_required, status, accepted_by, created_at, completed_on) VALUES (?, ?, ?, 1, ?, ?, 0, ?, ?, ?, ?)",
+            [
+                ("1", "alice", "Iron Sword", 2, "Weaponsmithing", "COMPLETED", "2", "2024-03-01 00:00:00", "2024-03-01 02:00:00.250000"),
+                ("1", "alice", "Iron Sword", 1, "Weaponsmithing", "COMPLETED", "2", "2024-03-02 00:00:00", "2024-03-02 04:00:00"),
+                ("3", "carol", "Gold Ring", 1, "Jewelcrafting", "COMPLETED", "1", "2024-03-03 00:00:00", "2024-03-03 01:00:00"),
+                ("3", "carol", "Iron Sword", 4, "Weaponsmithing", "PENDING", None, "2024-03-04 00:00:00", None),
+                # Outside a 30 day window
+                ("3", "carol", "Old Cloak", 1, None, "COMPLETED", "1", "2023-01-01 00:00:00", "2023-01-02 00:00:00"),
+            ],
+        )
+        self.conn.executemany(
+            "INSERT INTO trade_skills (user_id, skill_name, skill_level) VALUES (?, ?, ?)",
+            [("1", "Jewelcrafting", 100), ("2", "Weaponsmithing", 200), ("3", "Weaponsmithing", 100)],
+        )
+        self.now = 1709510400  # 2024-03-04 00:00:00 UTC
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_snapshot_round_trip(self):
+        self.assertEqual(build_snapshot(self.conn, self.path), 5)
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+        with Snapshot(self.path) as snapshot:
+            self.assertEqual(snapshot.rows("requests"), 5)
+            self.assertEqual(list(snapshot.column("requests", "amount")), [2, 1, 1, 4, 1])
+            self.assertEqual(snapshot.items, ["Iron Sword", "Gold Ring", "Old Cloak"])
+            self.assertEqual(snapshot.rows("skills"), 3)
+
+    def test_insights(self):
+        build_snapshot(self.conn, self.path)
+
+        headers, rows, _ = compute_insight(self.path, Insight.TURNAROUND, 30, self.now)
+        self.assertEqual(headers[0], "Skill")
+        self.assertEqual(rows, [("Weaponsmithing", 2, 3.0, 3.0), ("Jewelcrafting", 1, 1.0, 1.0)])
+
+        _, rows, _ = compute_insight(self.path, Insight.TOP_ITEMS, 30, self.now)
+        self.assertEqual(rows, [("Iron Sword", 3, 7), ("Gold Ring", 1, 1)])
+
+        _, rows, _ = compute_insight(self.path, Insight.CRAFTERS, 30, self.now)
+        self.assertEqual(rows, [("bob", 2), ("alice", 1)])
+
+        _, rows, _ = compute_insight(self.path, Insight.SKILLS, 30, self.now)
+        self.assertIn(("Weaponsmithing", 2, 150, 200, 1), rows)
+
+        _, rows, _ = compute_insight(self.path, Insight.COMPLETIONS, 30, self.now, None)
+        self.assertEqual(rows[:4], [("2024-03-03", 1), ("2024-03-02", 1), ("2024-03-01", 1), ("2024-02-29", 0)])
+        self.assertEqual(len(rows), 30)
+
+    def test_missing_snapshot(self):
+        with self.assertRaises(FileNotFoundError):
+            compute_insight(self.path, Insight.SKILLS, 30)
@@ -0,0 +1,99 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+from ser_gawain.assets import GuildAssets
+from ser_gawain.commands.crafting import Crafting
+from ser_gawain.emojis import TRADE_SKILL_EMOJIS
+from ser_gawain.models import TradeSkill
+
+
+class FakeEmoji(SimpleNamespace):
+    def __str__(self):
+        return f"<:{self.name}:{self.id}>"
+
+
+def make_guild(roles: dict[str, int], emojis: dict[str, int] = {}) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=42,
+        name="Company",
+        roles=[SimpleNamespace(name=name, id=role_id) for name, role_id in roles.items()],
+        emojis=[
+            FakeEmoji(name=name, id=emoji_id, available=True)
+            for name, emoji_id in emojis.items()
+        ],
+    )
+
+
+ALL_ROLES = {skill.value.lower(): 100 + i for i, skill in enumerate(TradeSkill)}
+
+
+class TestGuildAssets(unittest.TestCase):
+    def setUp(self):
+        self.assets = GuildAssets()
+
+    def test_indexes_roles_and_emojis_by_skill(self):
+        self.assets.index(
+            make_guild(
+                {"@everyone": 1, **ALL_ROLES}, {"arcana": 900, "smelting": 901}
+            )
+        )
+
+        self.assertEqual(self.assets.role(42, TradeSkill.ARCANA), 100)
+        self.assertEqual(self.assets.role(42, TradeSkill.WEAPONSMITHING), 106)
+        self.assertEqual(self.assets.emoji(42, TradeSkill.ARCANA), "<:arcana:900>")
+        self.assertEqual(
+            self.assets.label(42, TradeSkill.COOKING),
+            f"{TRADE_SKILL_EMOJIS[TradeSkill.COOKING]} Cooking",
+        )
+        self.assertEqual(self.assets.label(42, None), "None")
+
+    def test_unknown_guild_falls_back(self):
+        self.assertIsNone(self.assets.role(7, TradeSkill.ARCANA))
+        self.assertEqual(
+            self.assets.emoji(None, TradeSkill.ARCANA),
+            TRADE_SKILL_EMOJIS[TradeSkill.ARCANA],
+        )
+
+    def test_missing_roles_are_reported_once(self):
+        guild = make_guild({"arcana": 100, "smelting": 101})
+
+        with self.assertLogs(level="WARNING") as logs:
+            self.assets.index(guild)
+            self.assets.index(guild)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("weaponsmithing", logs.output[0])
+        self.assertNotIn("arcana", logs.output[0])
+
+        self.assets.forget(42)
+        self.assertIsNone(self.assets.role(42, TradeSkill.ARCANA))
+
+    def test_every_skill_has_a_fallback_emoji(self):
+        self.assertEqual(TRADE_SKILL_EMOJIS.keys(), set(TradeSkill))
+
+
+class TestSkillRolePings(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.crafting = Crafting(Mock())
+        self.guild = make_guild(ALL_ROLES)
+        self.channel = Mock(guild=self.guild)
+        self.channel.send = AsyncMock()
+
+    async def test_ping_follows_role_updates(self):
+        await self.crafting.on_guild_available(self.guild)
+        await self.crafting.ping_skill_role(self.channel, TradeSkill.ARCANA)
+        self.channel.send.assert_called_once_with("<@&100>")
+
+        # The role is renamed, the next request doesn't ping it
+        renamed = SimpleNamespace(name="mages", id=100, guild=self.guild)
+        self.guild.roles[0] = renamed
+        with self.assertLogs(level="WARNING"):
+            await self.crafting.on_guild_role_update(
+                SimpleNamespace(name="arcana", id=100, guild=self.guild), renamed
+            )
+        self.channel.send.reset_mock()
+        await self.crafting.ping_skill_role(self.channel, TradeSkill.ARCANA)
+        self.channel.send.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
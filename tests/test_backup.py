@@ -0,0 +1,167 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+from datetime import datetime, timezone
+from io import StringIO
+from unittest.mock import Mock, patch
+from ser_gawain.backup import (
+    BackupManager,
+    backup_database,
+    list_backups,
+    main as backup_main,
+    restore_backup,
+    rotate_backups,
+)
+from ser_gawain.db import Database
+
+
+def retime(path: str, timestamp: str) -> str:
+    """Rename a backup file as if it had been written at ``timestamp``."""
+    directory, name = os.path.split(path)
+    prefix, _, rest = name.partition("-")
+    if prefix == "wal":
+        sequence, _, rest = rest.partition("-")
+        prefix = f"wal-{sequence}"
+    new_path = os.path.join(directory, f"{prefix}-{timestamp}{rest[16:]}")
+    os.rename(path, new_path)
+    return new_path
+
+
+class TestBackup(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "gawain.db")
+        self.backups = os.path.join(self.tmp.name, "backups")
+        self.db = await Database.connect(self.path)
+        await self.db.create_tables()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self.tmp.cleanup()
+
+    async def add_requests(self, count: int) -> None:
+        for i in range(count):
+            await self.db.requests.create(1, "alice", f"Item {i}", True, 1, "Arcana", 0)
+
+    def count(self, path: str) -> int:
+        conn = sqlite3.connect(path)
+        try:
+            self.assertEqual(conn.execute("PRAGMA integrity_check").fetchone()[0], "ok")
+            return conn.execute("SELECT COUNT(*) FROM crafting_requests").fetchone()[0]
+        finally:
+            conn.close()
+
+    async def test_backup_database(self):
+        await self.add_requests(20)
+        target = os.path.join(self.tmp.name, "copy.db")
+
+        with patch("ser_gawain.backup.BACKUP_STEP_PAGES", 1):
+            backup_database(self.path, target)
+
+        self.assertEqual(self.count(target), 20)
+
+    async def test_followers_skip_backups(self):
+        manager = BackupManager(
+            self.db, self.backups, ship_wal=True, leader=Mock(is_leader=False)
+        )
+        await manager.prepare()
+        await self.add_requests(5)
+
+        await manager.backup_task()
+        await manager.ship_task()
+        await manager.close()
+
+        self.assertEqual(list_backups(self.backups), ([], []))
+
+    async def test_restore_replays_shipped_wal(self):
+        manager = BackupManager(self.db, self.backups, ship_wal=True)
+        await manager.prepare()
+        try:
+            await self.add_requests(10)
+            await manager.backup()
+            await self.add_requests(10)
+            await manager.ship()
+            await self.add_requests(5)
+        finally:
+            await manager.close()
+
+        target = os.path.join(self.tmp.name, "restored.db")
+        base, replayed = restore_backup(self.backups, target)
+
+        self.assertIsNotNone(base.generation)
+        self.assertGreater(replayed, 0)
+        self.assertEqual(self.count(target), 25)
+
+    async def test_point_in_time_restore(self):
+        manager = BackupManager(self.db, self.backups, ship_wal=True)
+        await manager.prepare()
+        try:
+            await self.add_requests(10)
+            retime(await manager.backup(), "20240101T000000Z")
+            await self.add_requests(10)
+            retime(await manager.ship(), "20240101T010000Z")
+            await self.add_requests(10)
+            retime(await manager.ship(), "20240101T020000Z")
+        finally:
+            await manager.close()
+
+        target = os.path.join(self.tmp.name, "restored.db")
+        until = datetime(2024, 1, 1, 1, 30, tzinfo=timezone.utc)
+        restore_backup(self.backups, target, until)
+        self.assertEqual(self.count(target), 20)
+
+        with self.assertRaises(ValueError):
+            restore_backup(self.backups, target, datetime(2023, 1, 1, tzinfo=timezone.utc))
+
+    async def test_failed_restore_keeps_the_database(self):
+        manager = BackupManager(self.db, self.backups, ship_wal=True)
+        await manager.prepare()
+        try:
+            await self.add_requests(10)
+            base = await manager.backup()
+        finally:
+            await manager.close()
+        # Without automatic checkpoints these only live in the WAL
+        await self.add_requests(10)
+        self.assertTrue(os.path.exists(self.path + "-wal"))
+
+        empty = os.path.join(self.tmp.name, "empty")
+        os.makedirs(empty)
+        with self.assertRaises(ValueError):
+            restore_backup(empty, self.path)
+        argv = ["backup", "restore", "--backups", empty, "--target", self.path, "--force"]
+        with patch("sys.argv", argv), redirect_stderr(StringIO()), self.assertRaises(
+            SystemExit
+        ):
+            backup_main()
+
+        with open(base, "r+b") as f:
+            f.truncate(os.path.getsize(base) // 2)
+        with self.assertRaises(EOFError):
+            restore_backup(self.backups, self.path)
+
+        self.assertFalse(os.path.exists(self.path + ".restore"))
+        self.assertEqual(self.count(self.path), 20)
+
+    async def test_rotate_backups(self):
+        os.makedirs(self.backups)
+        for i, name in enumerate(
+            [
+                "gawain-20240101T000000Z-00000000-00000000.db.gz",
+                "gawain-20240102T000000Z-00000002-00000002.db.gz",
+                "gawain-20240103T000000Z-00000003-00000003.db.gz",
+                "wal-00000000-20240101T000000Z-0000000000000000-000000000000.gz",
+                "wal-00000001-20240101T000000Z-0000000000000000-000000004152.gz",
+                "wal-00000002-20240102T000000Z-1111111111111111-000000000000.gz",
+                "wal-00000003-20240103T000000Z-2222222222222222-000000000000.gz",
+            ]
+        ):
+            open(os.path.join(self.backups, name), "wb").close()
+
+        self.assertEqual(rotate_backups(self.backups, keep=2), 3)
+
+        bases, segments = list_backups(self.backups)
+        self.assertEqual([base.generation for base in bases], [2, 3])
+        self.assertEqual([segment.sequence for segment in segments], [2, 3])
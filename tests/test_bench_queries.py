@@ -0,0 +1,101 @@
+import copy
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from benchmarks import bench_queries
+from ser_gawain import db
+
+
+def make_report(**fastest) -> dict:
+    return {
+        "version": bench_queries.REPORT_VERSION,
+        "dataset": {"users": 10, "requests": 100, "seed": 0},
+        "queries": {
+            name: {
+                "fastest_us": time_us,
+                "writes": bench_queries.is_write(getattr(db, name)),
+                "plan": ["SEARCH crafting_requests USING INTEGER PRIMARY KEY (rowid=?)"],
+            }
+            for name, time_us in fastest.items()
+        },
+    }
+
+
+class TestCompare(unittest.TestCase):
+    def test_slowdowns_past_threshold_and_noise_floor(self):
+        baseline = make_report(GET_REQUEST=10.0, LIST_REQUESTS=1000.0, LIST_SKILLS=100.0)
+        report = make_report(GET_REQUEST=30.0, LIST_REQUESTS=2000.0, LIST_SKILLS=120.0)
+
+        regressions, _ = bench_queries.compare(report, baseline, 0.5, 25.0, 100.0)
+
+        # GET_REQUEST tripled but by less than the noise floor
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("LIST_REQUESTS: fastest runs"))
+
+    def test_writes_have_their_own_noise_floor(self):
+        baseline = make_report(PRUNE_REQUEST_KEYS=100.0, GET_REQUEST=100.0)
+        report = make_report(PRUNE_REQUEST_KEYS=180.0, GET_REQUEST=180.0)
+
+        regressions, _ = bench_queries.compare(report, baseline, 0.5, 25.0, 100.0)
+
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("GET_REQUEST"))
+
+    def test_new_table_scan_is_a_regression(self):
+        baseline = make_report(GET_REQUEST=10.0)
+        report = copy.deepcopy(baseline)
+        report["queries"]["GET_REQUEST"]["plan"] = ["SCAN crafting_requests"]
+
+        regressions, notes = bench_queries.compare(report, baseline, 0.5, 25.0, 100.0)
+
+        self.assertEqual(regressions, ["GET_REQUEST: now scans crafting_requests"])
+        self.assertEqual(len(notes), 1)
+
+    def test_different_datasets_are_not_compared(self):
+        baseline = make_report(GET_REQUEST=10.0)
+        report = make_report(GET_REQUEST=10.0)
+        report["dataset"]["requests"] = 1000
+
+        with self.assertRaises(SystemExit):
+            bench_queries.compare(report, baseline, 0.5, 25.0, 100.0)
+
+        # Nor are reports from before the timings were judged on the fastest runs
+        report["dataset"] = baseline["dataset"]
+        baseline["version"] = 1
+        with self.assertRaises(SystemExit):
+            bench_queries.compare(report, baseline, 0.5, 25.0, 100.0)
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_report_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "report.json")
+            args = ["--users", "20", "--requests", "200", "--rounds", "1", "--budget", "0"]
+
+            with redirect_stdout(StringIO()):
+                self.assertEqual(bench_queries.main(args + ["--output", path]), 0)
+                with open(path) as f:
+                    report = json.load(f)
+
+                # Against itself the plans match, timings this short are too noisy to gate
+                self.assertEqual(
+                    bench_queries.main(args + ["--baseline", path, "--threshold", "1000"]),
+                    0,
+                )
+
+        # Every statement in ser_gawain.db is benchmarked
+        self.assertEqual(
+            report["queries"].keys(), bench_queries.production_queries().keys()
+        )
+        self.assertEqual(
+            report["queries"]["GET_REQUEST"]["plan"],
+            ["SEARCH crafting_requests USING INTEGER PRIMARY KEY (rowid=?)"],
+        )
+        self.assertEqual(report["queries"]["LIST_REQUESTS"]["rows"], 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, Mock
+from ser_gawain.catalog import Catalog, Item, load_catalog, parse_catalog
+from ser_gawain.commands.crafting import Crafting
+from ser_gawain.models import TradeSkill
+
+
+DATA = {
+    "items": [
+        {
+            "name": "Iron Sword",
+            "skill": "Weaponsmithing",
+            "level": 0,
+            "materials": {"Iron Ingot": 12, "Timber": 3},
+        },
+        {
+            "name": "Steel  Sword",
+            "skill": "Weaponsmithing",
+            "level": 50,
+            "materials": {"Steel Ingot": 12},
+        },
+        {
+            "name": "Iron Arrow",
+            "skill": "Engineering",
+            "level": 0,
+            "yields": 50,
+            "materials": {"Iron Ingot": 1, "Feathers": 1},
+        },
+        {"name": "Swordfish Steak", "skill": "Cooking", "level": 25},
+    ]
+}
+
+
+class TestCatalog(unittest.TestCase):
+    def setUp(self):
+        self.catalog = parse_catalog(json.dumps(DATA).encode())
+
+    def test_get_is_case_and_space_insensitive(self):
+        item = self.catalog.get("  steel SWORD ")
+
+        self.assertEqual(item.name, "Steel Sword")
+        self.assertIs(item.trade_skill, TradeSkill.WEAPONSMITHING)
+        self.assertEqual(item.level_required, 50)
+        self.assertIsNone(self.catalog.get("Steel"))
+
+    def test_search_matches_any_word_names_first(self):
+        names = [item.name for item in self.catalog.search("sword")]
+
+        self.assertEqual(names, ["Swordfish Steak", "Iron Sword", "Steel Sword"])
+        self.assertEqual(
+            [item.name for item in self.catalog.search("iron")],
+            ["Iron Arrow", "Iron Sword"],
+        )
+        self.assertEqual(len(self.catalog.search("", limit=2)), 2)
+        self.assertEqual(self.catalog.search("mithril"), [])
+
+    def test_materials_scale_with_crafts(self):
+        self.assertEqual(
+            self.catalog.get("Iron Sword").materials_for(3),
+            [("Iron Ingot", 36), ("Timber", 9)],
+        )
+        # 120 arrows take three crafts of 50
+        self.assertEqual(
+            self.catalog.get("Iron Arrow").materials_for(120),
+            [("Iron Ingot", 3), ("Feathers", 3)],
+        )
+
+    def test_unknown_skill_is_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_catalog(b'{"items": [{"name": "Lute", "skill": "Bardcraft"}]}')
+
+    def test_bundled_data_loads(self):
+        catalog = load_catalog(cache_path=None)
+
+        self.assertGreater(len(catalog), 0)
+        self.assertTrue(all(item.materials for item in catalog.items))
+
+
+class TestCatalogCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_path = os.path.join(self.tmp.name, "items.json")
+        self.cache_path = os.path.join(self.tmp.name, "gawain.catalog")
+        self.write_data(DATA)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_data(self, data: dict, mtime_ns: int = 1_000_000_000):
+        with open(self.data_path, "w") as f:
+            json.dump(data, f)
+        os.utime(self.data_path, ns=(mtime_ns, mtime_ns))
+
+    def test_cache_is_reused_until_data_changes(self):
+        self.assertEqual(len(load_catalog(self.data_path, self.cache_path)), 4)
+        self.assertTrue(os.path.exists(self.cache_path))
+
+        # An unchanged data file is never parsed again
+        os.utime(self.cache_path)
+        cached_at = os.stat(self.cache_path).st_mtime_ns
+        self.assertEqual(len(load_catalog(self.data_path, self.cache_path)), 4)
+        self.assertEqual(os.stat(self.cache_path).st_mtime_ns, cached_at)
+
+        self.write_data({"items": DATA["items"][:1]}, mtime_ns=2_000_000_000)
+        self.assertEqual(len(load_catalog(self.data_path, self.cache_path)), 1)
+
+    def test_corrupt_cache_is_rebuilt(self):
+        with open(self.cache_path, "wb") as f:
+            f.write(b"not a pickle")
+
+        with self.assertLogs(level="WARNING"):
+            catalog = load_catalog(self.data_path, self.cache_path)
+
+        self.assertEqual(len(catalog), 4)
+        self.assertEqual(len(load_catalog(self.data_path, self.cache_path)), 4)
+
+
+class TestCatalogRequests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.bot = Mock()
+        self.bot.db.requests = AsyncMock()
+        self.bot.db.requests.create_once.return_value = (1, True)
+        self.crafting = Crafting(self.bot)
+        self.crafting.catalog = Catalog(
+            [
+                Item(
+                    "Iron Sword",
+                    TradeSkill.WEAPONSMITHING,
+                    20,
+                    (("Iron Ingot", 12),),
+                )
+            ]
+        )
+
+    async def test_known_item_fills_in_skill_and_level(self):
+        interaction = Mock()
+        interaction.user.id = 12345
+        interaction.user.name = "alice"
+        interaction.response.is_done.return_value = False
+        interaction.response.defer = AsyncMock()
+        interaction.followup.send = AsyncMock()
+        interaction.original_response = AsyncMock()
+        self.crafting.ping_skill_role = AsyncMock()
+
+        await self.crafting.request.callback(
+            self.crafting, interaction, "iron sword", False, 2
+        )
+
+        self.bot.db.requests.create_once.assert_called_once()
+        self.assertEqual(
+            self.bot.db.requests.create_once.call_args.args[4:],
+            ("Iron Sword", False, 2, "Weaponsmithing", 20),
+        )
+        embed = interaction.followup.send.call_args.kwargs["embed"]
+        self.assertEqual(embed.fields[1].value, "24 x Iron Ingot")
+
+    async def test_autocomplete(self):
+        choices = await self.crafting.request_item_autocomplete(Mock(), "swo")
+
+        self.assertEqual([choice.value for choice in choices], ["Iron Sword"])
+
+
+if __name__ == "__main__":
+    unittest.main()
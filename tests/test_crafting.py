@@ -1,19 +1,56 @@
+import csv
+import gzip
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
 import unittest
 from unittest.mock import Mock, AsyncMock, patch
-from ser_gawain.commands.crafting import Crafting
+from ser_gawain.commands.crafting import (
+    CrafterBalancer,
+    Crafting,
+    RequestQueue,
+    ExportFormat,
+    ExportTable,
+    export_table,
+    parse_skill_roster,
+)
+from ser_gawain.db import Database
+from ser_gawain.models import (
+    CrafterSkill,
+    CraftingRequest,
+    STATUS_CODES,
+    TRADE_SKILL_CODES,
+)
+from ser_gawain.notifications import NotifyMode
 
 
-class MockRow(dict):
-    def __getitem__(self, key):
-        return super().__getitem__(key)
+def make_job(requestor_id, status, accepted_by=None, **fields) -> CraftingRequest:
+    job = dict(
+        request_id=1,
+        requestor_id=requestor_id,
+        user_name="user",
+        item_name="Iron Sword",
+        has_materials=True,
+        amount=1,
+        skill_code=None,
+        level_required=None,
+        status_code=STATUS_CODES[status],
+        accepted_by=accepted_by,
+        created_at="2024-01-01 00:00:00",
+        completed_on=None,
+    )
+    job.update(fields)
+    return CraftingRequest(**job)
 
 
 class TestCrafting(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
-        self.bot = Mock()
+        self.bot = Mock(shard_count=None)
+        self.bot.db.requests = AsyncMock()
         self.crafting = Crafting(self.bot)
-        self.crafting.cursor = Mock()
-        self.crafting.conn = Mock()
+        self.requests = self.crafting.db.requests
         self.accept_callback = self.crafting.accept.callback
         self.complete_callback = self.crafting.complete.callback
 
@@ -23,45 +60,143 @@ class TestCrafting(unittest.IsolatedAsyncioTestCase):
         mock_interaction.response.defer = AsyncMock()
         mock_interaction.followup.send = AsyncMock()
 
-        mock_job = MockRow({"requestor_id": "67890"})
-        self.crafting.cursor.execute.return_value.fetchone.return_value = mock_job
+        self.requests.get.return_value = make_job(
+            requestor_id="67890", status="PENDING"
+        )
+        self.requests.accept.return_value = True
 
         await self.accept_callback(self.crafting, mock_interaction, "1")
 
-        self.crafting.cursor.execute.assert_called()
-        self.crafting.conn.commit.assert_called()
+        self.requests.accept.assert_called_with("1", "12345")
+        self.assertEqual(self.crafting.balancer.get_load("12345"), 1)
         mock_interaction.followup.send.assert_called()
 
+    @patch("discord.Interaction")
+    async def test_accept_repeat_is_answered_from_cache(self, mock_interaction):
+        mock_interaction.user.id = "12345"
+        mock_interaction.response.defer = AsyncMock()
+        mock_interaction.followup.send = AsyncMock()
+
+        self.requests.get.return_value = make_job(
+            requestor_id="67890", status="PENDING"
+        )
+        self.requests.accept.return_value = True
+
+        await self.accept_callback(self.crafting, mock_interaction, "1")
+        await self.accept_callback(self.crafting, mock_interaction, "1")
+
+        self.requests.accept.assert_called_once_with("1", "12345")
+        self.assertEqual(self.crafting.balancer.get_load("12345"), 1)
+        # Only the first accept pings the requestor
+        self.assertEqual(
+            mock_interaction.followup.send.call_args.args,
+            ("Crafting request 1 has been accepted",),
+        )
+
+    @patch("discord.Interaction")
+    async def test_accept_retried_after_database_error(self, mock_interaction):
+        mock_interaction.user.id = "12345"
+        mock_interaction.response.defer = AsyncMock()
+        mock_interaction.followup.send = AsyncMock()
+
+        self.requests.get.return_value = make_job(
+            requestor_id="67890", status="PENDING"
+        )
+        self.requests.accept.side_effect = [sqlite3.OperationalError("locked"), True]
+
+        await self.accept_callback(self.crafting, mock_interaction, "1")
+        await self.accept_callback(self.crafting, mock_interaction, "1")
+
+        self.assertEqual(self.requests.accept.call_count, 2)
+        self.assertEqual(self.crafting.balancer.get_load("12345"), 1)
+
     @patch("discord.Interaction")
     async def test_accept_own_job(self, mock_interaction):
         mock_interaction.user.id = "12345"
         mock_interaction.response.defer = AsyncMock()
         mock_interaction.followup.send = AsyncMock()
 
-        mock_job = MockRow({"requestor_id": "12345"})
-        self.crafting.cursor.execute.return_value.fetchone.return_value = mock_job
+        self.requests.get.return_value = make_job(
+            requestor_id="12345", status="PENDING"
+        )
 
         await self.accept_callback(self.crafting, mock_interaction, "1")
 
+        self.requests.accept.assert_not_called()
         mock_interaction.followup.send.assert_called_with(
-            "You cannot accept your own crafting job.", ephemeral=True
+            "You cannot accept your own crafting request.", ephemeral=True
         )
 
+    @patch("discord.Interaction")
+    async def test_auto_assign_needs_a_skill(self, mock_interaction):
+        mock_interaction.response.is_done.return_value = False
+        mock_interaction.response.defer = AsyncMock()
+        mock_interaction.response.send_message = AsyncMock()
+
+        await self.crafting.request.callback(
+            self.crafting, mock_interaction, "Gold Ring", False, auto_assign=True
+        )
+
+        self.requests.create_once.assert_not_called()
+        # Rejected as the first response, so it's only shown to the requestor
+        mock_interaction.response.defer.assert_not_called()
+        args, kwargs = mock_interaction.response.send_message.call_args
+        self.assertIn("needs a trade skill", args[0])
+        self.assertTrue(kwargs["ephemeral"])
+
+    @patch("discord.Interaction")
+    async def test_no_auto_assign_when_sharded(self, mock_interaction):
+        self.bot.shard_count = 2
+        mock_interaction.response.is_done.return_value = False
+        mock_interaction.response.defer = AsyncMock()
+        mock_interaction.response.send_message = AsyncMock()
+
+        await self.crafting.request.callback(
+            self.crafting, mock_interaction, "Gold Ring", False, auto_assign=True
+        )
+
+        # Offer buttons in DMs would only ever reach shard 0
+        self.requests.create_once.assert_not_called()
+        mock_interaction.response.defer.assert_not_called()
+        args, kwargs = mock_interaction.response.send_message.call_args
+        self.assertIn("several shards", args[0])
+        self.assertTrue(kwargs["ephemeral"])
+
+    @patch("discord.Interaction")
+    async def test_duplicate_request_is_answered_privately(self, mock_interaction):
+        mock_interaction.response.is_done.return_value = True
+        mock_interaction.delete_original_response = AsyncMock()
+        mock_interaction.followup.send = AsyncMock()
+        self.requests.create_once.return_value = (7, False)
+
+        await self.crafting.request.callback(
+            self.crafting, mock_interaction, "Gold Ring", False
+        )
+
+        # The public deferral is replaced, a followup to it would be public too
+        mock_interaction.delete_original_response.assert_awaited_once()
+        mock_interaction.followup.send.assert_called_once_with(
+            "You already requested Gold Ring as crafting request 7.", ephemeral=True
+        )
+        self.requests.get.assert_not_called()
+
     @patch("discord.Interaction")
     async def test_complete_success(self, mock_interaction):
         mock_interaction.user.id = "12345"
         mock_interaction.response.defer = AsyncMock()
         mock_interaction.followup.send = AsyncMock()
 
-        mock_job = MockRow({"accepted_by": "12345", "requestor_id": "67890"})
-        self.crafting.cursor.execute.return_value.fetchone.return_value = mock_job
-        self.crafting.conn.commit = AsyncMock()
+        self.requests.get.return_value = make_job(
+            requestor_id="67890", status="ACCEPTED", accepted_by="12345"
+        )
+        self.requests.complete.return_value = True
 
         await self.complete_callback(self.crafting, mock_interaction, "1")
 
-        self.crafting.cursor.execute.assert_called()
-        self.crafting.conn.commit.assert_called()
-        mock_interaction.followup.send.assert_called()
+        self.requests.complete.assert_called()
+        mock_interaction.followup.send.assert_called_with(
+            f"<@67890> Crafting request 1 has been completed by {mock_interaction.user.mention}"
+        )
 
     @patch("discord.Interaction")
     async def test_complete_not_accepted_by_user(self, mock_interaction):
@@ -69,16 +204,252 @@ class TestCrafting(unittest.IsolatedAsyncioTestCase):
         mock_interaction.response.defer = AsyncMock()
         mock_interaction.followup.send = AsyncMock()
 
-        mock_job = MockRow({"accepted_by": "67890", "requestor_id": "11111"})
-        self.crafting.cursor.execute.return_value.fetchone.return_value = mock_job
+        self.requests.get.return_value = make_job(
+            requestor_id="11111", status="ACCEPTED", accepted_by="67890"
+        )
 
         await self.complete_callback(self.crafting, mock_interaction, "1")
 
+        self.requests.complete.assert_not_called()
         mock_interaction.followup.send.assert_called_with(
             "You are not the one who accepted this job. Only the person who accepted the job can complete it.",
             ephemeral=True,
         )
 
 
+class TestRefreshState(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "gawain.db")
+        # Two processes sharing one database file
+        self.db = await Database.connect(path)
+        await self.db.create_tables()
+        self.other = await Database.connect(path)
+
+        bot = Mock()
+        bot.db = self.db
+        self.crafting = Crafting(bot)
+        await self.crafting.refresh_state()
+
+    async def asyncTearDown(self):
+        await self.other.close()
+        await self.db.close()
+        self.tmp.cleanup()
+
+    async def test_picks_up_changes_from_other_processes(self):
+        await self.other.skills.set(2, "bob", "Arcana", 200)
+        await self.other.skills.set(3, "carol", "Arcana", 200)
+        request_id = await self.other.requests.create(
+            1, "alice", "Gold Ring", False, 1, "Arcana", 100
+        )
+        accepted_id = await self.other.requests.create(
+            1, "alice", "Iron Ring", False, 1, "Arcana", 100
+        )
+        await self.other.requests.accept(accepted_id, 2)
+        await self.other.notifications.set(3, NotifyMode.INSTANT.name)
+
+        await self.crafting.refresh_state()
+
+        self.assertEqual(self.crafting.balancer.choose("Arcana", 150), "3")
+        self.assertEqual(self.crafting.balancer.get_load(2), 1)
+        self.assertEqual(
+            [job.request_id for job in self.crafting.queue.for_crafter(3, {"Arcana": 200})],
+            [request_id],
+        )
+        self.assertIs(self.crafting.notifier.mode(3), NotifyMode.INSTANT)
+
+
+    async def test_periodic_refresh_only_when_sharded(self):
+        for shard_count, running in ((None, False), (1, False), (2, True)):
+            bot = Mock(shard_count=shard_count)
+            bot.db = self.db
+            crafting = Crafting(bot)
+            with patch("ser_gawain.commands.crafting.load_catalog"):
+                await crafting.cog_load()
+            try:
+                self.assertIs(crafting.refresh_task.is_running(), running, shard_count)
+            finally:
+                await crafting.cog_unload()
+
+
+class TestExport(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.db = await Database.connect(":memory:")
+        await self.db.create_tables()
+        await self.db.skills.set_many(
+            [(str(i), f"user{i}", "Arcana", i % 250) for i in range(25)]
+        )
+
+    async def asyncTearDown(self):
+        await self.db.close()
+
+    async def test_export_csv_in_chunks(self):
+        export_file, rows_written = await export_table(
+            self.db, ExportTable.SKILLS, ExportFormat.CSV, chunk_size=10
+        )
+
+        with export_file, gzip.open(export_file, "rt", newline="") as stream:
+            rows = list(csv.reader(stream))
+
+        self.assertEqual(rows_written, 25)
+        self.assertEqual(
+            rows[0],
+            ["skill_id", "user_id", "user_name", "skill_name", "skill_level", "created_at"],
+        )
+        self.assertEqual(len(rows), 26)
+        self.assertEqual(rows[-1][:5], ["25", "24", "user24", "Arcana", "24"])
+
+    async def test_export_ndjson(self):
+        export_file, rows_written = await export_table(
+            self.db, ExportTable.SKILLS, ExportFormat.NDJSON
+        )
+
+        with export_file, gzip.open(export_file, "rt") as stream:
+            rows = [json.loads(line) for line in stream]
+
+        self.assertEqual(rows_written, 25)
+        self.assertEqual(rows[0]["skill_id"], 1)
+        self.assertEqual(rows[0]["user_name"], "user0")
+        self.assertEqual(rows[0]["skill_level"], 0)
+
+
+class TestImportSkills(unittest.TestCase):
+    def test_parse_csv_reports_row_errors(self):
+        roster = (
+            "user_id,user_name,skill,level\n"
+            "1,alice,Arcana,200\n"
+            "2,bob,Smelting,100\n"
+            "3,carol,cooking,251\n"
+            "bad,dave,Cooking,10\n"
+        ).encode()
+
+        rows, errors = parse_skill_roster(roster, "roster.csv")
+
+        self.assertEqual(rows, [("1", "alice", "Arcana", 200)])
+        self.assertEqual(
+            errors,
+            [
+                "Row 3: Unknown trade skill 'Smelting'.",
+                "Row 4: Skill level 251 must be between 0 and 250.",
+                "Row 5: Invalid user ID 'bad'.",
+            ],
+        )
+
+    def test_parse_json(self):
+        rows, errors = parse_skill_roster(
+            b'[{"user_id": 1, "user_name": "alice", "skill_name": "Arcana", "skill_level": 10}]',
+            "roster.json",
+        )
+
+        self.assertEqual(rows, [("1", "alice", "Arcana", 10)])
+        self.assertEqual(errors, [])
+
+    def test_parse_rejects_unknown_format(self):
+        with self.assertRaises(ValueError):
+            parse_skill_roster(b"", "roster.xlsx")
+
+    def test_parse_rejects_unreadable_files(self):
+        roster = gzip.compress(b"user_id,user_name,skill,level\n1,alice,Arcana,200\n")
+        oversized = b'user_id\n"' + b"1" * (csv.field_size_limit() + 1) + b'"\n'
+
+        for data, filename in (
+            (roster[: len(roster) // 2], "roster.csv.gz"),
+            (roster[:10] + b"\xff" * 20 + roster[30:], "roster.csv.gz"),
+            (oversized, "roster.csv"),
+        ):
+            with self.assertRaises(ValueError, msg=filename):
+                parse_skill_roster(data, filename)
+
+
+class TestCrafterBalancer(unittest.TestCase):
+    def setUp(self):
+        self.balancer = CrafterBalancer()
+        self.balancer.set_skill(1, "Arcana", 200)
+        self.balancer.set_skill(2, "Arcana", 100)
+        self.balancer.set_skill(3, "Arcana", 250)
+
+    def test_chooses_least_loaded_qualified_crafter(self):
+        self.balancer.add_load(1, 2)
+        self.balancer.add_load(3, 1)
+
+        self.assertEqual(self.balancer.choose("Arcana", 150), "3")
+        self.assertEqual(self.balancer.choose("Arcana", 0), "2")
+        self.assertEqual(self.balancer.choose("Arcana", 0, exclude=frozenset({"2"})), "3")
+
+    def test_updates_on_transitions(self):
+        self.balancer.add_load(1, 1)
+        self.balancer.add_load(2, 1)
+        self.assertEqual(self.balancer.choose("Arcana", 150), "3")
+
+        self.balancer.add_load(3, 1)
+        self.balancer.add_load(1, -1)
+        self.assertEqual(self.balancer.choose("Arcana", 150), "1")
+
+        self.balancer.set_skill(2, "Arcana", 250)
+        self.balancer.add_load(2, -1)
+        self.assertEqual(self.balancer.choose("Arcana", 250), "2")
+
+    def test_no_qualified_crafter(self):
+        self.assertIsNone(self.balancer.choose("Arcana", 251))
+        self.assertIsNone(self.balancer.choose("Cooking"))
+
+    def test_reservations_survive_a_reload(self):
+        self.balancer.reserve(3)
+        self.balancer.reserve(3)
+        self.assertEqual(self.balancer.get_load(3), 2)
+
+        db = Mock()
+        db.skills.all = AsyncMock(return_value=[CrafterSkill("3", None, "Arcana", 250)])
+        db.requests.accepted_counts = AsyncMock(return_value=[("3", 1)])
+        asyncio.run(self.balancer.load(db))
+        self.assertEqual(self.balancer.get_load(3), 3)
+
+        self.balancer.release(3)
+        self.balancer.release(3)
+        self.assertEqual(self.balancer.get_load(3), 1)
+
+
+class TestRequestQueue(unittest.TestCase):
+    def setUp(self):
+        self.queue = RequestQueue()
+        arcana = TRADE_SKILL_CODES["Arcana"]
+        for request_id, fields in {
+            1: dict(created_at="2024-01-02 00:00:00", has_materials=False),
+            # Older requests rank first
+            2: dict(created_at="2024-01-01 00:00:00", has_materials=False),
+            # Materials outweigh a few hours of age
+            3: dict(created_at="2024-01-02 01:00:00", has_materials=True),
+            4: dict(created_at="2024-01-01 00:00:00", level_required=200),
+            5: dict(created_at="2024-01-01 00:00:00", requestor_id="1"),
+            6: dict(created_at="2024-01-03 00:00:00", skill_code=None, level_required=None),
+        }.items():
+            job = dict(requestor_id="9", skill_code=arcana, level_required=50)
+            job.update(fields)
+            self.queue.add(make_job(status="PENDING", request_id=request_id, **job))
+
+    def ranked(self, levels, limit=10):
+        return [job.request_id for job in self.queue.for_crafter(1, levels, limit)]
+
+    def test_ranks_by_materials_age_and_amount(self):
+        self.assertEqual(self.ranked({"Arcana": 100}), [2, 3, 1, 6])
+        self.assertEqual(self.ranked({"Arcana": 200}), [4, 2, 3, 1, 6])
+        self.assertEqual(self.ranked({"Arcana": 200}, limit=2), [4, 2])
+
+    def test_only_requests_without_skill_for_untrained_crafters(self):
+        self.assertEqual(self.ranked({}), [6])
+
+    def test_removed_requests_leave_queue(self):
+        self.queue.remove(2)
+        self.queue.remove("4")
+        self.assertEqual(self.ranked({"Arcana": 200}), [3, 1, 6])
+        self.assertEqual(len(self.queue), 4)
+
+    def test_larger_amounts_rank_lower(self):
+        queue = RequestQueue()
+        queue.add(make_job("9", "PENDING", request_id=1, amount=30))
+        queue.add(make_job("9", "PENDING", request_id=2, amount=1))
+        self.assertEqual([job.request_id for job in queue.for_crafter(1, {})], [2, 1])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,180 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+from ser_gawain.db import BACKENDS, Database, connect, register_backend
+from ser_gawain.models import CrafterSkill, Status, TradeSkill
+
+
+class TestDatabase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.db = await Database.connect(":memory:")
+        await self.db.create_tables()
+        self.request_id = await self.db.requests.create(
+            1, "alice", "Iron Sword", True, 2, "Weaponsmithing", 50
+        )
+        await self.db.users.add(2, "bob")
+
+    async def asyncTearDown(self):
+        await self.db.close()
+
+    async def test_create_adds_requestor(self):
+        job = await self.db.requests.get(self.request_id)
+
+        self.assertEqual(job.requestor_id, "1")
+        self.assertEqual(job.item_name, "Iron Sword")
+        self.assertIs(job.status, Status.PENDING)
+        self.assertIs(job.trade_skill, TradeSkill.WEAPONSMITHING)
+        self.assertTrue(job.has_materials)
+        self.assertEqual(await self.db.users.requests_completed(1), 0)
+
+    async def test_accept_only_once(self):
+        self.assertTrue(await self.db.requests.accept(self.request_id, 2))
+        self.assertFalse(await self.db.requests.accept(self.request_id, 2))
+
+        job = await self.db.requests.get(self.request_id)
+        self.assertIs(job.status, Status.ACCEPTED)
+        self.assertEqual(job.accepted_by, "2")
+
+    async def test_create_once_within_window(self):
+        args = (1, "alice", "Gold Ring", False, 1, None, None)
+        first = await self.db.requests.create_once("key", 30, *args)
+        self.assertEqual(await self.db.requests.create_once("key", 30, *args), (first[0], False))
+        self.assertTrue(first[1])
+
+        # Once the window has passed the same key creates a new request
+        request_id, created = await self.db.requests.create_once("key", -1, *args)
+        self.assertTrue(created)
+        self.assertNotEqual(request_id, first[0])
+        self.assertEqual(len(await self.db.requests.all()), 3)
+
+    async def test_concurrent_create_once(self):
+        args = (1, "alice", "Gold Ring", False, 1, None, None)
+        results = await asyncio.gather(
+            *(self.db.requests.create_once(key, 30, *args) for key in "aabbc")
+        )
+
+        self.assertEqual(sum(created for _, created in results), 3)
+        self.assertEqual(results[0][0], results[1][0])
+        self.assertEqual(len(await self.db.requests.all()), 4)
+
+    async def test_complete_credits_crafter(self):
+        await self.db.requests.accept(self.request_id, 2)
+
+        self.assertFalse(
+            await self.db.requests.complete(self.request_id, 1, datetime.now())
+        )
+        self.assertTrue(
+            await self.db.requests.complete(self.request_id, 2, datetime.now())
+        )
+
+        job = await self.db.requests.get(self.request_id)
+        self.assertIs(job.status, Status.COMPLETED)
+        self.assertIsNotNone(job.completed_on)
+        self.assertEqual(await self.db.users.requests_completed(2), 1)
+
+    async def test_completed_on_is_stored_in_utc(self):
+        await self.db.requests.accept(self.request_id, 2)
+        offset = timezone(timedelta(hours=-7))
+
+        await self.db.requests.complete(
+            self.request_id, 2, datetime(2024, 6, 1, 20, 30, tzinfo=offset)
+        )
+
+        job = await self.db.requests.get(self.request_id)
+        self.assertEqual(job.completed_on, "2024-06-02 03:30:00")
+
+    async def test_all_by_status(self):
+        await self.db.requests.create(1, "alice", "Gold Ring", False, 1, None, None)
+        await self.db.requests.accept(self.request_id, 2)
+
+        pending = await self.db.requests.all(Status.PENDING)
+
+        self.assertEqual([job.item_name for job in pending], ["Gold Ring"])
+        self.assertIsNone(pending[0].trade_skill)
+        self.assertEqual(len(await self.db.requests.all()), 2)
+
+    async def test_delete_returns_deleted_row(self):
+        job, thread_id = await self.db.requests.delete(self.request_id)
+
+        self.assertEqual(job.request_id, self.request_id)
+        self.assertIsNone(thread_id)
+        self.assertIsNone(await self.db.requests.get(self.request_id))
+        self.assertEqual(await self.db.requests.delete(self.request_id), (None, None))
+
+    async def test_delete_request_with_thread(self):
+        await self.db.threads.set(self.request_id, 999)
+
+        job, thread_id = await self.db.requests.delete(self.request_id)
+
+        self.assertEqual(job.request_id, self.request_id)
+        self.assertEqual(thread_id, 999)
+        self.assertIsNone(await self.db.threads.get(self.request_id))
+
+    async def test_skills(self):
+        await self.db.skills.set(3, "carol", "Arcana", 10)
+        await self.db.skills.set_many(
+            [("3", "carol", "Arcana", 150), ("3", "carol", "Cooking", 20)]
+        )
+
+        self.assertEqual(
+            await self.db.skills.all(),
+            [
+                CrafterSkill("3", "carol", "Arcana", 150),
+                CrafterSkill("3", "carol", "Cooking", 20),
+            ],
+        )
+
+        crafters = await self.db.skills.crafters()
+        self.assertEqual(crafters[0].skills, "Arcana: 150, Cooking: 20")
+
+    async def test_crafters_without_a_name(self):
+        await self.db.skills.set_many([("4", None, "Arcana", 10)])
+        await self.db.skills.set(5, "erin", "Arcana", 10)
+        await self.db.skills.set_many([("5", None, "Cooking", 20)])
+
+        crafters = await self.db.skills.crafters()
+
+        self.assertEqual([crafter.display_name for crafter in crafters], ["4", "Erin"])
+        self.assertEqual(crafters[1].skills, "Arcana: 10, Cooking: 20")
+
+    async def test_concurrent_transactions(self):
+        request_ids = await asyncio.gather(
+            *(
+                self.db.requests.create(i, f"user{i}", "Gold Ring", False, 1, None, None)
+                for i in range(10, 15)
+            ),
+            self.db.skills.set(3, "carol", "Arcana", 10),
+            self.db.skills.set(3, "carol", "Cooking", 20),
+            self.db.requests.accept(self.request_id, 2),
+        )
+
+        self.assertEqual(len(set(request_ids[:5])), 5)
+        self.assertEqual(len(await self.db.requests.all(Status.PENDING)), 5)
+        self.assertEqual(len(await self.db.skills.all()), 2)
+        self.assertTrue(
+            await self.db.requests.complete(self.request_id, 2, datetime.now())
+        )
+
+
+
+class TestBackends(unittest.IsolatedAsyncioTestCase):
+    def tearDown(self):
+        BACKENDS.pop("test", None)
+
+    async def test_connect_by_name(self):
+        db = await connect(":memory:")
+        self.assertIsInstance(db, Database)
+        await db.close()
+
+        async def connect_test(dsn):
+            return dsn
+
+        register_backend("test", connect_test)
+        self.assertEqual(await connect("dsn", "test"), "dsn")
+
+        with self.assertRaises(ValueError):
+            await connect("dsn", "postgresql")
+
+
+if __name__ == "__main__":
+    unittest.main()
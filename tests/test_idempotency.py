@@ -0,0 +1,70 @@
+import asyncio
+import unittest
+from ser_gawain.idempotency import IdempotencyCache, request_fingerprint
+
+
+class TestIdempotencyCache(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.cache = IdempotencyCache(window=30, max_entries=4)
+        self.calls = 0
+
+    async def action(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return self.calls
+
+    async def test_repeats_get_first_result(self):
+        self.assertEqual(await self.cache.run(["a", "b"], self.action), (1, True))
+        self.assertEqual(await self.cache.run(["b"], self.action), (1, False))
+        self.assertEqual(await self.cache.run(["c"], self.action), (2, True))
+
+    async def test_concurrent_repeats_share_one_call(self):
+        results = await asyncio.gather(
+            *(self.cache.run(["a"], self.action) for _ in range(5))
+        )
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(sorted(fresh for _, fresh in results), [False] * 4 + [True])
+
+    async def test_failures_are_not_remembered(self):
+        async def fail():
+            raise ValueError("locked")
+
+        with self.assertRaises(ValueError):
+            await self.cache.run(["a"], fail)
+        self.assertEqual(await self.cache.run(["a"], self.action), (1, True))
+
+    async def test_unremembered_results_run_again(self):
+        def odd(result):
+            return result % 2 == 1
+
+        self.assertEqual(await self.cache.run(["a"], self.action, odd), (1, True))
+        self.assertEqual(await self.cache.run(["a"], self.action, odd), (1, False))
+        self.assertEqual(await self.cache.run(["b"], self.action, odd), (2, True))
+        self.assertEqual(await self.cache.run(["b"], self.action, odd), (3, True))
+
+    async def test_entries_expire_and_are_bounded(self):
+        self.cache.window = 0
+        await self.cache.run(["a"], self.action)
+        self.assertEqual(await self.cache.run(["a"], self.action), (2, True))
+        self.cache.window = 30
+
+        for key in "bcdef":
+            await self.cache.run([key], self.action)
+        self.assertEqual(len(self.cache), 4)
+        self.assertTrue((await self.cache.run(["a"], self.action))[1])
+
+
+class TestRequestFingerprint(unittest.TestCase):
+    def test_normalizes_item_names(self):
+        self.assertEqual(
+            request_fingerprint(1, "Iron  Sword ", 1, "Arcana"),
+            request_fingerprint("1", "iron sword", None, "Arcana"),
+        )
+        self.assertNotEqual(
+            request_fingerprint(1, "Iron Sword", 2, "Arcana"),
+            request_fingerprint(1, "Iron Sword", 1, "Arcana"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import asyncio
+import sqlite3
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+from ser_gawain import interactions
+from ser_gawain.commands.crafting import Crafting
+from ser_gawain.models import TradeSkill
+
+
+class FakeResponse:
+    """Stands in for InteractionResponse, each acknowledgement takes ``latency``."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = []
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _respond(self, kind: str, *args, **kwargs):
+        if self._done:
+            raise AssertionError(f"{kind} after the interaction was acknowledged")
+        await asyncio.sleep(self.latency)
+        self._done = True
+        self.calls.append((kind, args, kwargs))
+
+    async def defer(self, **kwargs):
+        await self._respond("defer", **kwargs)
+
+    async def send_message(self, *args, **kwargs):
+        await self._respond("send_message", *args, **kwargs)
+
+
+def make_interaction(latency: float = 0.0) -> Mock:
+    interaction = Mock()
+    interaction.user.id = 12345
+    interaction.user.name = "alice"
+    interaction.response = FakeResponse(latency)
+    interaction.followup.send = AsyncMock()
+    return interaction
+
+
+def slow(delay: float, result=None):
+    async def call(*args, **kwargs):
+        await asyncio.sleep(delay)
+        return result
+
+    return call
+
+
+@patch.object(interactions, "ACK_BUDGET", 0.05)
+@patch.object(interactions, "HANDLER_SLO", 0.2)
+class TestResponsive(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.bot = Mock()
+        self.bot.db.skills = AsyncMock()
+        self.crafting = Crafting(self.bot)
+        self.set_skill = self.crafting.set_skill.callback
+        self.crafters = self.crafting.crafters.callback
+
+    async def test_fast_handler_responds_directly(self):
+        interaction = make_interaction()
+
+        await self.set_skill(self.crafting, interaction, TradeSkill.ARCANA, 100)
+
+        self.assertEqual([kind for kind, _, _ in interaction.response.calls], ["send_message"])
+        interaction.followup.send.assert_not_called()
+
+    async def test_slow_database_is_deferred_in_time(self):
+        self.bot.db.skills.set.side_effect = slow(0.15)
+        interaction = make_interaction()
+
+        await self.set_skill(self.crafting, interaction, TradeSkill.ARCANA, 100)
+
+        self.assertEqual(
+            interaction.response.calls, [("defer", (), {"ephemeral": True})]
+        )
+        interaction.followup.send.assert_called_once_with(
+            "Trade skill Arcana set to 100!", ephemeral=True
+        )
+
+    async def test_reply_in_flight_is_not_deferred(self):
+        # The reply is still being sent when the budget runs out
+        interaction = make_interaction(latency=0.1)
+
+        await self.set_skill(self.crafting, interaction, TradeSkill.ARCANA, 100)
+        await asyncio.sleep(0.1)
+
+        self.assertEqual([kind for kind, _, _ in interaction.response.calls], ["send_message"])
+
+    async def test_error_after_defer_goes_to_followup(self):
+        self.bot.db.skills.crafters.side_effect = sqlite3.DatabaseError("locked")
+        interaction = make_interaction()
+
+        await self.crafters(self.crafting, interaction)
+
+        self.assertEqual([kind for kind, _, _ in interaction.response.calls], ["defer"])
+        interaction.followup.send.assert_called_once_with(
+            "An error occurred while fetching crafters. Please try again.",
+            ephemeral=True,
+        )
+
+    async def test_slo_breach_is_counted_with_stack(self):
+        self.bot.db.skills.set.side_effect = slow(0.3)
+        interaction = make_interaction()
+        breaches = interactions.slo_breaches["Crafting.set_skill"]
+
+        with self.assertLogs(level="WARNING") as logs:
+            await self.set_skill(self.crafting, interaction, TradeSkill.ARCANA, 100)
+
+        self.assertEqual(interactions.slo_breaches["Crafting.set_skill"], breaches + 1)
+        self.assertIn("Crafting.set_skill has been running for over 0.2s", logs.output[0])
+        self.assertIn("in call", logs.output[0])
+        self.assertIn("Crafting.set_skill finished after", logs.output[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
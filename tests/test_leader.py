@@ -0,0 +1,88 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from ser_gawain.db import Database
+from ser_gawain.leader import LeaderElection
+
+
+def contend(path: str, holder: str) -> bool:
+    """One replica starting up against the shared database, runs in its own process."""
+
+    async def start() -> bool:
+        db = await Database.connect(path)
+        try:
+            return await LeaderElection(db, holder=holder).renew()
+        finally:
+            await db.close()
+
+    return asyncio.run(start())
+
+
+class TestLeaderElection(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.db = await Database.connect(":memory:")
+        await self.db.create_tables()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+
+    async def test_one_leader_until_released(self):
+        first = LeaderElection(self.db, holder="first")
+        second = LeaderElection(self.db, holder="second")
+
+        self.assertTrue(await first.renew())
+        self.assertFalse(await second.renew())
+        self.assertTrue(await first.renew())
+        self.assertEqual(await self.db.leases.holder("jobs"), "first")
+
+        await first.close()
+        self.assertFalse(first.is_leader)
+        self.assertTrue(await second.renew())
+        self.assertTrue(second.is_leader)
+
+    async def test_expired_lease_is_taken_over(self):
+        first = LeaderElection(self.db, holder="first", ttl=0.05)
+        second = LeaderElection(self.db, holder="second", ttl=0.05)
+        self.assertTrue(await first.renew())
+
+        await asyncio.sleep(0.1)
+        self.assertFalse(first.is_leader)
+        self.assertTrue(await second.renew())
+        self.assertFalse(await first.renew())
+
+    async def test_leases_are_independent(self):
+        self.assertTrue(await LeaderElection(self.db, "jobs", "first").renew())
+        self.assertTrue(await LeaderElection(self.db, "board", "second").renew())
+
+
+class TestReplicas(unittest.TestCase):
+    def test_one_leader_across_processes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "gawain.db")
+
+            async def create_tables():
+                db = await Database.connect(path)
+                await db.create_tables()
+                await db.close()
+
+            asyncio.run(create_tables())
+
+            replicas = 4
+            with ProcessPoolExecutor(
+                replicas, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                elected = list(
+                    executor.map(
+                        contend, [path] * replicas, [f"replica-{i}" for i in range(replicas)]
+                    )
+                )
+
+        self.assertEqual(elected.count(True), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import asyncio
+import unittest
+from unittest.mock import Mock
+import discord
+from ser_gawain.memory import Profile, UserCache, client_options
+
+
+class TestClientOptions(unittest.TestCase):
+    def test_low_memory_drops_member_and_message_caches(self):
+        options = client_options(Profile.LOW_MEMORY)
+
+        self.assertTrue(options.intents.guilds)
+        self.assertTrue(options.intents.emojis_and_stickers)
+        self.assertFalse(options.intents.members)
+        self.assertFalse(options.intents.message_content)
+        self.assertFalse(options.intents.guild_messages)
+        self.assertIsNone(options.max_messages)
+        self.assertEqual(options.member_cache_flags.value, 0)
+        self.assertFalse(options.chunk_guilds_at_startup)
+
+    def test_options_build_a_client(self):
+        for profile in Profile:
+            client = discord.Client(**client_options(profile).kwargs())
+            self.assertEqual(
+                client.intents, client_options(profile).intents, profile
+            )
+
+
+class FakeClient:
+    def __init__(self, cached: dict[int, object] = {}):
+        self.cached = cached
+        self.fetched: list[int] = []
+
+    def get_user(self, user_id: int):
+        return self.cached.get(user_id)
+
+    async def fetch_user(self, user_id: int):
+        self.fetched.append(user_id)
+        await asyncio.sleep(0.01)
+        if user_id < 0:
+            raise discord.NotFound(Mock(status=404), "Unknown User")
+        return f"user{user_id}"
+
+
+class TestUserCache(unittest.IsolatedAsyncioTestCase):
+    async def test_cached_users_are_not_fetched(self):
+        client = FakeClient({1: "cached"})
+        users = UserCache(client)
+
+        self.assertEqual(await users.get("1"), "cached")
+        self.assertEqual(client.fetched, [])
+
+    async def test_concurrent_lookups_share_a_fetch(self):
+        client = FakeClient()
+        users = UserCache(client)
+
+        results = await asyncio.gather(users.get(2), users.get("2"), users.get(2))
+
+        self.assertEqual(results, ["user2"] * 3)
+        self.assertEqual(client.fetched, [2])
+        await users.get(2)
+        self.assertEqual(client.fetched, [2])
+
+    async def test_least_recently_used_are_evicted(self):
+        client = FakeClient()
+        users = UserCache(client, max_size=2)
+
+        await users.get(1)
+        await users.get(2)
+        await users.get(1)
+        await users.get(3)
+
+        self.assertEqual(len(users), 2)
+        await users.get(1)
+        await users.get(2)
+        self.assertEqual(client.fetched, [1, 2, 3, 2])
+
+    async def test_unknown_users_raise(self):
+        users = UserCache(FakeClient())
+
+        with self.assertRaises(discord.NotFound):
+            await users.get(-1)
+        self.assertEqual(len(users), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
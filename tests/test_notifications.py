@@ -0,0 +1,173 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import AsyncMock, Mock
+import discord
+from ser_gawain.commands.crafting import accept_request
+from ser_gawain.db import Database
+from ser_gawain.notifications import (
+    DM_MAX_LENGTH,
+    NOTIFY_MAX_LINES,
+    Notifier,
+    NotifyMode,
+    format_dm,
+)
+from tests.test_crafting import make_job
+
+
+class FakeClient:
+    """Resolves every user to a cached one whose DMs are recorded in ``sent``."""
+
+    def __init__(self):
+        self.sent: list[tuple[int, str, float]] = []
+        self.closed: set[int] = set()
+
+    def get_user(self, user_id: int):
+        user = Mock()
+
+        async def send(content):
+            if user_id in self.closed:
+                raise discord.errors.Forbidden(Mock(status=403), "Cannot send messages")
+            self.sent.append((user_id, content, time.monotonic()))
+
+        user.send = send
+        return user
+
+
+class TestNotifier(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = FakeClient()
+        self.notifier = Notifier(self.client, workers=2, rate=1000.0)
+        self.notifier.set_mode(1, NotifyMode.INSTANT)
+        self.notifier.set_mode(2, NotifyMode.DIGEST)
+        self.notifier.set_mode(3, NotifyMode.OFF)
+        self.notifier.start()
+
+    async def asyncTearDown(self):
+        await self.notifier.close()
+
+    async def drain(self):
+        await asyncio.wait_for(self.notifier._queue.join(), 1)
+
+    async def test_modes(self):
+        self.notifier.notify([1, 2, 3, 4], "Request 7 was accepted")
+        await self.drain()
+
+        self.assertEqual([user for user, _, _ in self.client.sent], [1])
+        self.assertEqual(self.notifier.pending(2), 1)
+        self.assertEqual(self.notifier.pending(3), 0)
+        self.assertEqual(self.notifier.pending(4), 0)
+
+    async def test_burst_is_merged_into_one_dm(self):
+        for i in range(5):
+            self.notifier.notify([1, 2], f"Request {i} was accepted")
+        await self.drain()
+
+        self.assertEqual(len(self.client.sent), 1)
+        self.assertEqual(self.client.sent[0][1].count("was accepted"), 5)
+
+    async def test_digest_is_one_dm_per_user(self):
+        self.notifier.set_mode(4, NotifyMode.DIGEST)
+        for i in range(NOTIFY_MAX_LINES + 5):
+            self.notifier.notify([2, 4], f"New crafting request {i}")
+        await self.drain()
+        self.assertEqual(self.client.sent, [])
+
+        self.notifier.flush_digests()
+        await self.drain()
+
+        self.assertEqual(sorted(user for user, _, _ in self.client.sent), [2, 4])
+        content = self.client.sent[0][1]
+        self.assertTrue(content.startswith("**Crafting digest**"))
+        self.assertIn(f"New crafting request {NOTIFY_MAX_LINES + 4}", content)
+        self.assertTrue(content.endswith("...and 5 more"))
+        self.assertEqual(self.notifier.pending(2), 0)
+
+    async def test_actor_is_not_notified(self):
+        self.notifier.notify([1], "Request 7 was cancelled", exclude="1")
+        await self.drain()
+
+        self.assertEqual(self.client.sent, [])
+
+    async def test_closed_dms_dont_stop_workers(self):
+        self.client.closed.add(1)
+        self.notifier.set_mode(5, NotifyMode.INSTANT)
+
+        with self.assertLogs(level="WARNING"):
+            self.notifier.notify([1], "Request 7 was accepted")
+            await self.drain()
+        self.notifier.notify([5], "Request 8 was accepted")
+        await self.drain()
+
+        self.assertEqual([user for user, _, _ in self.client.sent], [5])
+
+    async def test_sends_are_rate_limited(self):
+        self.notifier.rate = 50.0
+        users = range(100, 106)
+        for user_id in users:
+            self.notifier.set_mode(user_id, NotifyMode.INSTANT)
+
+        self.notifier.notify(users, "Request 7 was completed")
+        await self.drain()
+
+        times = sorted(sent_at for _, _, sent_at in self.client.sent)
+        self.assertEqual(len(times), 6)
+        self.assertGreaterEqual(times[-1] - times[0], 5 / 50.0 * 0.9)
+
+    async def test_switching_to_instant_sends_held_digest(self):
+        self.notifier.notify([2], "Request 7 was accepted")
+        self.notifier.set_mode(2, NotifyMode.INSTANT)
+        await self.drain()
+
+        self.assertEqual(self.client.sent[0][:2], (2, "Request 7 was accepted"))
+
+
+class TestFormat(unittest.TestCase):
+    def test_long_messages_are_cut(self):
+        lines = [f"New crafting request {i}: " + "x" * 80 for i in range(40)]
+        content = format_dm(lines, dropped=3, digest=True)
+
+        self.assertLessEqual(len(content), DM_MAX_LENGTH)
+        shown = content.count("New crafting request")
+        self.assertTrue(content.endswith(f"...and {40 - shown + 3} more"))
+
+
+class TestPreferences(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.db = await Database.connect(":memory:")
+        await self.db.create_tables()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+
+    async def test_preferences_survive_restart(self):
+        await self.db.notifications.set(1, NotifyMode.DIGEST.name)
+        await self.db.notifications.set(1, NotifyMode.INSTANT.name)
+        await self.db.notifications.set(2, NotifyMode.OFF.name)
+
+        notifier = Notifier(FakeClient())
+        await notifier.load(self.db)
+
+        self.assertIs(notifier.mode(1), NotifyMode.INSTANT)
+        self.assertIs(notifier.mode(2), NotifyMode.OFF)
+        self.assertIs(notifier.mode(3), NotifyMode.OFF)
+
+    async def test_accept_notifies_requestor(self):
+        db = Mock()
+        db.requests = AsyncMock()
+        db.requests.get.return_value = make_job(
+            requestor_id="67890", status="PENDING", amount=2
+        )
+        db.requests.accept.return_value = True
+        notifier = Notifier(FakeClient())
+        notifier.set_mode("67890", NotifyMode.DIGEST)
+
+        success, _ = await accept_request(db, 12345, "1", notifier=notifier)
+
+        self.assertTrue(success)
+        self.assertEqual(notifier.pending("67890"), 1)
+        self.assertIn("2x Iron Sword", notifier._digests["67890"][0][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import os
+import sqlite3
+import struct
+import tempfile
+import time
+import unittest
+import zlib
+from ser_gawain.analytics import Insight, build_snapshot
+from ser_gawain.db import SCHEMA
+from ser_gawain.reports import (
+    CHART_HEIGHT,
+    CHART_WIDTH,
+    ReportQueueFull,
+    ReportRenderer,
+    render_bar_chart,
+    render_insight,
+)
+
+
+class TestReportRenderer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.reports = ReportRenderer(workers=1, max_pending=2)
+
+    async def asyncTearDown(self):
+        self.reports.close()
+
+    async def test_reports_are_cached_per_version(self):
+        first = await self.reports.render("sorted", 1, sorted, [3, 1, 2])
+        self.assertEqual(first, [1, 2, 3])
+        self.assertIs(await self.reports.render("sorted", 1, sorted, [3, 1, 2]), first)
+
+        # A newer version renders again, an older one is served from the newer cache
+        second = await self.reports.render("sorted", 2, sorted, [3, 1, 2])
+        self.assertIsNot(second, first)
+        self.assertIs(await self.reports.render("sorted", 1, sorted, [3, 1, 2]), second)
+
+    async def test_stale_job_is_replaced(self):
+        busy = asyncio.create_task(self.reports.render("sleep", 1, time.sleep, 0.5))
+        await asyncio.sleep(0)
+        # Queued behind the sleep on the only worker
+        stale = asyncio.create_task(self.reports.render("sorted", 1, sorted, [2, 1]))
+        await asyncio.sleep(0)
+
+        fresh = await self.reports.render("sorted", 2, sorted, [4, 3])
+        self.assertEqual(fresh, [3, 4])
+        self.assertEqual(await stale, [3, 4])
+        await busy
+
+    async def test_queue_is_bounded(self):
+        busy = [
+            asyncio.create_task(self.reports.render(key, 1, time.sleep, 0.2))
+            for key in ("first", "second")
+        ]
+        await asyncio.sleep(0)
+
+        with self.assertRaises(ReportQueueFull):
+            await self.reports.render("third", 1, sorted, [1])
+
+        await asyncio.gather(*busy)
+        self.assertEqual(await self.reports.render("third", 1, sorted, [1]), [1])
+
+
+class TestRenderInsight(unittest.TestCase):
+    def test_completions_chart(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "gawain.snapshot")
+            conn = sqlite3.connect(":memory:")
+            conn.executescript(SCHEMA)
+            conn.execute("INSERT INTO users (user_id, user_name) VALUES ('1', 'alice')")
+            conn.executemany(
+                "INSERT INTO crafting_requests (requestor_id, user_name, item_name, has_materials, amount, status, accepted_by, created_at, completed_on) VALUES ('1', 'alice', 'Iron Sword', 1, 1, 'COMPLETED', '1', ?, ?)",
+                [
+                    ("2024-03-01 00:00:00", "2024-03-01 02:00:00"),
+                    ("2024-03-01 00:00:00", "2024-03-01 03:00:00"),
+                    ("2024-03-02 00:00:00", "2024-03-03 01:00:00"),
+                ],
+            )
+            build_snapshot(conn, path)
+            conn.close()
+
+            report = render_insight(path, Insight.COMPLETIONS, 7, 1709510400)
+
+        self.assertEqual(report.rows, 7)
+        lines = [line.split() for line in report.table.splitlines()]
+        self.assertEqual(lines[2:5], [["2024-03-03", "1"], ["2024-03-02", "0"], ["2024-03-01", "2"]])
+
+        chart = report.chart
+        self.assertEqual(chart[:8], b"\x89PNG\r\n\x1a\n")
+        self.assertEqual(struct.unpack(">II", chart[16:24]), (CHART_WIDTH, CHART_HEIGHT))
+
+    def test_bar_chart_scanlines(self):
+        chart = render_bar_chart([0, 1, 2], width=30, height=20)
+        (idat_length,) = struct.unpack(">I", chart[33:37])
+        pixels = zlib.decompress(chart[41 : 41 + idat_length])
+        self.assertEqual(len(pixels), 20 * (1 + 30 * 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
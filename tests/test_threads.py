@@ -0,0 +1,141 @@
+import asyncio
+import discord
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+from ser_gawain.db import Database
+from ser_gawain.threads import ARCHIVE_MAX_ATTEMPTS, ThreadManager
+
+
+class TestThreadManager(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.db = await Database.connect(":memory:")
+        await self.db.create_tables()
+        self.request_id = await self.db.requests.create(
+            1, "alice", "Iron Sword", True, 1, "Weaponsmithing", 50
+        )
+
+        self.thread = Mock(id=555)
+        self.thread.add_user = AsyncMock()
+        self.thread.edit = AsyncMock()
+
+        self.message = Mock(thread=None)
+
+        async def create_thread(**kwargs):
+            await asyncio.sleep(0)
+            self.message.thread = self.thread
+            return self.thread
+
+        self.message.create_thread = AsyncMock(side_effect=create_thread)
+
+        self.client = Mock()
+        self.client.get_channel.side_effect = lambda thread_id: (
+            self.thread if thread_id == self.thread.id else None
+        )
+        self.threads = ThreadManager(self.client, self.db)
+
+    async def asyncTearDown(self):
+        await self.db.close()
+
+    async def test_reuses_thread(self):
+        thread, created = await self.threads.open(
+            self.message, self.request_id, "Request", (Mock(id=1), Mock(id=2))
+        )
+        self.assertIs(thread, self.thread)
+        self.assertTrue(created)
+        self.assertEqual(await self.db.threads.get(self.request_id), self.thread.id)
+
+        thread, created = await self.threads.open(
+            self.message, self.request_id, "Request", (Mock(id=3),)
+        )
+        self.assertIs(thread, self.thread)
+        self.assertFalse(created)
+        self.message.create_thread.assert_awaited_once()
+        self.assertEqual(self.thread.add_user.await_count, 3)
+
+    async def test_concurrent_opens_create_once(self):
+        results = await asyncio.gather(
+            *(
+                self.threads.open(self.message, self.request_id, "Request", (Mock(id=i),))
+                for i in range(5)
+            )
+        )
+
+        self.message.create_thread.assert_awaited_once()
+        self.assertEqual([created for _, created in results].count(True), 1)
+        self.assertEqual(self.thread.add_user.await_count, 5)
+
+    async def test_archives_in_batches(self):
+        other_id = await self.db.requests.create(
+            1, "alice", "Iron Shield", True, 1, "Armoring", 50
+        )
+        other_thread = Mock(id=777)
+        other_thread.edit = AsyncMock()
+        self.client.get_channel.side_effect = {555: self.thread, 777: other_thread}.get
+
+        await self.db.threads.set(self.request_id, self.thread.id)
+        await self.db.threads.set(other_id, other_thread.id)
+
+        with patch("ser_gawain.threads.ARCHIVE_BATCH_DELAY", 0):
+            self.threads.schedule_archive(self.request_id)
+            self.threads.schedule_archive(other_id)
+            await self.threads._archive_task
+
+        self.thread.edit.assert_awaited_once()
+        self.assertTrue(self.thread.edit.call_args.kwargs["locked"])
+        other_thread.edit.assert_awaited_once()
+        self.assertEqual(await self.db.threads.open([self.request_id, other_id]), {})
+
+        # Already archived threads aren't touched again
+        self.threads.schedule_archive(self.request_id)
+        await self.threads.close()
+        self.thread.edit.assert_awaited_once()
+
+    async def test_archives_deleted_requests_by_thread(self):
+        await self.db.threads.set(self.request_id, self.thread.id)
+        _, thread_id = await self.db.requests.delete(self.request_id)
+
+        with patch("ser_gawain.threads.ARCHIVE_BATCH_DELAY", 0):
+            self.threads.schedule_archive(self.request_id, thread_id)
+            await self.threads._archive_task
+
+        self.thread.edit.assert_awaited_once()
+
+    async def test_failed_archives_are_retried(self):
+        other_id = await self.db.requests.create(
+            1, "alice", "Iron Shield", True, 1, "Armoring", 50
+        )
+        await self.db.threads.set(self.request_id, self.thread.id)
+        await self.db.threads.set(other_id, 777)
+        # The other thread isn't cached and fetching it hits a server error once
+        self.client.fetch_channel = AsyncMock(
+            side_effect=[
+                discord.HTTPException(Mock(status=503), "Service Unavailable"),
+                self.thread,
+            ]
+        )
+
+        with patch("ser_gawain.threads.ARCHIVE_BATCH_DELAY", 0), self.assertLogs(
+            level="ERROR"
+        ):
+            self.threads.schedule_archive(self.request_id)
+            self.threads.schedule_archive(other_id)
+            await self.threads._archive_task
+
+        # The failure didn't hold up the other thread, and the next batch retried it
+        self.thread.edit.assert_awaited()
+        self.assertEqual(self.client.fetch_channel.await_count, 2)
+        self.assertEqual(await self.db.threads.open([self.request_id, other_id]), {})
+
+    async def test_gives_up_after_max_attempts(self):
+        await self.db.threads.set(self.request_id, self.thread.id)
+        self.thread.edit.side_effect = discord.Forbidden(Mock(status=403), "Missing Access")
+
+        with patch("ser_gawain.threads.ARCHIVE_BATCH_DELAY", 0), self.assertLogs(
+            level="ERROR"
+        ) as logs:
+            self.threads.schedule_archive(self.request_id)
+            await self.threads._archive_task
+
+        self.assertEqual(self.thread.edit.await_count, ARCHIVE_MAX_ATTEMPTS)
+        self.assertIn("Giving up", logs.output[-1])
+        self.assertEqual(len(self.threads._pending_archive), 0)